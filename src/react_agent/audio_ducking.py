@@ -0,0 +1,193 @@
+"""Deterministic BGM ducking from known speech timings.
+
+Instead of letting ffmpeg's sidechaincompress follow the narration at runtime, the
+gain curve is computed up front from word timestamps (or narration energy) and the
+BGM is mixed under the narration directly in NumPy.
+"""
+
+import asyncio
+import wave
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import ffmpeg
+import numpy as np
+
+MIX_SAMPLE_RATE = 48000
+CONTROL_RATE = 100  # gain curve resolution in Hz
+
+DEFAULT_DUCK_DB = -12.0
+DEFAULT_ATTACK = 0.2    # seconds the BGM starts dipping before speech
+DEFAULT_RELEASE = 1.6   # seconds it takes to come back up after speech
+
+
+def decode_audio(path: str, sample_rate: int, channels: int = 1) -> np.ndarray:
+    """Decode any audio file to float32 PCM shaped (n_samples, channels)"""
+    out, _ = (
+        ffmpeg
+        .input(path)
+        .output('pipe:', format='f32le', acodec='pcm_f32le', ac=channels, ar=sample_rate)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, dtype=np.float32).reshape(-1, channels)
+
+
+def speech_segments_from_subtitles(subtitles: List[Dict], merge_gap: float = 0.3) -> List[Tuple[float, float]]:
+    """Speech intervals from line subtitles, merging words closer than `merge_gap`"""
+    words = sorted(
+        (w['start'], w['end'])
+        for line in subtitles
+        for w in line.get('textcontents', [line])
+    )
+    segments: List[Tuple[float, float]] = []
+    for start, end in words:
+        if segments and start - segments[-1][1] <= merge_gap:
+            segments[-1] = (segments[-1][0], max(segments[-1][1], end))
+        else:
+            segments.append((start, end))
+    return segments
+
+
+def speech_mask_from_segments(
+    segments: Sequence[Tuple[float, float]],
+    duration: float,
+    rate: int = CONTROL_RATE,
+) -> np.ndarray:
+    """Boolean speech mask sampled at `rate` Hz"""
+    n = int(np.ceil(duration * rate))
+    mask = np.zeros(n, dtype=bool)
+    if not segments or n == 0:
+        return mask
+    bounds = np.clip(np.round(np.asarray(segments, dtype=np.float64) * rate).astype(np.int64), 0, n)
+    # Mark interval edges and integrate, so overlapping segments cost nothing extra
+    edges = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(edges, bounds[:, 0], 1)
+    np.add.at(edges, bounds[:, 1], -1)
+    return np.cumsum(edges[:-1]) > 0
+
+
+def speech_mask_from_energy(
+    samples: np.ndarray,
+    sample_rate: int,
+    rate: int = CONTROL_RATE,
+    threshold_db: float = -40.0,
+) -> np.ndarray:
+    """Speech mask from the narration's short-term RMS level"""
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    hop = max(1, sample_rate // rate)
+    n = int(np.ceil(mono.size / hop))
+    padded = np.pad(mono, (0, n * hop - mono.size))
+    rms = np.sqrt(np.mean(np.square(padded.reshape(n, hop), dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-9)) > threshold_db
+
+
+def ducking_gain(
+    mask: np.ndarray,
+    rate: int = CONTROL_RATE,
+    duck_db: float = DEFAULT_DUCK_DB,
+    attack: float = DEFAULT_ATTACK,
+    release: float = DEFAULT_RELEASE,
+) -> np.ndarray:
+    """Linear BGM gain per control step.
+
+    Full `duck_db` attenuation during speech, a linear (in dB) ramp down over `attack`
+    seconds before each speech onset and back up over `release` seconds after it ends.
+    Because the speech timings are known in advance the dip can anticipate the voice,
+    which a runtime compressor cannot do.
+    """
+    n = mask.size
+    if n == 0:
+        return np.ones(0)
+    if not mask.any():
+        return np.ones(n)
+
+    idx = np.arange(n)
+    last_speech = np.maximum.accumulate(np.where(mask, idx, -n - 1))
+    next_speech = np.minimum.accumulate(np.where(mask, idx, 2 * n + 1)[::-1])[::-1]
+    since_speech = (idx - last_speech) / rate
+    until_speech = (next_speech - idx) / rate
+
+    after = np.clip(1 - since_speech / release, 0, 1) if release > 0 else (since_speech == 0).astype(float)
+    before = np.clip(1 - until_speech / attack, 0, 1) if attack > 0 else (until_speech == 0).astype(float)
+    depth = np.maximum(after, before)
+    return 10 ** (duck_db * depth / 20)
+
+
+def mix_ducked_bgm(
+    narration: np.ndarray,
+    bgm: np.ndarray,
+    gain: np.ndarray,
+    sample_rate: int = MIX_SAMPLE_RATE,
+    control_rate: int = CONTROL_RATE,
+    bgm_volume: float = 0.3,
+    narration_volume: float = 1.0,
+    fade_duration: float = 1.0,
+) -> np.ndarray:
+    """Mix BGM under narration with a precomputed gain curve.
+
+    Both inputs are float PCM shaped (n_samples, channels). The output has the
+    narration's length; BGM is trimmed or zero-padded to match and faded out at the end.
+    """
+    n = narration.shape[0]
+    bgm = bgm[:n]
+    if bgm.shape[0] < n:
+        bgm = np.pad(bgm, ((0, n - bgm.shape[0]), (0, 0)))
+
+    t = np.arange(n) / sample_rate
+    curve = np.interp(t, np.arange(gain.size) / control_rate, gain) if gain.size else np.ones(n)
+    curve = curve * bgm_volume
+    if fade_duration > 0:
+        curve = curve * np.clip((n / sample_rate - t) / fade_duration, 0, 1)
+
+    mixed = narration * narration_volume + bgm * curve[:, None].astype(np.float32)
+    peak = float(np.max(np.abs(mixed))) if mixed.size else 0.0
+    if peak > 1.0:
+        mixed = mixed / peak
+    return mixed.astype(np.float32)
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int) -> str:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return path
+
+
+def render_ducked_mix(
+    narration_path: str,
+    bgm_path: str,
+    output_path: str,
+    speech_segments: Optional[Sequence[Tuple[float, float]]] = None,
+    bgm_volume: float = 0.3,
+    narration_volume: float = 1.0,
+    fade_duration: float = 1.0,
+    duck_db: float = DEFAULT_DUCK_DB,
+    attack: float = DEFAULT_ATTACK,
+    release: float = DEFAULT_RELEASE,
+) -> str:
+    """Decode narration and BGM, duck and mix them, and write a WAV (blocking).
+
+    Speech timings come from `speech_segments` when given (e.g. word timestamps),
+    otherwise from the narration's energy.
+    """
+    narration = decode_audio(narration_path, MIX_SAMPLE_RATE, channels=2)
+    bgm = decode_audio(bgm_path, MIX_SAMPLE_RATE, channels=2)
+    duration = narration.shape[0] / MIX_SAMPLE_RATE
+
+    if speech_segments is not None:
+        mask = speech_mask_from_segments(speech_segments, duration)
+    else:
+        mask = speech_mask_from_energy(narration, MIX_SAMPLE_RATE)
+    gain = ducking_gain(mask, duck_db=duck_db, attack=attack, release=release)
+
+    mixed = mix_ducked_bgm(
+        narration, bgm, gain,
+        bgm_volume=bgm_volume, narration_volume=narration_volume, fade_duration=fade_duration
+    )
+    return write_wav(output_path, mixed, MIX_SAMPLE_RATE)
+
+
+async def render_ducked_mix_async(*args, **kwargs) -> str:
+    return await asyncio.to_thread(render_ducked_mix, *args, **kwargs)
@@ -0,0 +1,117 @@
+import os
+import time
+import asyncio
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from react_agent.services import service_status, flush_services
+from react_agent.section_pipeline import shared_scheduler
+from react_agent.instrumentation import span, attach_report, run_report, llm_callback_handler
+
+# Services with background writes that must land before the event loop shuts down
+FLUSHED_SERVICES = ["topic_store"]
+
+
+@dataclass
+class ShortRun:
+    thread_id: str
+    seconds: float = 0.0
+    ok: bool = False
+    title: Optional[str] = None
+    final_reel_path: Optional[str] = None
+    error: Optional[str] = None
+    timing: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class BatchReport:
+    runs: List[ShortRun] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def completed(self) -> int:
+        return sum(r.ok for r in self.runs)
+
+    @property
+    def shorts_per_hour(self) -> float:
+        return self.completed / self.seconds * 3600 if self.seconds else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        durations = sorted(r.seconds for r in self.runs if r.ok)
+        return {
+            "requested": len(self.runs),
+            "completed": self.completed,
+            "failed": len(self.runs) - self.completed,
+            "wall_seconds": round(self.seconds, 1),
+            "shorts_per_hour": round(self.shorts_per_hour, 2),
+            "median_short_seconds": round(durations[len(durations) // 2], 1) if durations else None,
+            "stages": shared_scheduler.summary(),
+            "service_build_seconds": service_status(),
+        }
+
+
+def run_config(thread_id: str, configurable: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Graph config for one run, with LLM calls recorded as spans"""
+    return {"configurable": {**(configurable or {}), "thread_id": thread_id}, "callbacks": [llm_callback_handler()]}
+
+
+def write_timing_report(result: Optional[Dict[str, Any]], run_id: str) -> Dict[str, Any]:
+    """Attach the finished run's timing report to its final_output.json (if the run got that far)"""
+    media_result = (result or {}).get("media_result")
+    output_dir = getattr(media_result, "output_dir", None)
+    if output_dir and os.path.isdir(output_dir):
+        return attach_report(os.path.join(output_dir, "final_output.json"), run_id)
+    return run_report(run_id)
+
+
+async def run_one(graph, thread_id: str, configurable: Optional[Dict[str, Any]] = None) -> ShortRun:
+    run = ShortRun(thread_id=thread_id)
+    run_id = f"{thread_id}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    started = time.perf_counter()
+    result = None
+    try:
+        async with span("run", kind="run", run_id=run_id, thread_id=thread_id):
+            result = await graph.ainvoke({}, config=run_config(thread_id, configurable))
+        insight = result.get("psych_insight")
+        final_reel = result.get("final_reel")
+        run.title = getattr(insight, "concept_title", None)
+        run.final_reel_path = getattr(final_reel, "final_reel_path", None)
+        run.ok = True
+    except Exception as e:
+        run.error = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    finally:
+        # Topic write-through upserts still in flight would be cancelled with the loop
+        await flush_services(FLUSHED_SERVICES)
+    run.seconds = time.perf_counter() - started
+    run.timing = write_timing_report(result, run_id)
+    print(f"[batch] {thread_id} {'done' if run.ok else 'FAILED'} in {run.seconds:.1f}s: "
+          f"{run.title or run.error}")
+    return run
+
+
+async def run_batch(
+    graph,
+    count: int,
+    concurrency: int = 2,
+    thread_prefix: str = "short-batch",
+    configurable: Optional[Dict[str, Any]] = None,
+) -> BatchReport:
+    """Produce `count` shorts, at most `concurrency` in flight, each on its own thread_id.
+
+    Models, clients and the HTTP pool are process-wide lazy services, and every short's
+    stages draw from the same ResourceScheduler, so per-stage limits hold across the batch.
+    """
+    batch_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+    gate = asyncio.Semaphore(concurrency)
+
+    async def gated(i: int) -> ShortRun:
+        async with gate:
+            return await run_one(graph, f"{thread_prefix}-{batch_id}-{i}", configurable)
+
+    started = time.perf_counter()
+    report = BatchReport(runs=await asyncio.gather(*(gated(i) for i in range(count))))
+    report.seconds = time.perf_counter() - started
+    return report
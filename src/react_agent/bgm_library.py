@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import shutil
+import asyncio
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyloudnorm as pyln
+from dotenv import load_dotenv
+
+from react_agent.audio_ducking import decode_audio
+from react_agent.structures import BGMTrack
+
+load_dotenv()
+
+BGM_LIBRARY_PATH = os.environ.get('BGM_LIBRARY_PATH', os.path.join('my_test_files', 'bgm_library'))
+
+ANALYSIS_SAMPLE_RATE = 22050
+LOUDNESS_SAMPLE_RATE = 48000
+ENVELOPE_WINDOW_SECONDS = 1.0
+TEMPO_HOP = 512
+MIN_BPM, MAX_BPM = 60.0, 200.0
+
+# Level of the BGM bed before ducking; roughly what the old fixed 0.35 volume
+# produced on a typical -14 LUFS Bensound master
+DEFAULT_TARGET_LUFS = -23.0
+MAX_BGM_GAIN = 4.0
+
+
+def frame_rms(samples: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """RMS of each frame of a mono signal, vectorised with a strided view"""
+    if samples.size < frame_length:
+        samples = np.pad(samples, (0, frame_length - samples.size))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_length)[::hop_length]
+    return np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+
+
+def energy_envelope(samples: np.ndarray, sample_rate: int, window_seconds: float = ENVELOPE_WINDOW_SECONDS) -> np.ndarray:
+    """Per-window RMS level in dBFS"""
+    window = max(1, int(sample_rate * window_seconds))
+    rms = frame_rms(samples, window, window)
+    return 20 * np.log10(np.maximum(rms, 1e-6))
+
+
+def estimate_tempo(samples: np.ndarray, sample_rate: int, hop_length: int = TEMPO_HOP) -> Optional[float]:
+    """Estimate tempo from the autocorrelation of a log-energy onset envelope"""
+    rms = frame_rms(samples, hop_length * 2, hop_length)
+    onset = np.maximum(np.diff(np.log(rms + 1e-6)), 0.0)
+    if onset.size < 4 or not onset.any():
+        return None
+    onset = onset - onset.mean()
+
+    # Autocorrelation through the FFT, zero-padded to avoid wrap-around
+    n = 1 << int(np.ceil(np.log2(2 * onset.size)))
+    spectrum = np.fft.rfft(onset, n)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), n)[:onset.size]
+
+    frames_per_second = sample_rate / hop_length
+    min_lag = int(frames_per_second * 60 / MAX_BPM)
+    max_lag = min(int(frames_per_second * 60 / MIN_BPM), autocorr.size - 1)
+    if max_lag <= min_lag:
+        return None
+    lag = min_lag + int(np.argmax(autocorr[min_lag:max_lag + 1]))
+    return round(60.0 * frames_per_second / lag, 1)
+
+
+def analyse_track(path: str) -> Dict:
+    """Compute duration, integrated loudness, tempo and energy envelope for one file"""
+    stereo = decode_audio(path, LOUDNESS_SAMPLE_RATE, channels=2)
+    duration = stereo.shape[0] / LOUDNESS_SAMPLE_RATE
+    integrated_lufs = float(pyln.Meter(LOUDNESS_SAMPLE_RATE).integrated_loudness(stereo.astype(np.float64)))
+    if not np.isfinite(integrated_lufs):
+        integrated_lufs = -70.0  # digital silence
+    del stereo
+
+    mono = decode_audio(path, ANALYSIS_SAMPLE_RATE, channels=1)[:, 0]
+    envelope = energy_envelope(mono, ANALYSIS_SAMPLE_RATE)
+    return {
+        "duration_seconds": round(duration, 3),
+        "integrated_lufs": round(integrated_lufs, 2),
+        "tempo_bpm": estimate_tempo(mono, ANALYSIS_SAMPLE_RATE),
+        "energy_envelope": [round(float(v), 2) for v in envelope],
+        "envelope_window_seconds": ENVELOPE_WINDOW_SECONDS,
+    }
+
+
+def mood_tags(text: str) -> List[str]:
+    return [t for t in re.split(r"[^a-z0-9]+", (text or "").lower()) if t]
+
+
+def track_id_for(source: str) -> str:
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+class BGMLibrary:
+    """Local store of analysed background music tracks.
+
+    Tracks are copied into the library directory once, analysed once, and described in
+    a JSON index that is kept in memory for lookups.
+    """
+
+    def __init__(self, root: str = BGM_LIBRARY_PATH):
+        self.root = root
+        self.index_path = os.path.join(root, "library.json")
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._tracks: Dict[str, BGMTrack] = self._load_index()
+
+    def _load_index(self) -> Dict[str, BGMTrack]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        tracks = {}
+        for entry in entries:
+            track = BGMTrack(**entry)
+            if os.path.exists(track.file_path):
+                tracks[track.track_id] = track
+        return tracks
+
+    def _save_index(self) -> None:
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump([t.model_dump() for t in self._tracks.values()], f, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def get(self, track_id: str) -> Optional[BGMTrack]:
+        return self._tracks.get(track_id)
+
+    def get_by_url(self, source_url: str) -> Optional[BGMTrack]:
+        return self._tracks.get(track_id_for(source_url))
+
+    def add_track(
+        self,
+        audio_path: str,
+        title: str,
+        source_url: Optional[str] = None,
+        composer: Optional[str] = None,
+        description: Optional[str] = None,
+        attribution_text: Optional[str] = None,
+        moods: Optional[List[str]] = None,
+    ) -> BGMTrack:
+        """Copy a downloaded track into the library and analyse it (blocking)"""
+        track_id = track_id_for(source_url or os.path.abspath(audio_path))
+        existing = self._tracks.get(track_id)
+        if existing:
+            return self._merge_moods(existing, moods)
+
+        ext = os.path.splitext(audio_path)[1] or ".mp3"
+        library_path = os.path.abspath(os.path.join(self.root, f"{track_id}{ext}"))
+        if os.path.abspath(audio_path) != library_path:
+            shutil.copy2(audio_path, library_path)
+
+        print(f"[INFO] Analysing BGM track '{title}'...")
+        analysis = analyse_track(library_path)
+        track = BGMTrack(
+            track_id=track_id,
+            title=title,
+            composer=composer,
+            description=description,
+            source_url=source_url,
+            file_path=library_path,
+            attribution_text=attribution_text,
+            moods=sorted(set(moods or [])),
+            **analysis,
+        )
+        with self._lock:
+            self._tracks[track_id] = track
+            self._save_index()
+        print(f"[INFO] Added '{title}' to BGM library: {track.duration_seconds:.1f}s, "
+              f"{track.integrated_lufs:.1f} LUFS, {track.tempo_bpm} BPM")
+        return track
+
+    async def aadd_track(self, audio_path: str, title: str, **kwargs) -> BGMTrack:
+        return await asyncio.to_thread(self.add_track, audio_path, title, **kwargs)
+
+    def _merge_moods(self, track: BGMTrack, moods: Optional[List[str]]) -> BGMTrack:
+        merged = sorted(set(track.moods) | set(moods or []))
+        if merged != track.moods:
+            with self._lock:
+                track.moods = merged
+                self._save_index()
+        return track
+
+    def find(
+        self,
+        mood: Optional[str] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        limit: int = 5,
+    ) -> List[Tuple[BGMTrack, float]]:
+        """Tracks that cover the duration window, ranked by overlap with the mood tags.
+
+        Returns (track, score) pairs; with a mood given, tracks sharing no tag are dropped.
+        """
+        wanted = set(mood_tags(mood)) if mood else set()
+        results = []
+        for track in self._tracks.values():
+            if min_duration is not None and track.duration_seconds < min_duration:
+                continue
+            if max_duration is not None and track.duration_seconds > max_duration:
+                continue
+            if wanted:
+                overlap = len(wanted & set(track.moods))
+                if not overlap:
+                    continue
+                score = overlap / len(wanted)
+            else:
+                score = 1.0
+            results.append((track, score))
+        # Prefer the best mood match, then the shortest track; every result already covers
+        # min_duration, so with one given this is the track closest to the requested length
+        results.sort(key=lambda item: (-item[1], item[0].duration_seconds))
+        return results[:limit]
+
+    @staticmethod
+    def gain_for(track: BGMTrack, target_lufs: float = DEFAULT_TARGET_LUFS) -> float:
+        """Linear volume factor that brings the track to the target loudness"""
+        gain = 10 ** ((target_lufs - track.integrated_lufs) / 20)
+        return float(min(gain, MAX_BGM_GAIN))
+
+
+_library: Optional[BGMLibrary] = None
+
+
+def get_bgm_library() -> BGMLibrary:
+    global _library
+    if _library is None:
+        _library = BGMLibrary()
+    return _library
@@ -0,0 +1,175 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+
+# text-embedding-004 accepts up to 100 texts per batchEmbedContents request
+DENSE_BATCH_SIZE = 100
+SPARSE_BATCH_SIZE = 256
+UPLOAD_BATCH_SIZE = 256
+UPLOAD_PARALLEL = 4
+
+
+@dataclass
+class LoadStats:
+    points: int = 0
+    dense_seconds: float = 0.0
+    sparse_seconds: float = 0.0
+    upload_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def points_per_sec(self) -> float:
+        return self.points / self.total_seconds if self.total_seconds else 0.0
+
+    def add(self, other: "LoadStats") -> None:
+        self.points += other.points
+        self.dense_seconds += other.dense_seconds
+        self.sparse_seconds += other.sparse_seconds
+        self.upload_seconds += other.upload_seconds
+        self.total_seconds += other.total_seconds
+
+    def summary(self) -> str:
+        return (f"{self.points} points in {self.total_seconds:.1f}s ({self.points_per_sec:.1f} points/s; "
+                f"dense {self.dense_seconds:.1f}s, sparse {self.sparse_seconds:.1f}s, upload {self.upload_seconds:.1f}s)")
+
+
+class BulkLoader:
+    """Bulk ingestion into the hybrid collection, bypassing QdrantVectorStore.add_documents.
+
+    Dense vectors are embedded in provider-maximum batches while BM25 sparse vectors are
+    computed locally by FastEmbed at the same time. The points are then sent with
+    `upload_points` using parallel workers and wait=False. The payload layout matches
+    QdrantVectorStore, so the stored points can be searched through the vector store.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        dense_embeddings,
+        sparse_embeddings=None,
+        vector_name: str = "dense",
+        sparse_vector_name: str = "sparse",
+        content_payload_key: str = "page_content",
+        metadata_payload_key: str = "metadata",
+        dense_batch_size: int = DENSE_BATCH_SIZE,
+        sparse_parallel: Optional[int] = 0,
+        upload_batch_size: int = UPLOAD_BATCH_SIZE,
+        upload_parallel: int = UPLOAD_PARALLEL,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.dense_embeddings = dense_embeddings
+        # FastEmbedSparse whose model is reused; None = the shared sparse_bm25 service
+        self.sparse_embeddings = sparse_embeddings
+        self.vector_name = vector_name
+        self.sparse_vector_name = sparse_vector_name
+        self.content_payload_key = content_payload_key
+        self.metadata_payload_key = metadata_payload_key
+        self.dense_batch_size = dense_batch_size
+        # FastEmbed: 0 = one worker process per core, None = in-process
+        self.sparse_parallel = sparse_parallel
+        self.upload_batch_size = upload_batch_size
+        self.upload_parallel = upload_parallel
+        self.stats = LoadStats()
+
+    @classmethod
+    def from_vector_store(cls, vector_store: QdrantVectorStore, **kwargs) -> "BulkLoader":
+        return cls(
+            client=vector_store.client,
+            collection_name=vector_store.collection_name,
+            dense_embeddings=vector_store.embeddings,
+            vector_name=vector_store.vector_name,
+            sparse_vector_name=vector_store.sparse_vector_name,
+            content_payload_key=vector_store.content_payload_key,
+            metadata_payload_key=vector_store.metadata_payload_key,
+            **kwargs
+        )
+
+    @property
+    def sparse_model(self):
+        """The FastEmbed model behind sparse_embeddings, so BM25 is loaded once per process"""
+        if self.sparse_embeddings is None:
+            from react_agent.qdrant_db import sparse_embeddings
+            self.sparse_embeddings = sparse_embeddings
+        return self.sparse_embeddings._model
+
+    def embed_dense(self, texts: List[str]) -> List[List[float]]:
+        return self.dense_embeddings.embed_documents(texts, batch_size=self.dense_batch_size)
+
+    def embed_sparse(self, texts: List[str]) -> List[models.SparseVector]:
+        return [
+            models.SparseVector(indices=e.indices.tolist(), values=e.values.tolist())
+            for e in self.sparse_model.embed(texts, batch_size=SPARSE_BATCH_SIZE, parallel=self.sparse_parallel)
+        ]
+
+    def load(self, documents: List[Document], ids: List[str]) -> LoadStats:
+        """Embed and upload documents; returns the stats for this call"""
+        stats = LoadStats(points=len(documents))
+        if not documents:
+            return stats
+        started = time.perf_counter()
+        texts = [doc.page_content for doc in documents]
+
+        def timed(fn, attr):
+            t0 = time.perf_counter()
+            result = fn(texts)
+            setattr(stats, attr, time.perf_counter() - t0)
+            return result
+
+        # Dense embedding is network-bound and sparse embedding is CPU-bound, so overlap them
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            dense_future = pool.submit(timed, self.embed_dense, "dense_seconds")
+            sparse_future = pool.submit(timed, self.embed_sparse, "sparse_seconds")
+            dense, sparse = dense_future.result(), sparse_future.result()
+
+        points = [
+            models.PointStruct(
+                id=point_id,
+                vector={self.vector_name: dense_vector, self.sparse_vector_name: sparse_vector},
+                payload={self.content_payload_key: doc.page_content, self.metadata_payload_key: doc.metadata},
+            )
+            for point_id, doc, dense_vector, sparse_vector in zip(ids, documents, dense, sparse)
+        ]
+
+        t0 = time.perf_counter()
+        # Each call starts its own upload workers; for a single batch they only add startup cost
+        self.client.upload_points(
+            collection_name=self.collection_name,
+            points=points,
+            batch_size=self.upload_batch_size,
+            parallel=1 if len(points) <= self.upload_batch_size else self.upload_parallel,
+            max_retries=3,
+            wait=False,
+        )
+        stats.upload_seconds = time.perf_counter() - t0
+        stats.total_seconds = time.perf_counter() - started
+        self.stats.add(stats)
+        return stats
+
+    async def aload(self, documents: List[Document], ids: List[str]) -> LoadStats:
+        return await asyncio.to_thread(self.load, documents, ids)
+
+    def delete(self, ids: List[str]) -> None:
+        if ids:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=ids),
+                wait=False,
+            )
+
+    def delete_source(self, source: str) -> None:
+        """Remove every point of one book, e.g. one indexed before IDs were deterministic"""
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(filter=models.Filter(must=[
+                models.FieldCondition(key=f"{self.metadata_payload_key}.source", match=models.MatchValue(value=source))
+            ])),
+            wait=True,
+        )
@@ -18,7 +18,10 @@ from react_agent import prompts
 class BaseConfiguration:
     """Base configuration class for indexing, retrieval, and agent operations."""
 
-    user_id: str = field(metadata={"description": "Unique identifier for the user."})
+    user_id: str = field(
+        default="default-user",
+        metadata={"description": "Unique identifier for the user."},
+    )
 
     embedding_model: Annotated[
         str,
@@ -121,4 +124,38 @@ class Configuration(BaseConfiguration):
         metadata={
             "description": "The language model used for processing and refining queries. Should be in the form: provider/model-name."
         },
-    )
\ No newline at end of file
+    )
+
+    single_pass_assembly: bool = field(
+        default=False,
+        metadata={
+            "description": "Render the final reel in one ffmpeg pass (concat, caption burn-in, BGM ducking) instead of concatenating, captioning and mixing in separate encodes."
+        },
+    )
+
+    ducking_mode: Literal["sidechain", "envelope"] = field(
+        default="sidechain",
+        metadata={
+            "description": "How BGM is ducked under narration: ffmpeg sidechaincompress at render time, or a gain envelope precomputed from the word timestamps and mixed in NumPy."
+        },
+    )
+    section_streaming: bool = field(
+        default=False,
+        metadata={
+            "description": "Run TTS, clip download and rendering as one pipeline per section (concurrent, resource-scheduled) instead of finishing each stage for all sections before the next."
+        },
+    )
+
+    topic_retrieval_budget_s: float = field(
+        default=8.0,
+        metadata={
+            "description": "Latency budget (seconds) for retrieving book context before topic generation; on timeout the topic is generated without it."
+        },
+    )
+
+    topic_context_tokens: int = field(
+        default=3000,
+        metadata={
+            "description": "Maximum tokens of retrieved book passages added to the topic generation prompt."
+        },
+    )
@@ -0,0 +1,251 @@
+import asyncio
+from dataclasses import dataclass, asdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from react_agent.qdrant_db import (
+    llm,
+    tokenizer,
+    print_status,
+    MAX_CONTEXT_TOKENS,
+    SAFETY_BUFFER,
+)
+from react_agent.token_index import TokenIndex
+
+ENRICHMENT_MODES = ("full", "cached", "hierarchical")
+
+# Explicit context caching needs a pinned model version and a minimum cache size
+CACHE_MODEL_NAME = "gemini-2.0-flash-001"
+CACHE_MIN_TOKENS = 32768
+CACHE_TTL_SECONDS = 3600
+
+SECTION_CHUNKS = 12        # chunks summarised together in hierarchical mode
+NEIGHBOUR_CHUNKS = 1       # chunks of raw text included on each side
+SUMMARY_CONCURRENCY = 4
+
+ENRICH_INSTRUCTIONS = """
+        Provide concise context (1-2 sentences):
+        1. This chunk's role in the complete work
+        2. Key connections to other sections
+        3. Important details from adjacent sections
+
+        Output in one concise paragraph.
+        """
+
+
+@dataclass
+class TokenLedger:
+    """Token accounting for one book's enrichment"""
+    mode: str
+    calls: int = 0
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    cache_write_tokens: int = 0
+    summary_calls: int = 0
+
+    def record(self, response, summary: bool = False) -> None:
+        usage = getattr(response, "usage_metadata", None) or {}
+        details = usage.get("input_token_details") or {}
+        self.input_tokens += usage.get("input_tokens", 0)
+        self.output_tokens += usage.get("output_tokens", 0)
+        self.cached_input_tokens += details.get("cache_read", 0)
+        if summary:
+            self.summary_calls += 1
+        else:
+            self.calls += 1
+
+    @property
+    def billed_input_tokens(self) -> int:
+        return self.input_tokens - self.cached_input_tokens
+
+    def report(self) -> Dict:
+        data = asdict(self)
+        data["billed_input_tokens"] = self.billed_input_tokens
+        data["input_tokens_per_chunk"] = round(self.input_tokens / self.calls) if self.calls else 0
+        return data
+
+
+class BookEnricher:
+    """Generates the contextual blurb for each chunk of one book.
+
+    Modes:
+      full          resend the (truncated) whole book with every chunk, as enrich_chunk does
+      cached        upload the book once as Vertex cached content; each call sends only the chunk
+      hierarchical  book summary + a summary of the chunk's section + neighbouring chunks
+    """
+
+    def __init__(
+        self,
+        full_text: Optional[str],
+        filename: str,
+        chunk_texts: List[str],
+        mode: str = "full",
+        book_summary: Optional[str] = None,
+        index: Optional[TokenIndex] = None,
+        chunk_tokens: Optional[List[int]] = None,
+    ):
+        if mode not in ENRICHMENT_MODES:
+            raise ValueError(f"Unknown enrichment mode '{mode}', expected one of {ENRICHMENT_MODES}")
+        self.full_text = full_text
+        self.filename = filename
+        self.chunk_texts = chunk_texts
+        self.mode = mode
+        self.book_summary = book_summary
+        self.index = index
+        self.chunk_tokens = chunk_tokens
+        self.ledger = TokenLedger(mode=mode)
+        self._llm = llm
+        self._cache = None
+        self._context_text: Optional[str] = None
+        self._section_summaries: List[str] = []
+        self._prepared = False
+        self._prepare_lock = asyncio.Lock()
+
+    @property
+    def total_chunks(self) -> int:
+        return len(self.chunk_texts)
+
+    def _truncate(self, max_tokens: int) -> str:
+        if self.index is None:
+            self.index = TokenIndex(self.full_text, tokenizer)
+        return self.index.truncate(max_tokens)
+
+    async def prepare(self) -> None:
+        """One-off per-book work: the cache upload or the section summaries.
+
+        Called on the first enrich(), so books whose chunks are all known skip it.
+        """
+        async with self._prepare_lock:
+            if not self._prepared:
+                await self._prepare()
+                self._prepared = True
+
+    async def _prepare(self) -> None:
+        if self.mode == "cached":
+            await self._create_cache()  # may fall back to "full"
+        if self.mode == "full":
+            # Truncated once per book rather than once per chunk
+            if self.chunk_tokens is None:
+                self.chunk_tokens = [len(tokenizer.encode(c)) for c in self.chunk_texts]
+            chunk_budget = max(self.chunk_tokens, default=0)
+            available_tokens = int(MAX_CONTEXT_TOKENS * SAFETY_BUFFER) - chunk_budget - 500
+            self._context_text = self._truncate(available_tokens)
+        elif self.mode == "hierarchical":
+            await self._summarise_sections()
+
+    async def _create_cache(self) -> None:
+        """Upload the book as cached content; switches to "full" if it is too small or the upload fails"""
+        available_tokens = int(MAX_CONTEXT_TOKENS * SAFETY_BUFFER)
+        context_text = self._truncate(available_tokens)
+        book_tokens = self.index.count(0, len(context_text))
+        if book_tokens < CACHE_MIN_TOKENS:
+            print_status(f"{self.filename}: {book_tokens} tokens is below the cache minimum, sending inline")
+            self.mode = self.ledger.mode = "full"
+            return
+
+        def create():
+            from vertexai.generative_models import Content, Part
+            from vertexai.preview import caching
+
+            return caching.CachedContent.create(
+                model_name=CACHE_MODEL_NAME,
+                system_instruction="You explain where excerpts fit within the book provided as context.",
+                contents=[Content(role="user", parts=[Part.from_text(context_text)])],
+                ttl=timedelta(seconds=CACHE_TTL_SECONDS),
+                display_name=f"enrich-{self.filename}"[:120],
+            )
+
+        print_status(f"Uploading {self.filename} ({book_tokens} tokens) to the context cache...")
+        try:
+            from langchain_google_vertexai import ChatVertexAI
+
+            self._cache = await asyncio.to_thread(create)
+            self._llm = ChatVertexAI(model_name=CACHE_MODEL_NAME, temperature=0, cached_content=self._cache.name)
+        except Exception as e:
+            print_status(f"Context cache for {self.filename} failed ({e}), sending the book inline")
+            self.mode = self.ledger.mode = "full"
+            return
+        self._context_text = context_text
+        self.ledger.cache_write_tokens = book_tokens
+
+    async def _summarise_sections(self) -> None:
+        semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+        async def summarise(start: int) -> str:
+            section_text = "\n".join(self.chunk_texts[start:start + SECTION_CHUNKS])
+            prompt = f"""
+            BOOK SECTION:
+            {section_text}
+
+            Summarise this section in 3-4 sentences: its main argument, key concepts and examples.
+            """
+            async with semaphore:
+                response = await llm.ainvoke(prompt)
+            self.ledger.record(response, summary=True)
+            return response.content.strip()
+
+        starts = range(0, self.total_chunks, SECTION_CHUNKS)
+        print_status(f"Summarising {len(starts)} sections of {self.filename}...")
+        self._section_summaries = await asyncio.gather(*(summarise(s) for s in starts))
+
+    def _prompt(self, chunk_num: int) -> str:
+        chunk_text = self.chunk_texts[chunk_num - 1]
+        if self.mode == "cached":
+            return f"""
+        The complete book is in the cached context.
+
+        CURRENT CHUNK:
+        {chunk_text}
+        {ENRICH_INSTRUCTIONS}"""
+
+        if self.mode == "full":
+            return f"""
+        DOCUMENT CONTEXT:
+        {self._context_text}
+
+        ---
+        CURRENT CHUNK:
+        {chunk_text}
+        {ENRICH_INSTRUCTIONS}"""
+
+        idx = chunk_num - 1
+        section = idx // SECTION_CHUNKS
+        before = "\n".join(self.chunk_texts[max(0, idx - NEIGHBOUR_CHUNKS):idx])
+        after = "\n".join(self.chunk_texts[idx + 1:idx + 1 + NEIGHBOUR_CHUNKS])
+        return f"""
+        BOOK SUMMARY:
+        {self.book_summary or "Not available"}
+
+        SECTION SUMMARY (chunks {section * SECTION_CHUNKS + 1}-{min((section + 1) * SECTION_CHUNKS, self.total_chunks)}):
+        {self._section_summaries[section]}
+
+        PRECEDING TEXT:
+        {before or "(start of book)"}
+
+        FOLLOWING TEXT:
+        {after or "(end of book)"}
+
+        ---
+        CURRENT CHUNK:
+        {chunk_text}
+        {ENRICH_INSTRUCTIONS}"""
+
+    async def enrich(self, chunk_num: int) -> str:
+        await self.prepare()
+        print_status(f"Processing chunk {chunk_num}/{self.total_chunks} ({self.mode})")
+        response = await self._llm.ainvoke(self._prompt(chunk_num))
+        self.ledger.record(response)
+        return response.content.strip()
+
+    async def close(self) -> Dict:
+        """Release the cache and return the token report"""
+        if self._cache is not None:
+            try:
+                await asyncio.to_thread(self._cache.delete)
+            except Exception as e:
+                print_status(f"Could not delete context cache for {self.filename}: {e}")
+            self._cache = None
+        report = self.ledger.report()
+        print_status(f"Token usage for {self.filename}: {report}")
+        return report
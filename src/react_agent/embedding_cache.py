@@ -0,0 +1,205 @@
+import os
+import re
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH', os.path.join('my_test_files', 'embedding_cache'))
+INITIAL_ROWS = 1024
+
+
+class EmbeddingStore:
+    """Persistent float32 vectors keyed by (model key, text hash).
+
+    A SQLite table maps each key to a row of a per-model memory-mapped .f32 file, so
+    lookups read vectors straight from the page cache and never deserialise JSON.
+    """
+
+    def __init__(self, root: str = EMBEDDING_CACHE_PATH):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER, rows INTEGER)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (model TEXT, text_hash TEXT, row INTEGER, PRIMARY KEY (model, text_hash))"
+        )
+        self._db.commit()
+        self._arrays: Dict[str, np.memmap] = {}
+
+    def _path(self, model: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", model) + ".f32")
+
+    def _model_info(self, model: str) -> Optional[Tuple[int, int]]:
+        row = self._db.execute("SELECT dim, rows FROM models WHERE model = ?", (model,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _array(self, model: str, dim: int, min_rows: int = 0) -> np.memmap:
+        """The model's memmap, grown (by doubling) to hold at least min_rows vectors"""
+        array = self._arrays.get(model)
+        if array is not None and array.shape[0] >= min_rows:
+            return array
+        path = self._path(model)
+        capacity = os.path.getsize(path) // (4 * dim) if os.path.exists(path) else 0
+        if capacity < max(min_rows, 1):
+            new_capacity = max(INITIAL_ROWS, capacity)
+            while new_capacity < min_rows:
+                new_capacity *= 2
+            if array is not None:
+                array.flush()
+            with open(path, "ab") as f:
+                f.truncate(new_capacity * dim * 4)
+            capacity = new_capacity
+        array = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        self._arrays[model] = array
+        return array
+
+    def _rows(self, model: str, hashes: List[str]) -> Dict[str, int]:
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            found.update(self._db.execute(
+                f"SELECT text_hash, row FROM vectors WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                (model, *batch)
+            ).fetchall())
+        return found
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            info = self._model_info(model)
+            if info is None or not hashes:
+                return {}
+            dim, rows = info
+            found = self._rows(model, hashes)
+            if not found:
+                return {}
+            array = self._array(model, dim, rows)
+            return {h: np.array(array[row]) for h, row in found.items()}
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            vectors = np.asarray(list(items.values()), dtype=np.float32)
+            info = self._model_info(model)
+            dim, rows = info if info else (vectors.shape[1], 0)
+            if vectors.shape[1] != dim:
+                raise ValueError(f"{model} vectors have dim {vectors.shape[1]}, cache has {dim}")
+
+            existing = self._rows(model, list(items))
+            assignments = []
+            next_row = rows
+            for h in items:
+                if h in existing:
+                    assignments.append(existing[h])
+                else:
+                    assignments.append(next_row)
+                    next_row += 1
+
+            array = self._array(model, dim, next_row)
+            array[assignments] = vectors
+            array.flush()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vectors (model, text_hash, row) VALUES (?, ?, ?)",
+                [(model, h, row) for h, row in zip(items, assignments)]
+            )
+            self._db.execute("INSERT OR REPLACE INTO models (model, dim, rows) VALUES (?, ?, ?)", (model, dim, next_row))
+            self._db.commit()
+
+    def count(self, model: Optional[str] = None) -> int:
+        with self._lock:
+            if model is None:
+                return self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM vectors WHERE model = ?", (model,)).fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Drop-in wrapper that serves repeat texts from an EmbeddingStore.
+
+    Documents and queries are cached under separate keys because providers such as
+    Google embed them with different task types; an explicit task_type is part of the key too.
+    """
+
+    def __init__(self, inner: Embeddings, model_name: Optional[str] = None, store: Optional[EmbeddingStore] = None):
+        self.inner = inner
+        self.model_name = model_name or getattr(inner, "model", None) or type(inner).__name__
+        self.store = store or get_embedding_store()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _key(self, kind: str) -> str:
+        return f"{self.model_name}:{kind}"
+
+    @staticmethod
+    def _kind(kind: str, kwargs: Dict) -> str:
+        return f"{kind}:{kwargs['task_type']}" if kwargs.get("task_type") else kind
+
+    def _lookup(self, kind: str, texts: List[str]) -> Tuple[List[str], Dict[str, np.ndarray], List[Tuple[str, str]]]:
+        hashes = [self._hash(t) for t in texts]
+        cached = self.store.get_many(self._key(kind), list(dict.fromkeys(hashes)))
+        missing: Dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached:
+                missing.setdefault(h, text)
+        self.hits += len(texts) - sum(h not in cached for h in hashes)
+        self.misses += len(missing)
+        return hashes, cached, list(missing.items())
+
+    def _merge(self, kind: str, hashes, cached, missing, vectors) -> List[List[float]]:
+        fresh = {h: v for (h, _), v in zip(missing, vectors)}
+        self.store.put_many(self._key(kind), fresh)
+        return [cached[h].tolist() if h in cached else list(fresh[h]) for h in hashes]
+
+    def embed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        kind = self._kind("document", kwargs)
+        hashes, cached, missing = self._lookup(kind, texts)
+        vectors = self.inner.embed_documents([t for _, t in missing], **kwargs) if missing else []
+        return self._merge(kind, hashes, cached, missing, vectors)
+
+    def embed_query(self, text: str, **kwargs) -> List[float]:
+        kind = self._kind("query", kwargs)
+        hashes, cached, missing = self._lookup(kind, [text])
+        vectors = [self.inner.embed_query(text, **kwargs)] if missing else []
+        return self._merge(kind, hashes, cached, missing, vectors)[0]
+
+    async def aembed_documents(self, texts: List[str], **kwargs) -> List[List[float]]:
+        kind = self._kind("document", kwargs)
+        hashes, cached, missing = await asyncio.to_thread(self._lookup, kind, texts)
+        vectors = await self.inner.aembed_documents([t for _, t in missing], **kwargs) if missing else []
+        return await asyncio.to_thread(self._merge, kind, hashes, cached, missing, vectors)
+
+    async def aembed_query(self, text: str, **kwargs) -> List[float]:
+        kind = self._kind("query", kwargs)
+        hashes, cached, missing = await asyncio.to_thread(self._lookup, kind, [text])
+        vectors = [await self.inner.aembed_query(text, **kwargs)] if missing else []
+        return (await asyncio.to_thread(self._merge, kind, hashes, cached, missing, vectors))[0]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict:
+        return {"model": self.model_name, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hit_rate, 3), "cached_vectors": self.store.count()}
+
+
+_store: Optional[EmbeddingStore] = None
+
+
+def get_embedding_store() -> EmbeddingStore:
+    global _store
+    if _store is None:
+        _store = EmbeddingStore()
+    return _store
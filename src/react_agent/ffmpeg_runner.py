@@ -0,0 +1,211 @@
+"""ffmpeg as an asyncio subprocess, with live progress, timeouts and cancellation.
+
+    progress = await run_node(out_node, timeout=600, on_progress=log_progress("concat", duration))
+
+ffmpeg is started with `-progress pipe:1`, so stdout carries key=value blocks (frame, fps,
+out_time_us, total_size, speed, progress=continue|end) that are parsed as they arrive.
+stderr is drained concurrently into a ring buffer of its last lines, which is attached to
+the raised FFmpegError. On timeout, or when the awaiting task is cancelled, ffmpeg is
+terminated (then killed after KILL_GRACE_SECONDS) so no orphaned encode keeps the CPU busy.
+The child is reaped with os.wait4, and its own CPU time is charged to the current span.
+"""
+import os
+import time
+import signal
+import asyncio
+import threading
+import subprocess
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterable, List, Optional, Tuple
+
+import ffmpeg
+
+from react_agent.instrumentation import charge_subprocess
+
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+# Seconds before a single ffmpeg invocation is killed; 0 disables the timeout
+FFMPEG_TIMEOUT = float(os.environ.get('FFMPEG_TIMEOUT', 900))
+STDERR_LINES = 200
+KILL_GRACE_SECONDS = 5.0
+STREAM_LIMIT = 1 << 20  # filter graphs are echoed on one stderr line and can be long
+
+
+@dataclass
+class FFmpegProgress:
+    """Latest -progress block of a running ffmpeg"""
+    frame: int = 0
+    fps: float = 0.0
+    speed: Optional[float] = None
+    out_time_s: float = 0.0
+    total_size: int = 0
+    done: bool = False
+
+    def update(self, block: dict) -> None:
+        self.frame = _to_int(block.get("frame"), self.frame)
+        self.fps = _to_float(block.get("fps"), self.fps)
+        self.total_size = _to_int(block.get("total_size"), self.total_size)
+        out_time_us = _to_int(block.get("out_time_us"), None)
+        if out_time_us is not None:
+            self.out_time_s = out_time_us / 1e6
+        speed = block.get("speed", "").rstrip("x").strip()
+        self.speed = _to_float(speed, self.speed)
+        self.done = block.get("progress") == "end"
+
+    def percent(self, duration: Optional[float]) -> Optional[float]:
+        if not duration:
+            return None
+        return min(100.0, 100.0 * self.out_time_s / duration)
+
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_float(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class FFmpegError(ffmpeg.Error):
+    """Non-zero exit of ffmpeg; `stderr` holds the tail of its log.
+
+    Subclasses ffmpeg.Error so existing `except ffmpeg.Error` handlers keep working.
+    """
+
+    def __init__(self, cmd: List[str], returncode: Optional[int], stderr_tail: Iterable[str], message: Optional[str] = None):
+        self.returncode = returncode
+        self.stderr_tail = list(stderr_tail)
+        super().__init__(cmd[0], None, "\n".join(self.stderr_tail).encode("utf-8"))
+        self.args = (message or f"ffmpeg exited with code {returncode}",)
+        self.cmd = cmd
+
+
+class FFmpegTimeout(FFmpegError):
+    pass
+
+
+def log_progress(label: str, duration: Optional[float] = None, every: float = 5.0) -> Callable[[FFmpegProgress], None]:
+    """on_progress callback printing at most one line per `every` seconds"""
+    last = [0.0]
+
+    def report(progress: FFmpegProgress) -> None:
+        now = time.monotonic()
+        if not progress.done and now - last[0] < every:
+            return
+        last[0] = now
+        pct = progress.percent(duration)
+        done = f"{pct:.0f}% " if pct is not None else ""
+        speed = f"{progress.speed:.2f}x" if progress.speed is not None else "?"
+        print(f"[ffmpeg] {label}: {done}out_time={progress.out_time_s:.1f}s fps={progress.fps:.1f} speed={speed}")
+    return report
+
+
+def _wait4(pid: int) -> asyncio.Future:
+    """Reap `pid` in a dedicated thread; resolves to (returncode, rusage of that child alone).
+
+    Until the future resolves the child is at worst a zombie, so its pid can still be signalled.
+    """
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+
+    def wait() -> None:
+        _, status, usage = os.wait4(pid, 0)
+        try:
+            loop.call_soon_threadsafe(exited.set_result, (os.waitstatus_to_exitcode(status), usage))
+        except RuntimeError:  # the loop closed first
+            pass
+
+    threading.Thread(target=wait, name=f"ffmpeg-wait-{pid}", daemon=True).start()
+    return exited
+
+
+async def _pipe_reader(pipe) -> Tuple[asyncio.StreamReader, asyncio.ReadTransport]:
+    reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+    transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return reader, transport
+
+
+async def _stop(pid: int, exited: asyncio.Future) -> None:
+    if exited.done():
+        return
+    os.kill(pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(asyncio.shield(exited), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        os.kill(pid, signal.SIGKILL)
+        await exited
+
+
+async def run_ffmpeg_args(
+    args: List[str],
+    timeout: Optional[float] = FFMPEG_TIMEOUT,
+    on_progress: Optional[Callable[[FFmpegProgress], None]] = None,
+    binary: str = FFMPEG_BINARY,
+    stderr_lines: int = STDERR_LINES,
+) -> FFmpegProgress:
+    """Run ffmpeg with `args` (everything after the binary name) and return its final progress.
+
+    Raises FFmpegError on a non-zero exit and FFmpegTimeout after `timeout` seconds;
+    cancelling the awaiting task stops ffmpeg before CancelledError propagates.
+    """
+    cmd = [binary, "-hide_banner", "-nostats", "-progress", "pipe:1", *args]
+    # Popen rather than asyncio's subprocess: asyncio's child watcher reaps with waitpid,
+    # which discards the child's rusage. The pid is only ever reaped by _wait4.
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    exited = _wait4(process.pid)
+    stdout, stdout_transport = await _pipe_reader(process.stdout)
+    stderr, stderr_transport = await _pipe_reader(process.stderr)
+    progress = FFmpegProgress()
+    stderr_tail: Deque[str] = deque(maxlen=stderr_lines)
+    returncode = None
+
+    async def read_progress() -> None:
+        block = {}
+        async for raw in stdout:
+            key, _, value = raw.decode("utf-8", errors="replace").strip().partition("=")
+            block[key] = value
+            if key == "progress":
+                progress.update(block)
+                block = {}
+                if on_progress is not None:
+                    on_progress(progress)
+
+    async def read_stderr() -> None:
+        async for raw in stderr:
+            stderr_tail.append(raw.decode("utf-8", errors="replace").rstrip())
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(read_progress(), read_stderr(), asyncio.shield(exited)),
+            timeout=timeout or None,
+        )
+    except asyncio.TimeoutError:
+        await _stop(process.pid, exited)
+        raise FFmpegTimeout(cmd, exited.result()[0], stderr_tail, f"ffmpeg timed out after {timeout:.0f}s") from None
+    except BaseException:  # cancelled, or a pipe read failed
+        await _stop(process.pid, exited)
+        raise
+    finally:
+        if exited.done():
+            returncode, usage = exited.result()
+            process.returncode = returncode
+            charge_subprocess(usage.ru_utime + usage.ru_stime)
+        stdout_transport.close()
+        stderr_transport.close()
+
+    if returncode != 0:
+        raise FFmpegError(cmd, returncode, stderr_tail)
+    return progress
+
+
+async def run_node(out_node, **kwargs) -> FFmpegProgress:
+    """run_ffmpeg_args for an ffmpeg-python output node (always overwriting the output)"""
+    args = ffmpeg.compile(out_node, cmd=kwargs.get("binary", FFMPEG_BINARY), overwrite_output=True)[1:]
+    return await run_ffmpeg_args(args, **kwargs)
@@ -25,13 +25,13 @@ from langgraph.types import interrupt, Command
 from langgraph.constants import START, END
 
 from langchain_deepseek import ChatDeepSeek
-from langchain_groq import ChatGroq
 
 from react_agent.configuration import Configuration
-from react_agent.state import InputState, State
+from react_agent.state import InputState, State, replace_sections, section_items
 from react_agent.structures import *
 from react_agent.qdrant_db import TopicVectorStore, topic_store
-from react_agent.handle_shorts_upload import youtube_upload_short
+from react_agent.topic_context import retrieve_topic_context
+from react_agent.prompts import BOOK_CONTEXT_PROMPT
 from react_agent.utils import (
     load_chat_model,
     videoscript_to_text,
@@ -49,33 +49,47 @@ from react_agent.pexels_handler import pexels, search_and_validate_videos
 from react_agent.handle_bensound_free import (
     BensoundScraper, 
     fetch_track, 
-    download_track_with_selenium, 
+    download_track_async, 
     add_bgm_to_narrated_video_async
 )
 
+from react_agent.bgm_library import get_bgm_library, mood_tags
+from react_agent.audio_ducking import render_ducked_mix_async, speech_segments_from_subtitles
+from react_agent.services import register
+from react_agent.section_pipeline import run_section_pipeline
+from react_agent.stage_cache import memoize_node, file_fingerprint, dir_fingerprint
+from react_agent.instrumentation import traced_node, attach_report, current_run_id
+
 from react_agent.video_editor import (
     BASE_VIDEOS_PATH,
     OUTPUT_DIR_BASE,
     SECTION_ORDER,
+    REEL_WIDTH,
+    REEL_HEIGHT,
     get_duration,
     apply_segment_effects,
     create_reel_for_audio,
     concatenate_sections,
+    concatenate_section_audio,
+    assemble_final_reel,
+    RENDER_PARAMS,
 )
 
 load_dotenv()
-video_captioner = VideoCaptioner()
+# Whisper and the chat client are built on first use, so importing the graph stays cheap
+video_captioner = register("video_captioner", VideoCaptioner)
 
-os.makedirs(os.environ.get('BASE_VIDEOS_PATH'), exist_ok=True)
-os.makedirs(os.environ.get('OUTPUT_DIR_BASE'), exist_ok=True)
-os.makedirs(os.environ.get('BASE_SCRIPT_PATH'), exist_ok=True)
+os.makedirs(os.environ.get('BASE_VIDEOS_PATH', 'videos'), exist_ok=True)
+os.makedirs(os.environ.get('OUTPUT_DIR_BASE', 'outputs'), exist_ok=True)
+os.makedirs(os.environ.get('BASE_SCRIPT_PATH', 'scripts'), exist_ok=True)
 
 
-model = ChatDeepSeek(model='deepseek-chat', temperature=0.7)
+model = register("deepseek_chat", lambda: ChatDeepSeek(model='deepseek-chat', temperature=0.7))
 
 
-async def topic_data_generator(state: State) -> dict:
-    psych_gen_prompt = Configuration.psych_gen_prompt
+async def topic_data_generator(state: State, config: RunnableConfig) -> dict:
+    configuration = Configuration.from_runnable_config(config)
+    psych_gen_prompt = configuration.psych_gen_prompt
     base_system_msg = (
         "You are a ruthless expert in real-world psychology, influence, and manipulation, "
         "trained to uncover deep, rarely-discussed tactics that give people real leverage in chaotic environments. "
@@ -85,6 +99,17 @@ async def topic_data_generator(state: State) -> dict:
     prior_titles = [entry.concept_title for entry in state.previous_topics] if state.previous_topics else []
     print(f"\n [INFO] PRIOR TITLES: {prior_titles} \n")
     retry_attempts = 3
+    near_misses = []
+
+    # Ground the concept in the ingested book corpus; bounded so a slow search can't stall the run
+    queries, book_context = await retrieve_topic_context(
+        model,
+        prior_titles,
+        budget_s=configuration.topic_retrieval_budget_s,
+        max_tokens=configuration.topic_context_tokens,
+    )
+    if book_context:
+        psych_gen_prompt += BOOK_CONTEXT_PROMPT.format(book_context=book_context)
 
     for attempt in range(retry_attempts):
         retry_info = ""
@@ -93,6 +118,11 @@ async def topic_data_generator(state: State) -> dict:
                 f"\nAvoid these previously generated topics: {', '.join(prior_titles)}.\n"
                 "Avoid previously discussed topics. Focus on deeply overlooked, radically novel psychological angles that are rarely touched in popular content."
             )
+        if near_misses:
+            retry_info += (
+                f"\nYour last idea was too close to these existing topics (similarity in brackets): {'; '.join(near_misses)}.\n"
+                "Pick a clearly different mechanism, not a rewording of these."
+            )
 
         # Trim conversation messages
         trimmed_messages = trim_messages(
@@ -122,14 +152,16 @@ async def topic_data_generator(state: State) -> dict:
 
         print(f"\n[INFO] Title: {insight.concept_title}  \n")
 
-        # Check for duplication
-        is_duplicate, match_title = await topic_store.is_duplicate(insight)
-        if not is_duplicate:
-            await topic_store.add_concept(insight)
+        # Check for duplication and store the topic if it's novel, with a single embedding
+        is_duplicate, nearest = await topic_store.check_and_add(insight)
+        if is_duplicate:
+            near_misses = [f"{title} ({score:.2f})" for title, score in nearest if title]
+        else:
             updated_topics = state.previous_topics + [insight] if state.previous_topics else [insight]
             return {
                 'psych_insight': insight,
-                'previous_topics': updated_topics
+                'previous_topics': updated_topics,
+                'queries': queries
             }
 
     raise ValueError(f"All {retry_attempts} attempts generated duplicate topics. "
@@ -226,12 +258,70 @@ async def revise_script(state: State) -> Dict[str, Any]:
     }
 
 
+# Stage-cache inputs: everything a node's artifacts depend on. A resumed or repeated run
+# with the same inputs reuses the recorded outputs instead of redoing TTS/downloads/renders.
+TTS_VOICE = "af_bella"
+# Downloaded clips live under <VISUALS_ROOT>/<title>/visuals in both media modes
+VISUALS_ROOT = "my_test_files/videos"
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.aac')
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
+
+
+def _script_inputs(state: State, configuration: Configuration) -> dict:
+    script = state.scripts[-1]
+    return {
+        "title": sanitize_filename(script.title),
+        "sections": [(s.section, s.text, s.visual.scene) for s in script.sections],
+        "voice": TTS_VOICE,
+    }
+
+
+def _media_inputs(state: State, configuration: Configuration) -> dict:
+    script_path = os.path.join(BASE_VIDEOS_PATH, sanitize_filename(state.scripts[-1].title))
+    return {
+        "audio": dir_fingerprint(os.path.join(script_path, 'audio'), AUDIO_EXTENSIONS),
+        "visuals": dir_fingerprint(os.path.join(script_path, 'visuals'), VIDEO_EXTENSIONS),
+        "render": RENDER_PARAMS,
+        "single_pass": configuration.single_pass_assembly,
+    }
+
+
+def _media_artifacts(update: dict) -> List[str]:
+    media = update["media_result"]
+    return [s.path for s in media.sections_created] + [media.final_reel_path]
+
+
+def _caption_inputs(state: State, configuration: Configuration) -> dict:
+    return {
+        "sections": [file_fingerprint(p) for p in ordered_section_paths(state.media_result)],
+        "reel": file_fingerprint(state.media_result.final_reel_path) if state.media_result.final_reel_path else None,
+        "single_pass": configuration.single_pass_assembly,
+    }
+
+
+def _bgm_inputs(state: State, configuration: Configuration) -> dict:
+    captioned = state.captioned_output
+    return {
+        "captioned": [file_fingerprint(p) for p in (captioned.captioned_video_path, captioned.subtitles_json_path,
+                                                    captioned.ass_subtitles_path) if p],
+        "sections": [file_fingerprint(p) for p in ordered_section_paths(state.media_result)],
+        "ducking_mode": configuration.ducking_mode,
+        "single_pass": configuration.single_pass_assembly,
+        "render": RENDER_PARAMS,
+    }
+
+
+@memoize_node(
+    "get_videos", _script_inputs,
+    artifacts=lambda update: [v.file_path for v in section_items(update["videos"])],
+    cacheable=lambda update: not section_items(update["failed_sections"]),
+)
 async def get_videos(state: State) -> dict:
     """Search Pexels for videos matching each visual scene and download multiple validated videos with metadata."""
     latest_script_obj = state.scripts[-1]
     safe_title = sanitize_filename(latest_script_obj.title)
 
-    video_dir = Path(f"my_test_files/videos/{safe_title}/")
+    video_dir = Path(VISUALS_ROOT) / safe_title
     video_dir.mkdir(parents=True, exist_ok=True)
 
     visuals_dir = video_dir / "visuals"
@@ -253,11 +343,15 @@ async def get_videos(state: State) -> dict:
         json.dump([v.model_dump(mode='json') for v in validated_videos], f, indent=4)
 
     return {
-        "videos": validated_videos,
-        "failed_sections": failed_sections
+        "videos": replace_sections(validated_videos),
+        "failed_sections": replace_sections(failed_sections)
     }
 
 
+@memoize_node(
+    "generate_audio", _script_inputs,
+    artifacts=lambda update: [m.file_path for m in section_items(update["audio_metadata"])],
+)
 async def generate_audio(state: State) -> dict:
     """Generates TTS audio for the latest script without duplication"""
     latest_script = state.scripts[-1]
@@ -266,17 +360,19 @@ async def generate_audio(state: State) -> dict:
     
     for section in latest_script.sections:
         print('\n [INFO] section', section.section, '\n')
-        meta = generate_tts(
+        # Kokoro is CPU-bound; keep it off the event loop so the parallel Pexels branch keeps downloading
+        meta = await asyncio.to_thread(
+            generate_tts,
             text=section.text,
             video_name=script_title,
             section=section.section,
-            voice="af_bella"
+            voice=TTS_VOICE
         )
         if meta:
             audio_segments.append(meta)
     
     return {
-        "audio_metadata": audio_segments
+        "audio_metadata": replace_sections(audio_segments)
     }
 
 
@@ -289,7 +385,9 @@ async def route_feedback(state: State):
         return 'revise_script'
 
 
-async def media_editor(state: State) -> EditMediaResult:
+@memoize_node("media_editor", _media_inputs, artifacts=_media_artifacts)
+async def media_editor(state: State, config: RunnableConfig) -> EditMediaResult:
+    configuration = Configuration.from_runnable_config(config)
     latest_script_obj = state.scripts[-1]
     safe_title = sanitize_filename(latest_script_obj.title)
 
@@ -396,6 +494,20 @@ async def media_editor(state: State) -> EditMediaResult:
             warnings.append(warning)
             processed_section_files_map[section_key] = None
 
+    return await finalize_media(
+        safe_title, output_script_root, processed_section_files_map, sections_created, warnings, configuration
+    )
+
+
+async def finalize_media(
+    safe_title: str,
+    output_script_root: str,
+    processed_section_files_map: Dict[str, Optional[str]],
+    sections_created: List[SectionOutput],
+    warnings: List[str],
+    configuration: Configuration,
+) -> dict:
+    """Concatenate rendered sections in SECTION_ORDER (unless single-pass assembly defers it)"""
     # Final Concatenation
     ordered_paths = []
     print(f"\nPreparing final reel for script '{safe_title}' based on order: {SECTION_ORDER}")
@@ -409,7 +521,9 @@ async def media_editor(state: State) -> EditMediaResult:
             warnings.append(msg)
 
     final_reel_path = None
-    if ordered_paths:
+    if ordered_paths and configuration.single_pass_assembly:
+        print("Single-pass assembly enabled, deferring concatenation to the final mux")
+    elif ordered_paths:
         final_name = "".join(c if c.isalnum() or c in ('_', '-') else '_' for c in safe_title)
         final_reel_path = os.path.join(output_script_root, f"{final_name}.mp4")
         await concatenate_sections(ordered_paths, final_reel_path)
@@ -430,8 +544,106 @@ async def media_editor(state: State) -> EditMediaResult:
     }
 
 
-async def add_captions(state: State) -> CaptionOutput:
+@memoize_node(
+    "section_pipeline",
+    lambda state, configuration: {**_script_inputs(state, configuration), "render": RENDER_PARAMS,
+                                  "single_pass": configuration.single_pass_assembly},
+    artifacts=lambda update: _media_artifacts(update) + [m.file_path for m in section_items(update["audio_metadata"])]
+                             + [v.file_path for v in section_items(update["videos"])],
+    cacheable=lambda update: not section_items(update["failed_sections"]) and not update["media_result"].warnings,
+)
+async def section_pipeline(state: State, config: RunnableConfig) -> dict:
+    """Streaming alternative to generate_audio + get_videos + media_editor.
+
+    Each section's TTS, clip download and render form an independent pipeline; sections
+    run concurrently under a ResourceScheduler, so a section renders as soon as its own
+    audio and clips are ready instead of after the slowest section's downloads.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    latest_script_obj = state.scripts[-1]
+    safe_title = sanitize_filename(latest_script_obj.title)
+    output_script_root = os.path.join(OUTPUT_DIR_BASE, safe_title)
+    intermediate_output_dir = os.path.join(output_script_root, "intermediate_sections")
+
+    results = await run_section_pipeline(
+        latest_script_obj, model, visuals_root=VISUALS_ROOT, voice=TTS_VOICE, output_dir=intermediate_output_dir
+    )
+
+    processed_section_files_map = {r.section_key: r.output.path if r.output else None for r in results}
+    sections_created = [r.output for r in results if r.output]
+    warnings = [r.warning for r in results if r.warning]
+    for warning in warnings:
+        print(warning)
+
+    update = await finalize_media(
+        safe_title, output_script_root, processed_section_files_map, sections_created, warnings, configuration
+    )
+    update.update({
+        "audio_metadata": replace_sections([r.audio for r in results if r.audio]),
+        "videos": replace_sections([v for r in results for v in r.videos]),
+        "failed_sections": replace_sections([f for r in results for f in r.failures]),
+    })
+    return update
+
+
+def route_media_mode(state: State, config: RunnableConfig) -> List[str]:
+    """Fan out to the stage-wise TTS + Pexels branches, or to the per-section pipeline"""
+    if Configuration.from_runnable_config(config).section_streaming:
+        return ["section_pipeline"]
+    return ["generate_audio", "get_videos"]
+
+
+def ordered_section_paths(media_result: EditMediaResult) -> List[str]:
+    """Section reels of a media result in SECTION_ORDER"""
+    by_key = {s.section_key: s.path for s in media_result.sections_created}
+    return [by_key[key] for key in SECTION_ORDER if key in by_key]
+
+
+async def prepare_single_pass_captions(state: State) -> Dict[str, Any]:
+    """Transcribe the joined section audio and write ASS captions for the final mux"""
+    latest_script_obj = state.scripts[-1]
+    safe_title = sanitize_filename(latest_script_obj.title)
+    output_dir = Path(os.path.join(OUTPUT_DIR_BASE, safe_title))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    section_paths = ordered_section_paths(state.media_result)
+    if not section_paths:
+        raise ValueError(f"No section reels available to caption for '{safe_title}'")
+
+    reel_audio = await concatenate_section_audio(section_paths, str(output_dir / f"{safe_title}_narration.m4a"))
+    subtitles_json = output_dir / f"{safe_title}.json"
+    subtitles_ass = output_dir / f"{safe_title}.ass"
+    final_video = output_dir / f"FINAL_CAPTIONED_{safe_title}.mp4"
+
+    print("[INFO] Generating word-level subtitles...")
+    word_segments = await video_captioner.generate_subtitles(str(reel_audio))
+    line_subtitles = await video_captioner.create_line_level_subtitles(word_segments)
+    await video_captioner.save_subtitles_to_json(line_subtitles, str(subtitles_json))
+    video_captioner.write_ass_subtitles(line_subtitles, str(subtitles_ass), (REEL_WIDTH, REEL_HEIGHT))
+    print(f"[INFO] Captions prepared for single-pass assembly: {subtitles_ass}")
+
+    captioned_output = CaptionOutput(
+        captioned_video_path=str(final_video),
+        subtitles_json_path=str(subtitles_json),
+        original_video_path=str(final_video),
+        audio_path=str(reel_audio),
+        ass_subtitles_path=str(subtitles_ass),
+        message="Captions will be burned in during final assembly"
+    )
+    return {'captioned_output': captioned_output}
+
+
+@memoize_node(
+    "add_captions", _caption_inputs,
+    artifacts=lambda update: [update["captioned_output"].captioned_video_path,
+                              update["captioned_output"].subtitles_json_path,
+                              update["captioned_output"].ass_subtitles_path],
+)
+async def add_captions(state: State, config: RunnableConfig) -> CaptionOutput:
     """Add captions to video and return structured output"""
+    configuration = Configuration.from_runnable_config(config)
+    if configuration.single_pass_assembly:
+        return await prepare_single_pass_captions(state)
 
     print(f"\n [INFO] Using captioner from state: {video_captioner} \n")
 
@@ -484,8 +696,42 @@ async def add_captions(state: State) -> CaptionOutput:
 
 
 
-async def get_and_join_bgm(state: State) -> FinalOutput:
+async def mix_bgm_into_captioned_reel(
+    captioned_reel_path, track_path, output_dir, bgm_volume, fade_duration,
+    duck_mode='sidechain', speech_segments=None
+) -> str:
+    base_name = os.path.basename(captioned_reel_path)
+    final_output_path = os.path.join(output_dir, f"FINAL_{base_name}")
+    print(f"\n [INFO] Final output video path: {final_output_path}\n")
+
+    try:
+        print("Starting ffmpeg processing to add BGM...")
+        return await add_bgm_to_narrated_video_async(
+            video_path=captioned_reel_path,
+            bgm_path=track_path,
+            output_path=final_output_path,
+            bgm_volume=bgm_volume,
+            fade_duration=fade_duration,
+            sc_threshold='-40dB',
+            sc_ratio=4,
+            sc_attack=200,
+            sc_release=1600,
+            sc_level_in=1,
+            sc_level_sc=1,
+            sc_makeup=1,
+            duck_mode=duck_mode,
+            speech_segments=speech_segments
+        )
+    except ffmpeg.Error as e:
+        error_msg = e.stderr.decode('utf8') if e.stderr else str(e)
+        print(f"FFmpeg processing failed: {error_msg}")
+        raise RuntimeError(f"FFmpeg processing failed: {error_msg}")
+
+
+@memoize_node("get_and_join_bgm", _bgm_inputs, artifacts=lambda update: [update["final_reel"].final_reel_path])
+async def get_and_join_bgm(state: State, config: RunnableConfig) -> FinalOutput:
     print("Starting get_and_join_bgm...")
+    configuration = Configuration.from_runnable_config(config)
 
     latest_script_obj = state.scripts[-1]
     reel_bgm_genre = latest_script_obj.background_music.music
@@ -498,96 +744,160 @@ async def get_and_join_bgm(state: State) -> FinalOutput:
     captioned_reel_path = latest_captioned_reel.captioned_video_path
     print(f"\nCaptioned reel path: {captioned_reel_path} ")
 
-    reel_duration = get_video_duration(captioned_reel_path)
+    if configuration.single_pass_assembly:
+        reel_duration = get_video_duration(latest_captioned_reel.audio_path)
+    else:
+        reel_duration = get_video_duration(captioned_reel_path)
     print(f"Video duration: {reel_duration:.2f} seconds")
 
-    bgm_volume = 0.35
     fade_duration = 1.0
+    bgm_library = get_bgm_library()
 
-    # general_bgm_genres = ['ambient piano', 'subtle piano', 'calm', 'ambient', 'chill', 'lofi']
-    # random_bgm_genre = random.choice(general_bgm_genres)
-    print(f"Selected random BGM genre: {reel_bgm_genre}")
-    # print(f"\nSelected random BGM genre: 'dark ambient'\n")
-
-    print("\nFetching tracks from Bensound...")
-    tracks_info_str, tracks_data = await fetch_track(
-        n_pages=2,
-        save_path=state.media_result.output_dir,
-        input_query=reel_bgm_genre
-    )
-    print(f"Number of tracks fetched: {len(tracks_data)}")
-
-    if not tracks_data:
-        print("No tracks found for selected genre")
-        raise ValueError("No tracks found for selected genre")
+    print(f"Selected BGM genre: {reel_bgm_genre}")
+    library_matches = bgm_library.find(mood=reel_bgm_genre, min_duration=reel_duration, limit=1)
 
-    print("Requesting model recommendation...")
-    model_recommendation = await model.with_structured_output(SelectedTrack).ainvoke(
-        f"Video duration: {reel_duration:.2f}s. Genre: '{reel_bgm_genre}'. "
-        f"Select a track (duration >= video) with matching mood:\n{tracks_info_str}"
-    )
-    print(f"Model recommended track index: {model_recommendation.track_index}")
-    print(f"Reason: {model_recommendation.recommendation_reason}")
-
-
-    selected_track = tracks_data[model_recommendation.track_index - 1]
-    print(f"Selected track title: {selected_track['title']}")
-
-    download_dir = os.path.abspath(state.media_result.output_dir)
-    os.makedirs(download_dir, exist_ok=True)
-    print(f"\nDownloading track to: {download_dir}\n")
-    attribution_text = download_track_with_selenium(selected_track["url"], download_dir)
-    print(f"Track downloaded successfully. \n")
-    selected_track_name = (selected_track['title']).strip().lower().replace(' ', '')
-    print(selected_track_name)
-    track_path = os.path.join(download_dir, f"{selected_track_name}.mp3")
+    if library_matches:
+        bgm_track, match_score = library_matches[0]
+        print(f"Using BGM library track '{bgm_track.title}' (mood match {match_score:.2f}), skipping Bensound")
+        track_index = 1
+        recommendation_reason = f"Matched '{reel_bgm_genre}' in the local BGM library"
+    else:
+        print("\nFetching tracks from Bensound...")
+        tracks_info_str, tracks_data = await fetch_track(
+            n_pages=2,
+            save_path=state.media_result.output_dir,
+            input_query=reel_bgm_genre
+        )
+        print(f"Number of tracks fetched: {len(tracks_data)}")
 
-    base_name = os.path.basename(captioned_reel_path)
-    final_output_path = os.path.join(
-        state.media_result.output_dir,
-        f"FINAL_{base_name}"
-    )
-    print(f"\n [INFO] Final output video path: {final_output_path}\n")
+        if not tracks_data:
+            print("No tracks found for selected genre")
+            raise ValueError("No tracks found for selected genre")
 
-    try:
-        print("Starting ffmpeg processing to add BGM...")
-        final_output_path = await add_bgm_to_narrated_video_async(
-            video_path=captioned_reel_path,
+        print("Requesting model recommendation...")
+        model_recommendation = await model.with_structured_output(SelectedTrack).ainvoke(
+            f"Video duration: {reel_duration:.2f}s. Genre: '{reel_bgm_genre}'. "
+            f"Select a track (duration >= video) with matching mood:\n{tracks_info_str}"
+        )
+        print(f"Model recommended track index: {model_recommendation.track_index}")
+        print(f"Reason: {model_recommendation.recommendation_reason}")
+        track_index = model_recommendation.track_index
+        recommendation_reason = model_recommendation.recommendation_reason
+
+        # The recommended track first; the others are fallbacks if it can't be downloaded
+        bgm_track = None
+        candidates = [track_index] + [i for i in range(1, len(tracks_data) + 1) if i != track_index]
+        for candidate_index in candidates:
+            selected_track = tracks_data[candidate_index - 1]
+            print(f"Selected track title: {selected_track['title']}")
+
+            bgm_track = bgm_library.get_by_url(selected_track["url"])
+            if bgm_track is not None:
+                print(f"Track '{bgm_track.title}' already in BGM library, skipping download")
+                break
+
+            download_dir = os.path.abspath(state.media_result.output_dir)
+            os.makedirs(download_dir, exist_ok=True)
+            print(f"\nDownloading track to: {download_dir}\n")
+            selected_track_name = (selected_track['title']).strip().lower().replace(' ', '')
+            print(selected_track_name)
+            downloaded_path, attribution_text = await download_track_async(
+                selected_track["url"],
+                download_dir,
+                filename=f"{selected_track_name}.mp3"
+            )
+            if downloaded_path is None:
+                print(f"Could not download '{selected_track['title']}', trying the next track")
+                continue
+            print(f"Track downloaded successfully. \n")
+            bgm_track = await bgm_library.aadd_track(
+                downloaded_path,
+                selected_track['title'],
+                source_url=selected_track['url'],
+                composer=selected_track['composer'],
+                description=selected_track['description'],
+                attribution_text=attribution_text,
+                moods=mood_tags(reel_bgm_genre),
+            )
+            break
+
+        if bgm_track is not None and candidate_index != track_index:
+            track_index = candidate_index
+            recommendation_reason = "Fallback: the recommended track could not be downloaded"
+        if bgm_track is None:
+            # Nothing downloadable: any library track long enough beats failing the run
+            fallback = bgm_library.find(min_duration=reel_duration, limit=1)
+            if not fallback:
+                raise RuntimeError("No Bensound track could be downloaded and the BGM library has no fallback")
+            bgm_track = fallback[0][0]
+            recommendation_reason = "Fallback: no Bensound track could be downloaded, using library track"
+            print(f"Using BGM library track '{bgm_track.title}' as a fallback")
+
+    track_path = bgm_track.file_path
+    attribution_text = bgm_track.attribution_text
+    bgm_volume = bgm_library.gain_for(bgm_track)
+    print(f"BGM loudness {bgm_track.integrated_lufs:.1f} LUFS -> volume {bgm_volume:.3f}")
+
+    speech_segments = None
+    if configuration.ducking_mode == 'envelope' and latest_captioned_reel.subtitles_json_path:
+        with open(latest_captioned_reel.subtitles_json_path, 'r') as f:
+            speech_segments = speech_segments_from_subtitles(json.load(f))
+        print(f"Ducking BGM with a precomputed envelope over {len(speech_segments)} speech segments")
+
+    if configuration.single_pass_assembly:
+        mixed_audio_path = None
+        if configuration.ducking_mode == 'envelope':
+            mixed_audio_path = await render_ducked_mix_async(
+                latest_captioned_reel.audio_path,
+                track_path,
+                os.path.join(state.media_result.output_dir, "final_mix.wav"),
+                speech_segments=speech_segments,
+                bgm_volume=bgm_volume,
+                fade_duration=fade_duration
+            )
+        final_output_path = await assemble_final_reel(
+            section_files=ordered_section_paths(state.media_result),
+            subtitles_path=latest_captioned_reel.ass_subtitles_path,
             bgm_path=track_path,
-            output_path=final_output_path,
+            output_path=captioned_reel_path,
+            fontsdir=video_captioner.ass_font()[1],
             bgm_volume=bgm_volume,
             fade_duration=fade_duration,
             sc_threshold='-40dB',
             sc_ratio=4,
             sc_attack=200,
             sc_release=1600,
-            sc_level_in=1,
-            sc_level_sc=1,
-            sc_makeup=1
+            sc_makeup=1,
+            mixed_audio_path=mixed_audio_path
+        )
+        if final_output_path is None:
+            raise RuntimeError("Single-pass final assembly failed")
+    else:
+        final_output_path = await mix_bgm_into_captioned_reel(
+            captioned_reel_path, track_path, state.media_result.output_dir, bgm_volume, fade_duration,
+            duck_mode=configuration.ducking_mode, speech_segments=speech_segments
         )
-        # print("FFmpeg processing completed successfully")
-    except ffmpeg.Error as e:
-        error_msg = e.stderr.decode('utf8') if e.stderr else str(e)
-        print(f"FFmpeg processing failed: {error_msg}")
-        raise RuntimeError(f"FFmpeg processing failed: {error_msg}")
 
     final_output = FinalOutput(
         final_reel_path=final_output_path,
         original_reel_path=captioned_reel_path,
         track_info=SelectedTrack(
-            track_index=model_recommendation.track_index,
-            track_title=selected_track['title'],
-            track_composer=selected_track['composer'],
-            track_description=selected_track['description'],
-            track_duration=str(selected_track['duration']),
-            track_duration_seconds=model_recommendation.track_duration_seconds,
-            track_url=selected_track['url'],
-            recommendation_reason=model_recommendation.recommendation_reason,
+            track_index=track_index,
+            track_title=bgm_track.title,
+            track_composer=bgm_track.composer or "",
+            track_description=bgm_track.description or "",
+            track_duration=str(int(round(bgm_track.duration_seconds))),
+            track_duration_seconds=bgm_track.duration_seconds,
+            track_url=bgm_track.source_url or "",
+            recommendation_reason=recommendation_reason,
             download_path=track_path,
             attribution_text=attribution_text
         ),
         processing_metadata={
             'bgm_volume': bgm_volume,
+            'bgm_integrated_lufs': bgm_track.integrated_lufs,
+            'bgm_tempo_bpm': bgm_track.tempo_bpm,
+            'ducking_mode': configuration.ducking_mode,
             'fade_duration': fade_duration,
             'original_audio_present': True  # Assuming video has audio if narration volume is used
         },
@@ -595,19 +905,22 @@ async def get_and_join_bgm(state: State) -> FinalOutput:
         audio_volume=bgm_volume
     )
 
-    # state.final_reel = final_output
-
-    # Save final output JSON
-    # json_path = os.path.join(state.media_result.output_dir, "final_output.json")
-    # with open(json_path, "w", encoding="utf-8") as f:
-    #     json.dump(final_output.dict(), f, indent=4)
-    # print(f"Final output JSON saved to: {json_path}")
+    # Save final output JSON, with the timing report of the run so far (main.py refreshes
+    # it once the run, including the upload, has finished)
+    json_path = os.path.join(state.media_result.output_dir, "final_output.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(final_output.model_dump(mode="json"), f, indent=4)
+    if current_run_id():
+        attach_report(json_path, current_run_id())
+    print(f"Final output JSON saved to: {json_path}")
 
     print("\nFINAL OUTPUT METADATA: \n", final_output.dict(), '\n')
     return {"final_reel": final_output}
 
 
 async def upload_short(state: State) -> State:
+    from react_agent.handle_shorts_upload import youtube_upload_short
+
     short: PsychologyShort = state.psych_insight
     final: FinalOutput = state.final_reel
 
@@ -659,17 +972,18 @@ async def upload_short(state: State) -> State:
 builder = StateGraph(State, input=InputState, config_schema=Configuration)
 
 # Add all nodes including the new audio generation
-builder.add_node('script_generator', script_generator)
+builder.add_node('script_generator', traced_node('script_generator', script_generator))
 # builder.add_node('request_feedback', request_feedback)
 # builder.add_node('revise_script', revise_script)
 # builder.add_node('route_feedback', route_feedback)
-builder.add_node('get_videos', get_videos)
-builder.add_node('generate_audio', generate_audio)  # New audio generation node
-builder.add_node('media_editor', media_editor)
-builder.add_node('add_captions', add_captions)
-builder.add_node('get_and_join_bgm', get_and_join_bgm)
-builder.add_node('topic_data_generator', topic_data_generator)
-builder.add_node("upload_short", upload_short)
+builder.add_node('get_videos', traced_node('get_videos', get_videos))
+builder.add_node('generate_audio', traced_node('generate_audio', generate_audio))  # New audio generation node
+builder.add_node('media_editor', traced_node('media_editor', media_editor))
+builder.add_node('section_pipeline', traced_node('section_pipeline', section_pipeline))
+builder.add_node('add_captions', traced_node('add_captions', add_captions))
+builder.add_node('get_and_join_bgm', traced_node('get_and_join_bgm', get_and_join_bgm))
+builder.add_node('topic_data_generator', traced_node('topic_data_generator', topic_data_generator))
+builder.add_node('upload_short', traced_node('upload_short', upload_short))
 
 
 # Define workflow structure
@@ -677,7 +991,9 @@ builder.add_edge(START, "topic_data_generator")
 
 builder.add_edge('topic_data_generator', "script_generator")
 # builder.add_edge("script_generator", "request_feedback")
-builder.add_edge("script_generator", "generate_audio")
+# TTS (CPU) and Pexels acquisition (network) are independent: fan out, then join before editing,
+# or chain them per section when section_streaming is on
+builder.add_conditional_edges("script_generator", route_media_mode, ["generate_audio", "get_videos", "section_pipeline"])
 
 # builder.add_conditional_edges(
 #     'request_feedback',
@@ -688,15 +1004,13 @@ builder.add_edge("script_generator", "generate_audio")
 #     }
 # )
 
-# Connect the audio generation to video fetching
-builder.add_edge("generate_audio", "get_videos")
-
 # # Loop back for revisions
 # builder.add_edge("revise_script", "request_feedback")
 
-# Final edge after video generation
-builder.add_edge("get_videos", 'media_editor')
+# media_editor waits for both branches
+builder.add_edge(["generate_audio", "get_videos"], 'media_editor')
 builder.add_edge('media_editor', 'add_captions')
+builder.add_edge('section_pipeline', 'add_captions')
 
 builder.add_edge('add_captions', 'get_and_join_bgm')
 builder.add_edge('get_and_join_bgm', 'upload_short')
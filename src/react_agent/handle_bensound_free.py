@@ -1,16 +1,24 @@
 import asyncio
 import aiohttp
+import atexit
+import random
 import requests
 from bs4 import BeautifulSoup
+from dataclasses import dataclass
 from urllib.parse import urljoin, urlencode
 import os
+import threading
 import time
 import re
 
 import ffmpeg
-import asyncio
+
+from react_agent.audio_ducking import render_ducked_mix
+from react_agent.instrumentation import span, traced
+from react_agent.ffmpeg_runner import log_progress, run_node
 
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service as ChromeService
@@ -19,20 +27,76 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
 
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+BENSOUND_BASE_URL = os.environ.get('BENSOUND_BASE_URL', 'https://www.bensound.com')
+
+
+@dataclass
+class CrawlStats:
+    pages: int = 0
+    tracks: int = 0
+    failed_requests: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tracks_per_sec(self) -> float:
+        return self.tracks / self.elapsed if self.elapsed > 0 else 0.0
+
+
 class BensoundScraper:
-    def __init__(self, search_terms, base_url="https://www.bensound.com", sort="relevance"):
+    def __init__(
+        self,
+        search_terms,
+        base_url=BENSOUND_BASE_URL,
+        sort="relevance",
+        max_concurrency: int = 8,
+        limit_per_host: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        request_timeout: float = 20.0,
+    ):
         self.base_url = base_url.rstrip("/")
         self.search_terms = search_terms
         self.sort = sort
         self.tracks = []
 
+        self.max_concurrency = max_concurrency
+        self.limit_per_host = limit_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.request_timeout = request_timeout
+        self.stats = CrawlStats()
+        self._semaphore = None
+
         tags = search_terms.split()
         tag_params = [("tag[]", tag) for tag in tags]
         self.search_url = f"{self.base_url}/royalty-free-music?" + urlencode(tag_params + [("type", "free"), ("sort", sort)])
 
-    def get_total_pages(self):
-        response = requests.get(self.search_url)
-        soup = BeautifulSoup(response.text, "html.parser")
+    def _build_session(self) -> aiohttp.ClientSession:
+        """One keep-alive connection pool shared by every page and track request"""
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    @staticmethod
+    def _parse_total_pages(html):
+        soup = BeautifulSoup(html, HTML_PARSER)
         pagination = soup.select("a.pagination-link")
         if pagination:
             try:
@@ -41,13 +105,51 @@ class BensoundScraper:
                 return 1
         return 1
 
+    def get_total_pages(self):
+        response = requests.get(self.search_url)
+        return self._parse_total_pages(response.text)
+
+    async def get_total_pages_async(self, session):
+        html = await self.fetch(session, self.search_url)
+        if html is None:
+            return 1
+        return self._parse_total_pages(html)
+
     async def fetch(self, session, url):
-        async with session.get(url) as response:
-            return await response.text()
+        """GET a page under the concurrency limit, retrying transient failures with backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self._semaphore is None:
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                async with self._semaphore:
+                    async with session.get(url) as response:
+                        if response.status in RETRYABLE_STATUSES:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history,
+                                status=response.status, message=response.reason or ""
+                            )
+                        response.raise_for_status()
+                        return await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = getattr(e, "status", None)
+                if status is not None and status not in RETRYABLE_STATUSES:
+                    print(f"Request to {url} failed with status {status}, not retrying")
+                    break
+                if attempt == self.max_retries:
+                    print(f"Giving up on {url} after {attempt + 1} attempts: {e}")
+                    break
+                delay = self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+                print(f"Retrying {url} in {delay:.2f}s ({attempt + 1}/{self.max_retries}): {e}")
+                await asyncio.sleep(delay)
+
+        self.stats.failed_requests += 1
+        return None
 
     async def extract_track_details(self, session, track_url):
         html = await self.fetch(session, track_url)
-        soup = BeautifulSoup(html, "html.parser")
+        if html is None:
+            return None
+        soup = BeautifulSoup(html, HTML_PARSER)
 
         try:
             # Title
@@ -79,7 +181,9 @@ class BensoundScraper:
 
     async def extract_tracks_from_page(self, session, page_url):
         html = await self.fetch(session, page_url)
-        soup = BeautifulSoup(html, "html.parser")
+        if html is None:
+            return []
+        soup = BeautifulSoup(html, HTML_PARSER)
 
         # Find all containers that hold track links
         track_containers = soup.select("div.grid-container.result-container.px-5")
@@ -98,136 +202,382 @@ class BensoundScraper:
 
 
     async def scrape_pages(self, max_pages=1):
-        async with aiohttp.ClientSession() as session:
+        async with self._build_session() as session:
             for page in range(1, max_pages + 1):
                 page_url = f"{self.search_url}/{page}"
                 print(f"Scraping page {page}: {page_url}")
                 page_tracks = await self.extract_tracks_from_page(session, page_url)
                 self.tracks.extend([track for track in page_tracks if track])
 
+    async def crawl(self, max_pages=None) -> CrawlStats:
+        """Crawler mode: fetch every result page and track page concurrently over one connection pool.
+
+        The page count is capped by the site's pagination (and by `max_pages` if given).
+        Tracks are kept in page order and de-duplicated by URL.
+        """
+        self.stats = CrawlStats()
+        started = time.perf_counter()
+
+        async with self._build_session() as session:
+            total_pages = await self.get_total_pages_async(session)
+            n_pages = min(total_pages, max_pages) if max_pages else total_pages
+            page_urls = [f"{self.search_url}/{page}" for page in range(1, n_pages + 1)]
+            print(f"Crawling {n_pages} page(s) with concurrency={self.max_concurrency}, limit_per_host={self.limit_per_host}")
+
+            results = await asyncio.gather(
+                *(self.extract_tracks_from_page(session, url) for url in page_urls)
+            )
+
+        seen_urls = {track["url"] for track in self.tracks}
+        for page_tracks in results:
+            if page_tracks:
+                self.stats.pages += 1
+            for track in page_tracks:
+                if track and track["url"] not in seen_urls:
+                    seen_urls.add(track["url"])
+                    self.tracks.append(track)
+                    self.stats.tracks += 1
+
+        self.stats.elapsed = time.perf_counter() - started
+        print(
+            f"Crawled {self.stats.pages} page(s), {self.stats.tracks} track(s) in {self.stats.elapsed:.2f}s "
+            f"({self.stats.pages_per_sec:.2f} pages/s, {self.stats.tracks_per_sec:.2f} tracks/s, "
+            f"{self.stats.failed_requests} failed request(s))"
+        )
+        return self.stats
+
     def get_data(self):
         return self.tracks
 
 
-def download_track_with_selenium(track_url, download_dir):
-    song_name = track_url.rstrip('/').split('/')[-1].replace('-', '')
-    attribution_filename = os.path.join(download_dir, f"{song_name}.txt")
+ATTRIBUTION_WRAPPER_SELECTOR = "div.orfium-code-wrapper.is-flex.is-justify-content-space-between.is-align-items-center"
+ATTRIBUTION_TEXT_SELECTOR = "div.is-flex.is-flex-direction-column"
+MP3_URL_PATTERN = re.compile(r"""["'(]([^"'()\s]+?\.mp3(?:\?[^"'()\s]*)?)["')]""", re.IGNORECASE)
+PARTIAL_DOWNLOAD_SUFFIXES = (".crdownload", ".part", ".tmp")
+
+
+def _track_slug(track_url):
+    return track_url.rstrip('/').split('/')[-1]
 
+
+def _read_cached_attribution(attribution_filename):
     if os.path.exists(attribution_filename):
-        print(f"Attribution file already exists for '{song_name}'. Skipping download.")
         with open(attribution_filename, 'r', encoding='utf-8') as f:
             return f.read()
+    return None
+
+
+def _save_attribution(attribution_filename, attribution_text):
+    with open(attribution_filename, "w", encoding='utf-8') as f:
+        f.write(attribution_text)
+    print(f"Saved attribution to {attribution_filename}")
+
+
+def parse_track_download_info(html, track_url):
+    """Resolve the MP3 URL and attribution text from a track page without a browser.
+
+    Returns (mp3_url, attribution_text); either can be None if the page doesn't expose it.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    slug = _track_slug(track_url).lower()
+
+    candidates = []
+    for tag in soup.select("audio[src], audio source[src], [data-src], [data-url], [data-audio], a[href]"):
+        for attr in ("src", "data-src", "data-url", "data-audio", "href"):
+            value = tag.get(attr)
+            if value and ".mp3" in value.lower():
+                candidates.append(urljoin(track_url, value))
+    candidates.extend(urljoin(track_url, m) for m in MP3_URL_PATTERN.findall(html))
+
+    mp3_url = None
+    if candidates:
+        # Prefer the file that belongs to this track over any other player on the page
+        slug_compact = slug.replace('-', '')
+        matching = [c for c in candidates if slug_compact in c.lower().replace('-', '').replace('_', '')]
+        mp3_url = (matching or candidates)[0]
 
-    chrome_options = Options()
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "directory_upgrade": True,
-        "safebrowsing.enabled": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--window-size=1920,1080")
-
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=chrome_options)
-    driver.get(track_url)
-    print(f"Opened page: {track_url}")
+    attribution_text = None
+    wrapper = soup.select_one(ATTRIBUTION_WRAPPER_SELECTOR)
+    if wrapper:
+        text_div = wrapper.select_one(ATTRIBUTION_TEXT_SELECTOR)
+        if text_div:
+            lines = [div.get_text(strip=True) for div in text_div.find_all("div", recursive=False)]
+            attribution_text = "\n".join(line for line in lines if line) or None
 
+    return mp3_url, attribution_text
+
+
+async def _stream_to_file(session, url, output_path, chunk_size=1 << 16):
+    temp_path = f"{output_path}.part"
     try:
-        wait = WebDriverWait(driver, 20)
+        async with session.get(url) as response:
+            response.raise_for_status()
+            with open(temp_path, "wb") as f:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    f.write(chunk)
+    except BaseException:
+        # A leftover .part would look like a download in progress to the browser fallback
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+async def download_track_http(track_url, download_dir, filename=None, session=None):
+    """Download a track and its attribution over plain HTTP.
+
+    Returns (mp3_path, attribution_text). Raises LookupError when the page doesn't expose
+    a direct MP3 link or the attribution block, so the caller can fall back to a browser.
+    """
+    slug = _track_slug(track_url)
+    output_path = os.path.join(download_dir, filename or f"{slug.replace('-', '')}.mp3")
+    attribution_filename = os.path.join(download_dir, f"{slug.replace('-', '')}.txt")
+
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120))
+    try:
+        async with session.get(track_url) as response:
+            response.raise_for_status()
+            html = await response.text()
+
+        mp3_url, attribution_text = parse_track_download_info(html, track_url)
+        if mp3_url is None:
+            raise LookupError(f"No MP3 link found on {track_url}")
+        if attribution_text is None:
+            attribution_text = _read_cached_attribution(attribution_filename)
+        if attribution_text is None:
+            raise LookupError(f"No attribution text found on {track_url}")
+
+        if not os.path.exists(output_path):
+            print(f"Downloading {mp3_url} -> {output_path}")
+            await _stream_to_file(session, mp3_url, output_path)
+        _save_attribution(attribution_filename, attribution_text)
+        return output_path, attribution_text
+    finally:
+        if owns_session:
+            await session.close()
+
+
+def _partial_downloads(download_dir):
+    return [f for f in os.listdir(download_dir) if f.endswith(PARTIAL_DOWNLOAD_SUFFIXES)]
+
+
+def _completed_mp3s(download_dir):
+    return {f for f in os.listdir(download_dir) if f.lower().endswith(".mp3")}
+
+
+class BrowserPool:
+    """Reusable headless Chrome sessions for the pages that can't be handled over HTTP.
+
+    Drivers are started lazily, kept alive between tracks and handed out one at a time,
+    so the ChromeDriver install and browser startup are paid once per process.
+    """
+
+    def __init__(self, size: int = 1, wait_timeout: float = 20, download_timeout: float = 60):
+        self.size = size
+        self.wait_timeout = wait_timeout
+        self.download_timeout = download_timeout
+        self._idle = []
+        self._created = 0
+        self._lock = threading.Condition()
+        self._driver_path = None
+
+    def _new_driver(self):
+        if self._driver_path is None:
+            self._driver_path = ChromeDriverManager().install()
+
+        chrome_options = Options()
+        chrome_options.add_experimental_option("prefs", {
+            "download.prompt_for_download": False,
+            "directory_upgrade": True,
+            "safebrowsing.enabled": True
+        })
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--log-level=3")
+        chrome_options.add_argument("--window-size=1920,1080")
+        return webdriver.Chrome(service=ChromeService(self._driver_path), options=chrome_options)
+
+    def acquire(self):
+        with self._lock:
+            while not self._idle and self._created >= self.size:
+                self._lock.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return self._new_driver()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, driver, broken: bool = False):
+        with self._lock:
+            if broken:
+                self._created -= 1
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+            else:
+                self._idle.append(driver)
+            self._lock.notify()
+
+    def close(self):
+        with self._lock:
+            for driver in self._idle:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+            self._created -= len(self._idle)
+            self._idle.clear()
+
+    def download(self, track_url, download_dir):
+        """Click through the free-download flow and return the attribution text"""
+        driver = self.acquire()
+        broken = False
+        try:
+            return self._download_with_driver(driver, track_url, download_dir)
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def _download_with_driver(self, driver, track_url, download_dir):
+        # Point this (possibly reused) session at the requested directory
+        driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+        existing_mp3s = _completed_mp3s(download_dir)
+        existing_partials = set(_partial_downloads(download_dir))
+
+        driver.get(track_url)
+        print(f"Opened page: {track_url}")
+        wait = WebDriverWait(driver, self.wait_timeout)
 
-        # Accept cookies if button exists
         try:
-            settings_button = wait.until(EC.element_to_be_clickable(
+            settings_button = WebDriverWait(driver, 3).until(EC.element_to_be_clickable(
                 (By.CSS_SELECTOR, "button.button.is-outlined.cookies-consent-link")))
             settings_button.click()
-            print("Clicked 'Settings'")
-
             accept_button = wait.until(EC.element_to_be_clickable(
                 (By.CSS_SELECTOR, "button.submit-cookies-consent.cookies-accept-all")))
             accept_button.click()
             print("Accepted cookies")
-        except Exception:
+        except TimeoutException:
             print("Cookie popup not found or already accepted.")
 
-        # Click Free Download
         free_download_span = wait.until(EC.element_to_be_clickable(
             (By.XPATH, "//span[contains(text(),'Free download') and contains(@class, 'has-text-centered')]")))
         free_download_span.find_element(By.XPATH, "..").click()
         print("Clicked 'Free download'")
 
-        # Click Final Download Button
         download_button = wait.until(EC.element_to_be_clickable(
             (By.CSS_SELECTOR, "button.button.is-success.free-download.is-outlined.my-3.px-6.py-5.is-size-6.is-borderless.has-text-weight-bold")))
         download_button.click()
         print("Clicked 'Download music and get Attribution text'")
 
-        # Wait for file download
-        print("Waiting for download to complete...")
-        wait_time = 0
-        while wait_time < 60:
-            time.sleep(1)
-            wait_time += 1
-            if not any(f.endswith(".crdownload") or f.endswith(".part") for f in os.listdir(download_dir)):
-                break
-
-        print("Waiting a few seconds for attribution text to load...")
-        time.sleep(5)
+        # Finished as soon as a new MP3 is on disk and nothing this session started is still being written
+        WebDriverWait(driver, self.download_timeout, poll_frequency=0.2).until(
+            lambda _: (_completed_mp3s(download_dir) - existing_mp3s)
+            and not set(_partial_downloads(download_dir)) - existing_partials
+        )
+        print("Download complete")
 
-        # Extract attribution div
-        # Wait for attribution wrapper div to be present
-        attribution_wrapper = wait.until(EC.presence_of_element_located(
-            (By.CSS_SELECTOR, "div.orfium-code-wrapper.is-flex.is-justify-content-space-between.is-align-items-center")
-        ))
+        attribution_wrapper = wait.until(EC.visibility_of_element_located(
+            (By.CSS_SELECTOR, ATTRIBUTION_WRAPPER_SELECTOR)))
+        attribution_div = attribution_wrapper.find_element(By.CSS_SELECTOR, ATTRIBUTION_TEXT_SELECTOR)
+        wait.until(lambda _: any(div.text.strip() for div in attribution_div.find_elements(By.XPATH, "./div")))
+        div_texts = [div.text.strip() for div in attribution_div.find_elements(By.XPATH, "./div")]
+        attribution_text = "\n".join(div_texts)
 
-        # Find the inner column div containing the text blocks
-        attribution_div = attribution_wrapper.find_element(By.CSS_SELECTOR, "div.is-flex.is-flex-direction-column")
+        new_mp3s = sorted(_completed_mp3s(download_dir) - existing_mp3s)
+        return attribution_text, os.path.join(download_dir, new_mp3s[0]) if new_mp3s else None
 
-        # Extract all child div texts inside the attribution div
-        child_divs = attribution_div.find_elements(By.XPATH, "./div")
-        div_texts = [div.text.strip() for div in child_divs]
 
-        # Join all lines into one attribution text
-        attribution_text = "\n".join(div_texts)
+_browser_pool = None
 
-        print("==== Attribution Text Extracted ====")
-        print(attribution_text)
-        print("====================================")
 
-        # Extract license code robustly
-        import re
-        match = re.search(r"License code:\s*([A-Z0-9]+)", attribution_text)
-        license_code = match.group(1) if match else "Not found"
+def get_browser_pool(size: int = 1) -> BrowserPool:
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(size=size)
+        atexit.register(_browser_pool.close)
+    return _browser_pool
 
-        # Save attribution to file as before
-        with open(attribution_filename, "w", encoding='utf-8') as f:
-            f.write(attribution_text)
-            # f.write(f"Extracted License Code: {license_code}\n")
 
-        print(f"Saved attribution and license to {attribution_filename}")
+def download_track_with_selenium(track_url, download_dir):
+    song_name = _track_slug(track_url).replace('-', '')
+    attribution_filename = os.path.join(download_dir, f"{song_name}.txt")
 
-        # Return both separately
-        return attribution_text
+    cached = _read_cached_attribution(attribution_filename)
+    if cached is not None:
+        print(f"Attribution file already exists for '{song_name}'. Skipping download.")
+        return cached
 
+    try:
+        attribution_text, _ = get_browser_pool().download(track_url, download_dir)
     except Exception as e:
         print(f"Error during selenium interaction: {e}")
-        driver.save_screenshot("selenium_error.png")
         return "Error occurred."
-    finally:
-        driver.quit()
+
+    print("==== Attribution Text Extracted ====")
+    print(attribution_text)
+    print("====================================")
+    _save_attribution(attribution_filename, attribution_text)
+    return attribution_text
+
+
+@traced("bensound.download", kind="http")
+async def download_track_async(track_url, download_dir, filename=None, session=None):
+    """Download a track without blocking the event loop.
+
+    Tries plain HTTP first and only falls back to the pooled browser when the page
+    doesn't expose the MP3 link or attribution. Returns (mp3_path, attribution_text), or
+    (None, None) when neither way worked.
+    """
+    slug = _track_slug(track_url)
+    output_path = os.path.join(download_dir, filename or f"{slug.replace('-', '')}.mp3")
+    attribution_filename = os.path.join(download_dir, f"{slug.replace('-', '')}.txt")
+
+    cached = _read_cached_attribution(attribution_filename)
+    if cached is not None and os.path.exists(output_path):
+        print(f"Track '{slug}' already downloaded. Skipping download.")
+        return output_path, cached
+
+    try:
+        return await download_track_http(track_url, download_dir, filename=filename, session=session)
+    except (LookupError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"HTTP download unavailable for {track_url} ({e}); falling back to browser")
+
+    try:
+        attribution_text, downloaded_path = await asyncio.to_thread(get_browser_pool().download, track_url, download_dir)
+    except Exception as e:
+        print(f"Browser download failed for {track_url}: {e}")
+        return None, None
+    if not downloaded_path:
+        print(f"Browser download of {track_url} produced no MP3")
+        return None, None
+    if downloaded_path != output_path:
+        os.replace(downloaded_path, output_path)
+    _save_attribution(attribution_filename, attribution_text)
+    return output_path, attribution_text
 
 
 # === Main Script ===
-async def fetch_track(input_query: str, save_path: str, n_pages: int=2):
-    search_input = str(input_query)
+async def fetch_track(input_query: str, save_path: str, n_pages: int=2, concurrent: bool = True):
     num_pages = int(n_pages)
 
-    scraper = ben_sound_scraper = BensoundScraper(input_query)
-    await scraper.scrape_pages(max_pages=num_pages)
+    scraper = BensoundScraper(str(input_query))
+    if concurrent:
+        await scraper.crawl(max_pages=num_pages)
+    else:
+        await scraper.scrape_pages(max_pages=num_pages)
 
     data = scraper.get_data()
 
@@ -252,15 +602,47 @@ async def add_bgm_to_narrated_video_async(
     sc_release: int = 100,  # in milliseconds
     sc_level_in: float = 1,
     sc_level_sc: float = 1,
-    sc_makeup: float = None # None means omit makeup param
+    sc_makeup: float = None, # None means omit makeup param
+    # Precomputed-envelope ducking
+    duck_mode: str = 'sidechain',  # 'sidechain' or 'envelope'
+    speech_segments=None,          # [(start, end), ...] in seconds; None = detect from narration energy
+    duck_db: float = -12.0,
+    duck_attack: float = 0.2,      # in seconds
+    duck_release: float = 1.6,     # in seconds
 ) -> str:
     if output_path is None:
         base, ext = os.path.splitext(video_path)
         output_path = f"{base}_BGM{ext}"
 
-    def run_ffmpeg():
+    if duck_mode == 'envelope':
+        mixed_wav = f"{os.path.splitext(output_path)[0]}_mix.wav"
+        async with span("ffmpeg.bgm_mix", kind="ffmpeg", duck_mode=duck_mode, output=output_path):
+            # The mix itself is NumPy work; only the final mux is an ffmpeg process
+            await asyncio.to_thread(
+                render_ducked_mix,
+                video_path, bgm_path, mixed_wav,
+                speech_segments=speech_segments,
+                bgm_volume=bgm_volume,
+                narration_volume=narration_volume,
+                fade_duration=fade_duration,
+                duck_db=duck_db,
+                attack=duck_attack,
+                release=duck_release,
+            )
+            try:
+                await run_node(ffmpeg.output(
+                    ffmpeg.input(video_path).video, ffmpeg.input(mixed_wav).audio, output_path,
+                    vcodec='copy', acodec='aac', audio_bitrate='192k'
+                ))
+            finally:
+                os.remove(mixed_wav)
+        return output_path
+    if duck_mode != 'sidechain':
+        raise ValueError(f"Unknown duck_mode '{duck_mode}', expected 'sidechain' or 'envelope'")
+
+    async with span("ffmpeg.bgm_mix", kind="ffmpeg", duck_mode=duck_mode, output=output_path):
         # Probe video duration
-        duration = float(ffmpeg.probe(video_path)['format']['duration'])
+        duration = float((await asyncio.to_thread(ffmpeg.probe, video_path))['format']['duration'])
 
         # Inputs
         video_in = ffmpeg.input(video_path)
@@ -307,15 +689,9 @@ async def add_bgm_to_narrated_video_async(
         )
 
         # Output final video
-        (
-            ffmpeg
-            .output(video_in.video, mixed_audio, output_path, vcodec='copy', acodec='aac', audio_bitrate='192k')
-            .overwrite_output()
-            .run()
-        )
-        return output_path
-
-    return await asyncio.to_thread(run_ffmpeg)
+        out_node = ffmpeg.output(video_in.video, mixed_audio, output_path, vcodec='copy', acodec='aac', audio_bitrate='192k')
+        await run_node(out_node, on_progress=log_progress("bgm_mix", duration))
+    return output_path
 
 
 
@@ -1,29 +1,27 @@
 import os
 import json
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 
-import cv2
 import ffmpeg
 import numpy as np
 from dotenv import load_dotenv
-from PIL import Image, ImageDraw
-from faster_whisper import WhisperModel
-from moviepy import (
-    TextClip,
-    CompositeVideoClip,
-    ColorClip,
-    VideoFileClip,
-    ImageClip,
-)
+from PIL import Image, ImageDraw, ImageFont
+
+from react_agent.instrumentation import span, traced
+from react_agent.ffmpeg_runner import run_node
 
 load_dotenv()
 
 CAPTIONS_FONT_PATH = os.environ.get('CAPTIONS_FONT_PATH')
 
 class VideoCaptioner:
-    def __init__(self, model_size: str = 'base', device: str = "cpu", compute_type: str = 'int8'):
-        self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+    def __init__(self, model_size: str = 'base', device: str = "cpu", compute_type: str = 'int8', model=None):
+        # `model` can be any object with faster-whisper's transcribe(); by default the Whisper model is loaded
+        if model is None:
+            from faster_whisper import WhisperModel
+            model = WhisperModel(model_size, device=device, compute_type=compute_type)
+        self.model = model
         self.subtitle_config = {
             'max_chars': 60,
             'max_words': 7,
@@ -43,8 +41,10 @@ class VideoCaptioner:
         }
 
     async def generate_subtitles(self, audio_file_name: str) -> List[Dict]:
-        segments, _ = self.model.transcribe(audio_file_name, word_timestamps=True)
-        segments = list(segments)
+        with span("whisper.transcribe", kind="asr", audio=str(audio_file_name)) as s:
+            segments, _ = self.model.transcribe(audio_file_name, word_timestamps=True)
+            segments = list(segments)
+            s.add_bytes(in_=os.path.getsize(audio_file_name))
         return [
             {'word': word.word, 'start': word.start, 'end': word.end}
             for segment in segments for word in segment.words
@@ -82,7 +82,9 @@ class VideoCaptioner:
             "textcontents": line
         }
 
+    @traced("moviepy.caption_burn", kind="render")
     async def add_captions_to_video(self, video_path: str, subtitles: List[Dict], output_path: str) -> None:
+        from moviepy import CompositeVideoClip, VideoFileClip
         video = VideoFileClip(video_path)
         frame_size = video.size
         all_clips = [video]
@@ -94,7 +96,8 @@ class VideoCaptioner:
         final_video = CompositeVideoClip(all_clips).with_audio(video.audio)
         final_video.write_videofile(output_path, fps=30, codec="libx264", audio_codec="aac")
 
-    async def _create_caption_clips(self, textJSON: Dict, framesize: Tuple[int, int]) -> Tuple[List[TextClip], List[ImageClip]]:
+    async def _create_caption_clips(self, textJSON: Dict, framesize: Tuple[int, int]) -> Tuple[List["TextClip"], List["ImageClip"]]:
+        from moviepy import TextClip, ImageClip
         full_duration = textJSON['end'] - textJSON['start']
         frame_width, frame_height = framesize
         fontsize = int(frame_height * 0.050)
@@ -215,6 +218,7 @@ class VideoCaptioner:
         return word_clips, highlight_boxes
 
     def _create_rounded_box_cv(self, size: Tuple[int, int], radius: int, color: Tuple[int, int, int]) -> np.ndarray:
+        import cv2
         width, height = size
         mask = np.zeros((height, width, 4), dtype=np.uint8)
         box = np.zeros((height, width), dtype=np.uint8)
@@ -233,6 +237,84 @@ class VideoCaptioner:
         return mask
 
 
+    def ass_font(self) -> Tuple[str, Optional[str]]:
+        """Font family name and directory for libass, taken from CAPTIONS_FONT_PATH"""
+        font_path = self.caption_config["font"]
+        if font_path and os.path.isfile(font_path):
+            family = ImageFont.truetype(font_path, 10).getname()[0]
+            return family, os.path.dirname(os.path.abspath(font_path))
+        return "Sans", None
+
+    @staticmethod
+    def _ass_time(seconds: float) -> str:
+        centis = int(round(max(seconds, 0.0) * 100))
+        hours, centis = divmod(centis, 360000)
+        minutes, centis = divmod(centis, 6000)
+        secs, centis = divmod(centis, 100)
+        return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+    @staticmethod
+    def _ass_escape(text: str) -> str:
+        return text.strip().replace("\\", "").replace("{", "(").replace("}", ")").replace("\n", " ")
+
+    def write_ass_subtitles(self, subtitles: List[Dict], output_path: str, frame_size: Tuple[int, int]) -> str:
+        """Write line subtitles as an ASS file reproducing the word-highlight captions.
+
+        Layer 1 shows the whole line in white for its duration. Layer 0 draws the
+        highlight box behind whichever word is being spoken, so libass can burn
+        the captions in during the final encode instead of a separate moviepy render.
+        """
+        frame_width, frame_height = frame_size
+        fontsize = int(frame_height * 0.050)
+        margin_v = int(frame_height * 0.08)
+        margin_h = int(frame_width * 0.1)
+        box_padding = int(fontsize * 0.2)
+        family, _ = self.ass_font()
+
+        r, g, b = self.caption_config["highlight_bg_color"]
+        box_colour = f"&H66{b:02X}{g:02X}{r:02X}"  # 60% opaque, ASS colours are AABBGGRR
+
+        header = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {frame_width}",
+            f"PlayResY: {frame_height}",
+            "WrapStyle: 0",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+            "Alignment, MarginL, MarginR, MarginV, Encoding",
+            f"Style: Caption,{family},{fontsize},&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,"
+            f"0,0,0,0,100,100,0,0,1,0,0,2,{margin_h},{margin_h},{margin_v},1",
+            f"Style: Highlight,{family},{fontsize},&HFF000000,&HFF000000,{box_colour},&HFF000000,"
+            f"0,0,0,0,100,100,0,0,3,{box_padding},0,2,{margin_h},{margin_h},{margin_v},1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]
+
+        events = []
+        for line in subtitles:
+            words = [self._ass_escape(w["word"]) for w in line["textcontents"]]
+            events.append(
+                f"Dialogue: 1,{self._ass_time(line['start'])},{self._ass_time(line['end'])},Caption,,0,0,0,,{' '.join(words)}"
+            )
+            for idx, word_info in enumerate(line["textcontents"]):
+                # Same text on the same layout, with every box but the active word hidden
+                parts = []
+                for j, word in enumerate(words):
+                    alpha = "&H66&" if j == idx else "&HFF&"
+                    parts.append(f"{{\\3a{alpha}}}{word}")
+                events.append(
+                    f"Dialogue: 0,{self._ass_time(word_info['start'])},{self._ass_time(word_info['end'])},Highlight,,0,0,0,,{' '.join(parts)}"
+                )
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(header + events) + "\n")
+        return output_path
+
     async def save_subtitles_to_json(self, subtitles: List[Dict], output_path: str) -> None:
         with open(output_path, 'w') as f:
             json.dump(subtitles, f, indent=4)
@@ -246,9 +328,8 @@ class VideoCaptioner:
         output_audio = Path(output_audio_path) if output_audio_path else video_path.with_suffix('.mp3')
         
         input_stream = ffmpeg.input(str(video_path))
-        ffmpeg.output(input_stream.audio, str(output_audio), acodec='libmp3lame', audio_bitrate='192k')\
-              .overwrite_output()\
-              .run(quiet=True)
+        async with span("ffmpeg.extract_audio", kind="ffmpeg", output=str(output_audio)):
+            await run_node(ffmpeg.output(input_stream.audio, str(output_audio), acodec='libmp3lame', audio_bitrate='192k'))
 
         return str(output_audio)
 
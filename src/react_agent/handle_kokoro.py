@@ -4,21 +4,31 @@ from typing import Optional
 
 import soundfile as sf
 from dotenv import load_dotenv
-from kokoro_onnx import Kokoro
-from misaki import en, espeak
 from react_agent.structures import AudioMetadata
+from react_agent.services import register
+from react_agent.instrumentation import traced
 
 load_dotenv()
 
 
-fallback = espeak.EspeakFallback(british=False)
-g2p = en.G2P(trf=False, british=False, fallback=fallback)
-kokoro = Kokoro(
-    os.environ.get('KOKORO_MODEL_PATH'), 
-    os.environ.get('KOKORO_VOICES_PATH')
-)
-BASE_PATH = Path(os.environ.get('BASE_PATH'))
+def _build_g2p():
+    from misaki import en, espeak
+    fallback = espeak.EspeakFallback(british=False)
+    return en.G2P(trf=False, british=False, fallback=fallback)
 
+def _build_kokoro():
+    from kokoro_onnx import Kokoro
+    return Kokoro(
+        os.environ.get('KOKORO_MODEL_PATH'), 
+        os.environ.get('KOKORO_VOICES_PATH')
+    )
+
+# The ONNX model and the G2P pipeline load on first use
+g2p = register("g2p", _build_g2p)
+kokoro = register("kokoro", _build_kokoro)
+BASE_PATH = Path(os.environ.get('BASE_PATH', '.'))
+
+@traced("kokoro.tts", kind="tts")
 def generate_tts(
     text: str,
     video_name: str,
@@ -33,7 +43,7 @@ def generate_tts(
         
         audio_dir = base_path / "videos" / video_name / "audio"
         audio_dir.mkdir(parents=True, exist_ok=True)
-        file_path = audio_dir / f"{section.replace(" ", '_')}.wav"
+        file_path = audio_dir / f"{section.replace(' ', '_')}.wav"
         print(file_path)
 
         phonemes, _ = g2p(text)
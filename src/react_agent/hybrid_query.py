@@ -0,0 +1,31 @@
+from typing import List
+
+from qdrant_client import models
+
+
+def hybrid_request(
+    dense: List[float],
+    sparse,
+    k: int,
+    dense_vector_name: str = "dense",
+    sparse_vector_name: str = "sparse",
+) -> models.QueryRequest:
+    """Dense + BM25 prefetch fused with RRF on the server.
+
+    `sparse` is anything with `indices` and `values` (a FastEmbed embedding or a LangChain
+    SparseVector). Send it with `query_batch_points`, alone or as one request of a batch.
+    """
+    return models.QueryRequest(
+        prefetch=[
+            models.Prefetch(query=dense, using=dense_vector_name, limit=k),
+            models.Prefetch(
+                query=models.SparseVector(indices=[int(i) for i in sparse.indices],
+                                          values=[float(v) for v in sparse.values]),
+                using=sparse_vector_name,
+                limit=k,
+            ),
+        ],
+        query=models.FusionQuery(fusion=models.Fusion.RRF),
+        limit=k,
+        with_payload=True,
+    )
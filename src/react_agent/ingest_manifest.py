@@ -0,0 +1,203 @@
+import os
+import json
+import uuid
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+# Fixed namespace so a (file, chunk) pair always maps to the same Qdrant point ID
+POINT_NAMESPACE = uuid.UUID("5d9c3f0e-8a61-4f3b-9d2e-6b7a1c4e2f90")
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def point_id(book_hash: str, chunk_num: int) -> str:
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{book_hash}:{chunk_num}"))
+
+
+def manifest_path(directory: str, filename: str) -> str:
+    return os.path.join(directory, "metadata_json", f"{filename}.manifest.jsonl")
+
+
+class BookManifest:
+    """Per-book record of what has been enriched and stored, as an append-only JSONL log.
+
+    Contexts are keyed by chunk text hash, so they survive re-chunking. A stored chunk is
+    keyed by chunk number and text hash. Its point ID is uuid5(file hash, chunk number),
+    so re-running a book overwrites its points instead of duplicating them, and only chunks
+    whose text changed are re-embedded. If the file itself changed, all of its old points
+    are reported as stale.
+
+    Point deletions still owed (a legacy book's random-ID points, stale IDs) are written to
+    the log before anything else happens and only cleared once the caller confirms the
+    delete, so a crash mid-run can't leak them.
+    """
+
+    def __init__(self, directory: str, filename: str, book_hash: str):
+        self.path = manifest_path(directory, filename)
+        self.file_hash = book_hash
+        self.summary: Optional[str] = None
+        self.tags: Optional[List[str]] = None
+        self.contexts: Dict[str, str] = {}
+        self.stored: Dict[int, str] = {}
+        self.complete = False
+        self.stale_point_ids: List[str] = []
+        # Processed before manifests existed: its points have random IDs and are deleted by source
+        self.legacy = (not os.path.exists(self.path)
+                       and os.path.exists(os.path.join(directory, "metadata_json", f"{filename}.meta.json")))
+        self._load()
+
+    @staticmethod
+    def peek(directory: str, filename: str) -> Tuple[Optional[str], bool]:
+        """(file hash, complete) from a manifest without loading or rewriting it"""
+        path = manifest_path(directory, filename)
+        if not os.path.exists(path):
+            return None, False
+        book_hash, complete, legacy, pending = None, False, False, set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                kind = record["type"]
+                if kind == "book":
+                    book_hash, complete = record["file_hash"], False
+                elif kind == "complete":
+                    complete = True
+                elif kind == "stored":
+                    complete = False
+                elif kind == "legacy":
+                    legacy = True
+                elif kind == "legacy_deleted":
+                    legacy = False
+                elif kind == "pending_delete":
+                    pending.update(record["point_ids"])
+                elif kind == "deleted":
+                    pending.difference_update(record["point_ids"])
+        # A book with deletions still owed isn't done, even if all its chunks are stored
+        return book_hash, complete and not legacy and not pending
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            self._rewrite()
+            return
+        previous_hash = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                kind = record["type"]
+                if kind == "book":
+                    previous_hash = record["file_hash"]
+                    self.summary = record.get("summary", self.summary)
+                    self.tags = record.get("tags", self.tags)
+                elif kind == "context":
+                    self.contexts[record["text_hash"]] = record["context"]
+                elif kind == "stored":
+                    self.stored[record["chunk_num"]] = record["text_hash"]
+                    self.complete = False
+                elif kind == "complete":
+                    self.complete = True
+                elif kind == "legacy":
+                    self.legacy = True
+                elif kind == "legacy_deleted":
+                    self.legacy = False
+                elif kind == "pending_delete":
+                    self.stale_point_ids.extend(i for i in record["point_ids"] if i not in self.stale_point_ids)
+                elif kind == "deleted":
+                    done = set(record["point_ids"])
+                    self.stale_point_ids = [i for i in self.stale_point_ids if i not in done]
+
+        if previous_hash != self.file_hash:
+            # New file content: every old point is stale, but contexts of identical chunk text carry over.
+            # The rewrite persists them as pending deletes before the old stored records are dropped.
+            self.stale_point_ids.extend(point_id(previous_hash, n) for n in self.stored)
+            self.stored.clear()
+            self.summary = self.tags = None
+            self.complete = False
+            self._rewrite()
+
+    def _append(self, record: Dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _rewrite(self) -> None:
+        """Compact the log to one record per fact"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            header = {"type": "book", "file_hash": self.file_hash}
+            if self.summary is not None:
+                header.update(summary=self.summary, tags=self.tags)
+            f.write(json.dumps(header) + "\n")
+            if self.legacy:
+                f.write(json.dumps({"type": "legacy"}) + "\n")
+            if self.stale_point_ids:
+                f.write(json.dumps({"type": "pending_delete", "point_ids": self.stale_point_ids}) + "\n")
+            for th, context in self.contexts.items():
+                f.write(json.dumps({"type": "context", "text_hash": th, "context": context}) + "\n")
+            for chunk_num, th in sorted(self.stored.items()):
+                f.write(json.dumps({"type": "stored", "chunk_num": chunk_num, "text_hash": th}) + "\n")
+            if self.complete:
+                f.write(json.dumps({"type": "complete"}) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def point_id(self, chunk_num: int) -> str:
+        return point_id(self.file_hash, chunk_num)
+
+    def record_metadata(self, summary: str, tags: List[str]) -> None:
+        self.summary, self.tags = summary, tags
+        self._append({"type": "book", "file_hash": self.file_hash, "summary": summary, "tags": tags})
+
+    def context_for(self, th: str) -> Optional[str]:
+        return self.contexts.get(th)
+
+    def record_context(self, th: str, context: str) -> None:
+        self.contexts[th] = context
+        self._append({"type": "context", "text_hash": th, "context": context})
+
+    def is_stored(self, chunk_num: int, th: str) -> bool:
+        return self.stored.get(chunk_num) == th
+
+    def record_stored(self, items: List[Tuple[int, str]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for chunk_num, th in items:
+                self.stored[chunk_num] = th
+                f.write(json.dumps({"type": "stored", "chunk_num": chunk_num, "text_hash": th}) + "\n")
+
+    def legacy_deleted(self) -> None:
+        """Record that the book's pre-manifest (random-ID) points were deleted"""
+        self.legacy = False
+        self._append({"type": "legacy_deleted"})
+
+    def finish(self, total_chunks: int, text_hashes: List[str]) -> List[str]:
+        """Mark the book complete; returns point IDs that no longer belong to it.
+
+        They stay recorded as pending until `deleted()` is called with them.
+        """
+        removed = [n for n in self.stored if n > total_chunks]
+        for chunk_num in removed:
+            del self.stored[chunk_num]
+            self.stale_point_ids.append(self.point_id(chunk_num))
+        # Contexts for text that is no longer in the book aren't worth keeping
+        current = set(text_hashes)
+        self.contexts = {th: c for th, c in self.contexts.items() if th in current}
+        self.complete = True
+        self._rewrite()
+        return list(self.stale_point_ids)
+
+    def deleted(self, point_ids: List[str]) -> None:
+        """Record that stale points were deleted from the collection"""
+        done = set(point_ids)
+        self.stale_point_ids = [i for i in self.stale_point_ids if i not in done]
+        self._append({"type": "deleted", "point_ids": list(point_ids)})
@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import asyncio
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore
+
+from react_agent.qdrant_db import (
+    tokenizer,
+    print_status,
+    is_file_processed,
+    generate_book_metadata,
+    TARGET_CHUNK_SIZE,
+    CHUNK_OVERLAP,
+)
+from react_agent.bulk_loader import BulkLoader
+from react_agent.contextual_enrichment import BookEnricher
+from react_agent.ingest_manifest import BookManifest, file_hash, text_hash
+from react_agent.pdf_stream import extract_pdf_chunks_worker
+from react_agent.token_index import TokenIndex
+
+
+class AsyncRateLimiter:
+    """Token bucket limiting how many calls may start per minute"""
+
+    def __init__(self, requests_per_minute: float):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class PipelineStats:
+    books: int = 0
+    chunks_enriched: int = 0
+    chunks_stored: int = 0
+    chunks_resumed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def chunks_per_min(self) -> float:
+        return self.chunks_stored / self.elapsed * 60 if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.books} book(s), {self.chunks_enriched} enriched, {self.chunks_resumed} resumed, "
+                f"{self.chunks_stored} stored in {self.elapsed:.1f}s ({self.chunks_per_min:.1f} chunks/min)")
+
+
+class BookJob:
+    """Per-book state shared by the pipeline stages, backed by the book's manifest.
+
+    Every enriched and every stored chunk is appended to the BookManifest, so an
+    interrupted run (or a re-index after a parser change) neither re-enriches nor
+    re-stores chunks whose text is already done.
+    """
+
+    def __init__(self, directory: str, filename: str, summary: str, tags: List[str], chunk_texts: List[str],
+                 enricher: BookEnricher, manifest: BookManifest):
+        self.directory = directory
+        self.filename = filename
+        self.summary = summary
+        self.tags = tags
+        self.chunk_texts = chunk_texts
+        self.text_hashes = [text_hash(text) for text in chunk_texts]
+        self.enricher = enricher
+        self.manifest = manifest
+        self.total_chunks = len(chunk_texts)
+        self._pending = {n for n in range(1, self.total_chunks + 1) if not self.is_stored(n)}
+
+    def context(self, chunk_num: int) -> Optional[str]:
+        return self.manifest.context_for(self.text_hashes[chunk_num - 1])
+
+    def is_stored(self, chunk_num: int) -> bool:
+        return self.manifest.is_stored(chunk_num, self.text_hashes[chunk_num - 1])
+
+    def record_context(self, chunk_num: int, context: str) -> None:
+        self.manifest.record_context(self.text_hashes[chunk_num - 1], context)
+
+    def record_stored(self, chunk_nums: List[int]) -> None:
+        self.manifest.record_stored([(n, self.text_hashes[n - 1]) for n in chunk_nums])
+        self._pending.difference_update(chunk_nums)
+
+    @property
+    def complete(self) -> bool:
+        return not self._pending
+
+    def point_id(self, chunk_num: int) -> str:
+        return self.manifest.point_id(chunk_num)
+
+    def document(self, chunk_num: int) -> Document:
+        return Document(
+            page_content=self.chunk_texts[chunk_num - 1],
+            metadata={
+                "source": self.filename,
+                "context": self.context(chunk_num),
+                "book_summary": self.summary,
+                "tags": self.tags,
+                "chunk_index": chunk_num,
+                "total_chunks": self.total_chunks,
+                "processed_at": datetime.now().isoformat()
+            }
+        )
+
+    async def finish(self) -> List[str]:
+        """Write the book's metadata and close the manifest; returns stale point IDs"""
+        token_report = await self.enricher.close()
+        with open(os.path.join(self.directory, "metadata_json", f"{self.filename}.meta.json"), "w") as f:
+            json.dump({
+                "summary": self.summary,
+                "tags": self.tags,
+                "chunk_count": self.total_chunks,
+                "token_usage": token_report,
+                "processed_at": datetime.now().isoformat()
+            }, f, indent=2)
+        return self.manifest.finish(self.total_chunks, self.text_hashes)
+
+
+_DONE = object()
+
+
+class IngestionPipeline:
+    """Staged PDF ingestion connected by bounded async queues.
+
+    extract (process pool) -> enrich (bounded concurrency + rate limit) -> store (batched upserts)
+    """
+
+    def __init__(
+        self,
+        vector_store: QdrantVectorStore,
+        directory: str,
+        extract_workers: int = 2,
+        enrich_concurrency: int = 8,
+        requests_per_minute: float = 600,
+        upsert_batch_size: int = 256,
+        queue_size: int = 256,
+        report_interval: float = 30.0,
+        enrichment_mode: str = "full",
+        reindex: bool = False,
+    ):
+        self.vector_store = vector_store
+        self.loader = BulkLoader.from_vector_store(vector_store)
+        self.enrichment_mode = enrichment_mode
+        self.reindex = reindex
+        self.directory = directory
+        self.extract_workers = extract_workers
+        self.enrich_concurrency = enrich_concurrency
+        self.rate_limiter = AsyncRateLimiter(requests_per_minute)
+        self.upsert_batch_size = upsert_batch_size
+        self.report_interval = report_interval
+        self.enrich_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.store_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = PipelineStats()
+
+    async def _prepare_book(self, executor: ProcessPoolExecutor, filepath: str) -> None:
+        filename = os.path.basename(filepath)
+        loop = asyncio.get_running_loop()
+        manifest = BookManifest(self.directory, filename, await asyncio.to_thread(file_hash, filepath))
+        if manifest.legacy:
+            print_status(f"Removing {filename}'s points from before deterministic IDs")
+            await asyncio.to_thread(self.loader.delete_source, filename)
+            manifest.legacy_deleted()
+        print_status(f"Extracting {filename} in worker process...")
+        # Pages are streamed into chunks inside the worker. Hierarchical enrichment never
+        # needs the whole book, so in that mode only the chunks and the book's head come back.
+        keep_text = self.enrichment_mode != "hierarchical"
+        extracted = await loop.run_in_executor(
+            executor, extract_pdf_chunks_worker, filepath, TARGET_CHUNK_SIZE, CHUNK_OVERLAP, keep_text
+        )
+        full_text = extracted["text"]
+        index = await asyncio.to_thread(TokenIndex, full_text, tokenizer) if keep_text else None
+        if manifest.summary is None:
+            summary, tags = await generate_book_metadata(full_text or extracted["head"], filename, index)
+            manifest.record_metadata(summary, tags)
+        else:
+            summary, tags = manifest.summary, manifest.tags
+        chunk_texts = [text for text, _ in extracted["chunks"]]
+        enricher = BookEnricher(
+            full_text, filename, chunk_texts, mode=self.enrichment_mode, book_summary=summary,
+            index=index, chunk_tokens=[n_tokens for _, n_tokens in extracted["chunks"]]
+        )
+        del extracted
+        job = BookJob(self.directory, filename, summary, tags, chunk_texts, enricher, manifest)
+        self.stats.books += 1
+        enriched = sum(job.context(n) is not None for n in range(1, job.total_chunks + 1))
+        stored = sum(job.is_stored(n) for n in range(1, job.total_chunks + 1))
+        print_status(f"{filename}: {job.total_chunks} chunks, {enriched} already enriched, {stored} already stored")
+
+        if job.complete:
+            await self._finish_job(job)
+            return
+        for chunk_num in range(1, job.total_chunks + 1):
+            if job.is_stored(chunk_num):
+                continue
+            if job.context(chunk_num) is not None:
+                self.stats.chunks_resumed += 1
+                await self.store_queue.put((job, chunk_num))
+            else:
+                await self.enrich_queue.put((job, chunk_num))
+
+    async def _produce(self, pdf_paths: List[str]) -> None:
+        with ProcessPoolExecutor(max_workers=self.extract_workers) as executor:
+            results = await asyncio.gather(
+                *(self._prepare_book(executor, path) for path in pdf_paths), return_exceptions=True
+            )
+        for path, result in zip(pdf_paths, results):
+            if isinstance(result, Exception):
+                print_status(f"Error preparing {os.path.basename(path)}: {result}")
+
+    async def _enrich_worker(self) -> None:
+        while True:
+            item = await self.enrich_queue.get()
+            if item is _DONE:
+                return
+            job, chunk_num = item
+            try:
+                await self.rate_limiter.acquire()
+                context = await job.enricher.enrich(chunk_num)
+                job.record_context(chunk_num, context)
+                self.stats.chunks_enriched += 1
+                await self.store_queue.put((job, chunk_num))
+            except Exception as e:
+                print_status(f"Error enriching {job.filename} chunk {chunk_num}: {e}")
+
+    async def _flush(self, batch: List) -> None:
+        if not batch:
+            return
+        documents = [job.document(chunk_num) for job, chunk_num in batch]
+        ids = [job.point_id(chunk_num) for job, chunk_num in batch]
+        try:
+            await self.loader.aload(documents, ids)
+        except Exception as e:
+            print_status(f"Error storing batch of {len(batch)} chunks: {e}")
+            return
+        by_job: Dict[int, tuple] = {}
+        for job, chunk_num in batch:
+            by_job.setdefault(id(job), (job, []))[1].append(chunk_num)
+        for job, chunk_nums in by_job.values():
+            job.record_stored(chunk_nums)
+            if job.complete:
+                await self._finish_job(job)
+        self.stats.chunks_stored += len(batch)
+
+    async def _finish_job(self, job: BookJob) -> None:
+        stale_ids = await job.finish()
+        if stale_ids:
+            print_status(f"Deleting {len(stale_ids)} stale points of {job.filename}")
+            await asyncio.to_thread(self.loader.delete, stale_ids)
+            job.manifest.deleted(stale_ids)
+        print_status(f"Successfully processed and stored: {job.filename}")
+
+    async def _store_worker(self) -> None:
+        batch = []
+        while True:
+            item = await self.store_queue.get()
+            if item is _DONE:
+                await self._flush(batch)
+                return
+            batch.append(item)
+            if len(batch) >= self.upsert_batch_size:
+                await self._flush(batch)
+                batch = []
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            print_status(f"Throughput: {self.stats.summary()} | queues enrich={self.enrich_queue.qsize()} store={self.store_queue.qsize()} | "
+                         f"upserts {self.loader.stats.points_per_sec:.1f} points/s")
+
+    async def run(self) -> PipelineStats:
+        os.makedirs(os.path.join(self.directory, "metadata_json"), exist_ok=True)
+        pdf_files = [f for f in os.listdir(self.directory) if f.endswith(".pdf")]
+        pending = [os.path.join(self.directory, f) for f in pdf_files if not is_file_processed(self.directory, f, self.reindex)]
+        print_status(f"Found {len(pdf_files)} PDFs, {len(pending)} to process")
+
+        self.stats = PipelineStats()
+        reporter = asyncio.create_task(self._report())
+        enrichers = [asyncio.create_task(self._enrich_worker()) for _ in range(self.enrich_concurrency)]
+        storer = asyncio.create_task(self._store_worker())
+        try:
+            await self._produce(pending)
+            for _ in enrichers:
+                await self.enrich_queue.put(_DONE)
+            await asyncio.gather(*enrichers)
+            await self.store_queue.put(_DONE)
+            await storer
+        finally:
+            reporter.cancel()
+            for task in enrichers + [storer]:
+                task.cancel()
+
+        print_status(f"Pipeline finished: {self.stats.summary()}")
+        print_status(f"Upserts: {self.loader.stats.summary()}")
+        if hasattr(self.loader.dense_embeddings, "stats"):
+            print_status(f"Embedding cache: {self.loader.dense_embeddings.stats()}")
+        return self.stats
+
+
+async def run_ingestion_pipeline(directory: str = "my_test_files", vector_store: Optional[QdrantVectorStore] = None, **kwargs) -> PipelineStats:
+    from react_agent.qdrant_db import initialize_qdrant
+
+    vector_store = vector_store or initialize_qdrant()
+    return await IngestionPipeline(vector_store, directory, **kwargs).run()
@@ -0,0 +1,321 @@
+"""Spans for graph nodes and the expensive calls inside them.
+
+    with span("ffmpeg.render", kind="ffmpeg", output=path) as s:
+        ...
+        s.add_bytes(out=os.path.getsize(path))
+
+    @traced("kokoro.tts", kind="tts")
+    def generate_tts(...): ...
+
+Each span records wall time, CPU time, the CPU time of the ffmpeg processes it ran, the
+process's peak RSS so far, and bytes in/out reported by the caller. Concurrent spans
+(parallel branches, sections, shorts) are charged only for their own work:
+
+  - cpu_s: a sync span measures its own thread (time.thread_time()), which is exact for
+    thread-bound work such as TTS or Whisper under asyncio.to_thread. It adds that time
+    to its async ancestors. An async span therefore reports the CPU of the thread-bound
+    spans nested under it; coroutine time on the event loop is not attributed.
+  - subprocess_cpu_s: ffmpeg_runner reaps each ffmpeg itself and charges that child's
+    own rusage to the current span and its ancestors. Children started elsewhere
+    (ffmpeg.probe, moviepy) are not counted.
+  - process_peak_rss_mb: the process's high-water mark when the span ended. It is not
+    per span, and under concurrency it reflects every run in flight.
+
+Spans are appended to TRACE_DIR/<run_id>.jsonl and, when OTEL_ENABLED=1 and
+opentelemetry is installed, also emitted as OpenTelemetry spans. `run_report(run_id)`
+aggregates a run per span name.
+"""
+import os
+import json
+import time
+import uuid
+import inspect
+import resource
+import functools
+import threading
+import contextvars
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+TRACE_DIR = os.environ.get('TRACE_DIR', os.path.join('my_test_files', 'traces'))
+OTEL_ENABLED = os.environ.get('OTEL_ENABLED', '0') == '1'
+
+_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("run_id", default=None)
+_current: contextvars.ContextVar[Optional["span"]] = contextvars.ContextVar("current_span", default=None)
+_charge_lock = threading.Lock()
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    kind: str
+    run_id: Optional[str]
+    span_id: str
+    parent_id: Optional[str]
+    started_at: float
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    subprocess_cpu_s: float = 0.0
+    process_peak_rss_mb: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class Recorder:
+    """Finished spans per run, kept in memory for the run report and appended as JSON lines"""
+
+    def __init__(self, trace_dir: str = TRACE_DIR):
+        self.trace_dir = trace_dir
+        self._lock = threading.Lock()
+        self._spans: Dict[str, List[SpanRecord]] = defaultdict(list)
+
+    def record(self, record: SpanRecord) -> None:
+        run_id = record.run_id or "unscoped"
+        with self._lock:
+            self._spans[run_id].append(record)
+            os.makedirs(self.trace_dir, exist_ok=True)
+            with open(os.path.join(self.trace_dir, f"{run_id}.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(record), default=str) + "\n")
+
+    def spans(self, run_id: str) -> List[SpanRecord]:
+        with self._lock:
+            return list(self._spans.get(run_id, []))
+
+
+recorder = Recorder()
+
+
+def _otel_tracer():
+    if not OTEL_ENABLED:
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace.get_tracer("short-creation")
+
+
+class span:
+    """Sync and async context manager recording one SpanRecord.
+
+    Use `with` only around blocking code: a sync span charges itself its thread's CPU
+    time, which would include other coroutines if the block awaited.
+
+    activate=False records the span without making it the current parent, for spans that
+    are opened and closed from different callbacks (and so different contexts).
+    """
+
+    def __init__(self, name: str, kind: str = "stage", run_id: Optional[str] = None, activate: bool = True, **attrs):
+        self.parent = _current.get()
+        self.record = SpanRecord(
+            name=name, kind=kind, run_id=run_id or _run_id.get(), span_id=uuid.uuid4().hex[:16],
+            parent_id=self.parent.record.span_id if self.parent else None, started_at=time.time(), attrs=attrs,
+        )
+        self.activate = activate
+        self._thread_cpu = None
+        self._tokens = []
+        self._otel = None
+        self._otel_span = None
+
+    def add_bytes(self, in_: int = 0, out: int = 0) -> None:
+        self.record.bytes_in += in_
+        self.record.bytes_out += out
+
+    def set(self, **attrs) -> None:
+        self.record.attrs.update(attrs)
+
+    def _enter(self, thread_bound: bool):
+        if self.activate:
+            if self.record.run_id and _run_id.get() != self.record.run_id:
+                self._tokens.append((_run_id, _run_id.set(self.record.run_id)))
+            self._tokens.append((_current, _current.set(self)))
+            tracer = _otel_tracer()
+            if tracer is not None:
+                self._otel = tracer.start_as_current_span(self.record.name, attributes={"kind": self.record.kind})
+                self._otel_span = self._otel.__enter__()
+        self._wall = time.perf_counter()
+        # A sync block runs start to finish on one thread, so that thread's CPU time is its own
+        self._thread_cpu = time.thread_time() if thread_bound else None
+        return self
+
+    def __enter__(self):
+        # activate=False spans are closed from another callback, so they don't own the thread
+        return self._enter(thread_bound=self.activate)
+
+    def __exit__(self, exc_type, exc, tb):
+        record = self.record
+        record.wall_s = time.perf_counter() - self._wall
+        if self._thread_cpu is not None:
+            own = time.thread_time() - self._thread_cpu
+            with _charge_lock:
+                record.cpu_s += own
+            _charge(self.parent, cpu_s=own)
+        record.process_peak_rss_mb = _peak_rss_mb()
+        if exc is not None:
+            record.error = f"{type(exc).__name__}: {exc}"
+        if self._otel is not None:
+            for key, value in {**record.attrs, "wall_s": record.wall_s, "cpu_s": record.cpu_s,
+                               "bytes_in": record.bytes_in, "bytes_out": record.bytes_out}.items():
+                if isinstance(value, (str, int, float, bool)):
+                    self._otel_span.set_attribute(key, value)
+            self._otel.__exit__(exc_type, exc, tb)
+        for var, token in reversed(self._tokens):
+            var.reset(token)
+        recorder.record(record)
+        return False
+
+    async def __aenter__(self):
+        return self._enter(thread_bound=False)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def _charge(target: Optional[span], cpu_s: float = 0.0, subprocess_cpu_s: float = 0.0) -> None:
+    """Add resources to `target` and its ancestors.
+
+    Thread CPU stops at the first thread-bound ancestor, whose own thread_time() already
+    includes it; child-process CPU is never measured by a span itself, so it goes all the way up.
+    """
+    with _charge_lock:
+        while target is not None:
+            if cpu_s and target._thread_cpu is not None:
+                cpu_s = 0.0
+            if not cpu_s and not subprocess_cpu_s:
+                return
+            target.record.cpu_s += cpu_s
+            target.record.subprocess_cpu_s += subprocess_cpu_s
+            target = target.parent
+
+
+def charge_subprocess(cpu_s: float) -> None:
+    """Charge a reaped child's CPU time (its own rusage) to the current span and its ancestors"""
+    _charge(_current.get(), subprocess_cpu_s=cpu_s)
+
+
+def current_run_id() -> Optional[str]:
+    return _run_id.get()
+
+
+def traced(name: Optional[str] = None, kind: str = "stage"):
+    """Decorator form of span for sync and async functions"""
+    def decorator(fn):
+        span_name = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                async with span(span_name, kind):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _thread_id() -> Optional[str]:
+    try:
+        from langgraph.config import get_config
+        return (get_config().get("configurable") or {}).get("thread_id")
+    except Exception:
+        return None
+
+
+def traced_node(name: str, node):
+    """Wrap a graph node in a span scoped to its run.
+
+    The run is the one opened by `span(..., kind="run")` around the invocation (main.py),
+    falling back to the graph thread_id when the graph is invoked directly.
+    """
+    @functools.wraps(node)
+    async def wrapper(state, *args, **kwargs):
+        async with span(name, kind="node", run_id=_run_id.get() or _thread_id()):
+            return await node(state, *args, **kwargs)
+    return wrapper
+
+
+def llm_callback_handler():
+    """LangChain callback handler recording one span per chat model call, with token usage"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class LLMSpanHandler(BaseCallbackHandler):
+        def __init__(self):
+            self._open: Dict[Any, span] = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            model = (serialized or {}).get("kwargs", {}).get("model") or (serialized or {}).get("name")
+            s = span("llm.call", kind="llm", activate=False, model=model)
+            s.__enter__()
+            self._open[run_id] = s
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            s = self._open.pop(run_id, None)
+            if s is None:
+                return
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            s.set(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"))
+            s.__exit__(None, None, None)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            s = self._open.pop(run_id, None)
+            if s is not None:
+                s.__exit__(type(error), error, None)
+
+    return LLMSpanHandler()
+
+
+def run_report(run_id: str) -> Dict[str, Any]:
+    """Totals per span name for a run, slowest first, plus the run's wall time"""
+    spans = recorder.spans(run_id)
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for s in spans:
+        row = by_name.setdefault(s.name, {"kind": s.kind, "count": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                          "subprocess_cpu_s": 0.0, "bytes_in": 0, "bytes_out": 0,
+                                          "process_peak_rss_mb": 0.0, "errors": 0})
+        row["count"] += 1
+        row["wall_s"] += s.wall_s
+        row["cpu_s"] += s.cpu_s
+        row["subprocess_cpu_s"] += s.subprocess_cpu_s
+        row["bytes_in"] += s.bytes_in
+        row["bytes_out"] += s.bytes_out
+        row["process_peak_rss_mb"] = max(row["process_peak_rss_mb"], s.process_peak_rss_mb)
+        row["errors"] += s.error is not None
+    for row in by_name.values():
+        for key in ("wall_s", "cpu_s", "subprocess_cpu_s"):
+            row[key] = round(row[key], 3)
+    runs = [s for s in spans if s.kind == "run"]
+    nodes = [s for s in spans if s.kind == "node"]
+    if runs:
+        wall = sum(s.wall_s for s in runs)
+    else:
+        wall = (max(s.started_at + s.wall_s for s in nodes) - min(s.started_at for s in nodes)) if nodes else 0.0
+    return {
+        "run_id": run_id,
+        "wall_s": round(wall, 3),
+        "process_peak_rss_mb": round(max((s.process_peak_rss_mb for s in spans), default=0.0), 1),
+        "spans": dict(sorted(by_name.items(), key=lambda kv: kv[1]["wall_s"], reverse=True)),
+    }
+
+
+def attach_report(json_path: str, run_id: str) -> Dict[str, Any]:
+    """Write (or refresh) the run's timing report into a final_output.json"""
+    data = {}
+    if os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    data["timing_report"] = run_report(run_id)
+    with open(json_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, default=str)
+    os.replace(json_path + ".tmp", json_path)
+    return data["timing_report"]
@@ -1,12 +1,12 @@
 import asyncio
+import argparse
 import os
 from dotenv import load_dotenv
 from pprint import pprint
+from datetime import datetime
 
 from psycopg_pool import AsyncConnectionPool
 
-from langchain_deepseek import ChatDeepSeek
-
 from langgraph.graph import StateGraph
 from langgraph.constants import START
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
@@ -20,13 +20,18 @@ from react_agent.graph import (
     get_videos,
     generate_audio,
     media_editor,
+    section_pipeline,
+    route_media_mode,
     add_captions,
     get_and_join_bgm,
     topic_data_generator,
     upload_short,
 )
-from react_agent.handle_captions import VideoCaptioner
 from react_agent.utils import load_chat_model
+from react_agent.services import warm_up, flush_services
+from react_agent.section_pipeline import shared_scheduler
+from react_agent.batch_runner import FLUSHED_SERVICES, run_batch, run_config, write_timing_report
+from react_agent.instrumentation import span, traced_node
 
 print("All imports successful...\n")
 # Load environment variables
@@ -44,38 +49,66 @@ connection_kwargs = {
     "prepare_threshold": 0,
 }
 
-# Instantiate reusable global components
-video_captioner = VideoCaptioner()
-model = ChatDeepSeek(model='deepseek-chat', temperature=0.6)
+# Shared clients and models (Whisper, Kokoro, LLMs, Qdrant) are lazy services in the
+# graph modules; run_job warms them up while the checkpointer connects.
+GRAPH_SERVICES = ["deepseek_chat", "video_captioner", "g2p", "kokoro", "pexels", "embeddings", "topic_store",
+                  "book_client", "sparse_bm25", "tokenizer", "http_session", "scheduler"]
+
+# Global concurrency limit each node draws from (section_pipeline schedules its own sub-stages)
+STAGE_RESOURCES = {
+    "topic_data_generator": "llm",
+    "script_generator": "llm",
+    "generate_audio": "tts",
+    "get_videos": "download",
+    "media_editor": "render",
+    "add_captions": "render",
+    "get_and_join_bgm": "render",
+    "upload_short": "upload",
+}
 
-async def build_graph_with_checkpointer(checkpointer: AsyncPostgresSaver):
+def build_graph(checkpointer=None, include_upload: bool = True):
+    """The production graph; include_upload=False ends after get_and_join_bgm (offline benchmarks)"""
     builder = StateGraph(State, input=InputState, config_schema=Configuration)
 
+    def add_node(name, node):
+        resource = STAGE_RESOURCES.get(name)
+        node = traced_node(name, node)
+        builder.add_node(name, shared_scheduler.limit(resource, node) if resource else node)
+
     # Add nodes
-    builder.add_node('topic_data_generator', topic_data_generator)
-    builder.add_node('script_generator', script_generator)
-    builder.add_node('generate_audio', generate_audio)
-    builder.add_node('get_videos', get_videos)
-    builder.add_node('media_editor', media_editor)
-    builder.add_node('add_captions', add_captions)
-    builder.add_node('get_and_join_bgm', get_and_join_bgm)
-    builder.add_node("upload_short", upload_short)
+    add_node('topic_data_generator', topic_data_generator)
+    add_node('script_generator', script_generator)
+    add_node('generate_audio', generate_audio)
+    add_node('get_videos', get_videos)
+    add_node('media_editor', media_editor)
+    add_node('section_pipeline', section_pipeline)
+    add_node('add_captions', add_captions)
+    add_node('get_and_join_bgm', get_and_join_bgm)
+    if include_upload:
+        add_node("upload_short", upload_short)
 
 
     # Define workflow edges
     builder.add_edge(START, "topic_data_generator")
     builder.add_edge("topic_data_generator", "script_generator")
-    builder.add_edge("script_generator", "generate_audio")
-    builder.add_edge("generate_audio", "get_videos")
-    builder.add_edge("get_videos", "media_editor")
+    builder.add_conditional_edges("script_generator", route_media_mode, ["generate_audio", "get_videos", "section_pipeline"])
+    builder.add_edge(["generate_audio", "get_videos"], "media_editor")
     builder.add_edge("media_editor", "add_captions")
+    builder.add_edge("section_pipeline", "add_captions")
     builder.add_edge("add_captions", "get_and_join_bgm")
-    builder.add_edge('get_and_join_bgm', 'upload_short')
-    builder.add_edge('upload_short', '__end__')
+    if include_upload:
+        builder.add_edge('get_and_join_bgm', 'upload_short')
+        builder.add_edge('upload_short', '__end__')
+    else:
+        builder.add_edge('get_and_join_bgm', '__end__')
 
     return builder.compile(checkpointer=checkpointer)
 
 
+async def build_graph_with_checkpointer(checkpointer: AsyncPostgresSaver):
+    return build_graph(checkpointer)
+
+
 def print_final_output_dict(final_reel):
     print("\n🎞️ FINAL REEL DETAILS")
     print(f"  📍 Final Reel Path      : {final_reel.final_reel_path}")
@@ -133,6 +166,8 @@ config = {"configurable": {"thread_id": "short-creator-test"}}
 
 # Entry point
 async def run_job():
+    warm = asyncio.create_task(warm_up(GRAPH_SERVICES))
+
     # Initialize Postgres connection pool and checkpointer
     async with AsyncConnectionPool(conninfo=DB_URI_CHECKPOINTER, max_size=20, kwargs=connection_kwargs) as pool:
         checkpointer = AsyncPostgresSaver(pool)
@@ -145,12 +180,57 @@ async def run_job():
 
         print(f"\n[INFO] Called graph... \n")
 
-        print(f"\n[INFO] Initiated invoke... \n")
-        result = await graph.ainvoke({}, config=config)
+        print(f"\n[INFO] Warm-up: {await warm} \n")
+
+        # A thread that stopped mid-run (error or interrupt) resumes from its last checkpoint,
+        # so finished nodes are skipped; the stage cache skips re-executed nodes whose
+        # inputs and artifacts are unchanged.
+        snapshot = await graph.aget_state(config)
+        thread_id = config["configurable"]["thread_id"]
+        run_id = f"{thread_id}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        try:
+            async with span("run", kind="run", run_id=run_id, thread_id=thread_id):
+                if snapshot.next:
+                    print(f"\n[INFO] Resuming thread at {snapshot.next}... \n")
+                    result = await graph.ainvoke(None, config=run_config(thread_id))
+                else:
+                    print(f"\n[INFO] Initiated invoke... \n")
+                    result = await graph.ainvoke({}, config=run_config(thread_id))
+        finally:
+            # Let topic write-through upserts reach Qdrant before asyncio.run closes the loop
+            await flush_services(FLUSHED_SERVICES)
+
+        print(f"\n⏱️ TIMING REPORT")
+        pprint(write_timing_report(result, run_id), indent=2, sort_dicts=False)
         
         print("Workflow complete:")
 
 
+async def run_batch_job(count: int, concurrency: int, section_streaming: bool = False):
+    """Produce `count` shorts concurrently on distinct threads with shared models and limits"""
+    warm = asyncio.create_task(warm_up(GRAPH_SERVICES))
+
+    async with AsyncConnectionPool(conninfo=DB_URI_CHECKPOINTER, max_size=20, kwargs=connection_kwargs) as pool:
+        checkpointer = AsyncPostgresSaver(pool)
+        await checkpointer.setup()
+        graph = await build_graph_with_checkpointer(checkpointer)
+
+        print(f"\n[INFO] Warm-up: {await warm} \n")
+        print(f"\n[INFO] Starting batch of {count} shorts ({concurrency} concurrent)... \n")
+        try:
+            report = await run_batch(
+                graph, count, concurrency, configurable={"section_streaming": section_streaming}
+            )
+        finally:
+            await flush_services(FLUSHED_SERVICES)
+
+        print("\n📦 BATCH REPORT")
+        pprint(report.summary(), indent=2)
+        for run in report.runs:
+            print(f"  {'✅' if run.ok else '❌'} {run.thread_id}: {run.seconds:.1f}s  {run.final_reel_path or run.error}")
+        return report
+
+
 async def run_get_state():
     async with AsyncConnectionPool(conninfo=DB_URI_CHECKPOINTER, max_size=20, kwargs=connection_kwargs) as pool:
         checkpointer = AsyncPostgresSaver(pool)
@@ -173,7 +253,16 @@ async def run_get_state():
 
 
 if __name__ == "__main__":
-    asyncio.run(run_job())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=0, help="Produce N shorts concurrently instead of one")
+    parser.add_argument("--concurrency", type=int, default=2, help="Shorts in flight at once in batch mode")
+    parser.add_argument("--section-streaming", action="store_true", help="Use the per-section pipeline")
+    args = parser.parse_args()
+
+    if args.batch:
+        asyncio.run(run_batch_job(args.batch, args.concurrency, args.section_streaming))
+    else:
+        asyncio.run(run_job())
     # asyncio.run(run_get_state())
 
 
@@ -0,0 +1,114 @@
+from typing import Dict, Iterator, List, Optional
+
+from react_agent.token_index import TokenIndex, TokenSpan
+
+# Re-split the buffered text once it holds this many chunks' worth of characters
+BUFFER_CHUNKS = 4
+# Rough chars-per-token used only to decide when to re-split the buffer
+CHARS_PER_TOKEN = 4
+# Prefix of the book kept for metadata when the full text isn't held
+METADATA_HEAD_TOKENS = 100000
+
+
+def iter_pdf_pages(pdf_path: str, blocks: bool = False) -> Iterator[str]:
+    """Yield a PDF's text one page at a time (or one text block at a time).
+
+    Only the current page is loaded, so memory stays flat however long the book is.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(doc.page_count):
+            page = doc.load_page(page_num)
+            if blocks:
+                # (x0, y0, x1, y1, text, block_no, block_type); type 0 is text
+                for block in page.get_text("blocks", sort=True):
+                    if block[6] == 0 and block[4].strip():
+                        yield block[4]
+            else:
+                yield page.get_text() + "\n"
+            del page
+
+
+class StreamingChunker:
+    """Incremental version of TokenIndex.split.
+
+    Text is fed page by page. Once the buffer holds a few chunks' worth, it is split and
+    every span but the last is emitted. The last span (it may still grow) and its
+    overlap stay buffered, so the buffer never exceeds a handful of chunks.
+    """
+
+    def __init__(self, chunk_size: int, overlap: int, encoding=None):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.encoding = encoding
+        self._parts: List[str] = []
+        self._buffered_chars = 0
+        self._threshold = chunk_size * CHARS_PER_TOKEN * BUFFER_CHUNKS
+
+    def feed(self, text: str) -> List[TokenSpan]:
+        self._parts.append(text)
+        self._buffered_chars += len(text)
+        if self._buffered_chars < self._threshold:
+            return []
+        return self._split(final=False)
+
+    def flush(self) -> List[TokenSpan]:
+        return self._split(final=True) if self._parts else []
+
+    def _split(self, final: bool) -> List[TokenSpan]:
+        index = TokenIndex("".join(self._parts), self.encoding)
+        spans = index.split(self.chunk_size, self.overlap)
+        if final or len(spans) < 2:
+            if final:
+                self._parts, self._buffered_chars = [], 0
+            return spans if final else []
+        tail = index.text[index.offsets[spans[-1].start]:]
+        self._parts, self._buffered_chars = [tail], len(tail)
+        return spans[:-1]
+
+
+def iter_pdf_chunks(pdf_path: str, chunk_size: int, overlap: int, encoding=None, blocks: bool = False) -> Iterator[TokenSpan]:
+    """Stream a PDF straight into chunks without ever holding the whole text"""
+    chunker = StreamingChunker(chunk_size, overlap, encoding)
+    for text in iter_pdf_pages(pdf_path, blocks=blocks):
+        yield from chunker.feed(text)
+    yield from chunker.flush()
+
+
+def extract_pdf_chunks_worker(
+    pdf_path: str,
+    chunk_size: int,
+    overlap: int,
+    keep_text: bool = False,
+    head_tokens: int = METADATA_HEAD_TOKENS,
+) -> Dict:
+    """Process-pool entry point: stream a PDF into chunks inside the worker.
+
+    Only the chunk texts, their token counts and the head of the book (for metadata)
+    cross back to the event loop; the full text is returned only when keep_text is set.
+    """
+    pages: Optional[List[str]] = [] if keep_text else None
+    head_parts: List[str] = []
+    head_chars = 0
+    head_limit = head_tokens * CHARS_PER_TOKEN
+    page_count = 0
+
+    chunker = StreamingChunker(chunk_size, overlap)
+    chunks = []
+    for text in iter_pdf_pages(pdf_path):
+        page_count += 1
+        if pages is not None:
+            pages.append(text)
+        if head_chars < head_limit:
+            head_parts.append(text)
+            head_chars += len(text)
+        chunks.extend((span.text, span.n_tokens) for span in chunker.feed(text))
+    chunks.extend((span.text, span.n_tokens) for span in chunker.flush())
+
+    return {
+        "chunks": chunks,
+        "pages": page_count,
+        "head": "".join(head_parts)[:head_limit],
+        "text": "".join(pages) if pages is not None else None,
+    }
@@ -1,6 +1,7 @@
 import os
 import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 from typing import List, Tuple
 
@@ -10,10 +11,35 @@ from langchain.prompts import ChatPromptTemplate
 from pexels_apis import PexelsAPI
 from react_agent.utils import extract_video_data, sanitize_filename, extract_video_name
 from react_agent.structures import PexelsVideoMultiMatch, VideoMetadata
+from react_agent.services import register
+from react_agent.instrumentation import span
 
 load_dotenv()
 
-pexels = PexelsAPI(os.environ.get('PEXELS_API_KEY'))
+pexels = register("pexels", lambda: PexelsAPI(os.environ.get('PEXELS_API_KEY')))
+
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 32))
+
+
+def _build_http_session() -> requests.Session:
+    """One keep-alive connection pool for every clip download in the process"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+http_session = register("http_session", _build_http_session)
+
+
+def _download_file(url: str, temp_path: Path) -> None:
+    with span("pexels.download", kind="http") as s, http_session.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(temp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                f.write(chunk)
+                s.add_bytes(in_=len(chunk))
 
 class NoHDVideoError(Exception):
     pass
@@ -37,7 +63,8 @@ async def search_and_validate_videos(section, model, section_dir: Path) -> Tuple
                 "per_page": 10,
             }
 
-            pexels_response = pexels.search_videos(search_params)
+            with span("pexels.search", kind="http", query=search_query):
+                pexels_response = pexels.search_videos(search_params)
             if pexels_response.get("status_code") != 200:
                 raise ValueError(f"Pexels API returned {pexels_response.get('status_code')}")
 
@@ -139,11 +166,8 @@ async def download_video_from_metadata(video_data, match, section_dir: Path, sec
                         video_path = section_dir / filename
                         temp_path = video_path.with_suffix('.tmp')
 
-                        with requests.get(candidate["link"], stream=True) as response:
-                            response.raise_for_status()
-                            with open(temp_path, "wb") as f:
-                                for chunk in response.iter_content(chunk_size=8192):
-                                    f.write(chunk)
+                        # Blocking I/O in a worker thread so concurrent sections/shorts keep running
+                        await asyncio.to_thread(_download_file, candidate["link"], temp_path)
                         temp_path.rename(video_path)
 
                         return VideoMetadata(
@@ -244,4 +244,22 @@ QUERY_SYSTEM_PROMPT = """
     "Case studies showing [requested application]"
 
     Format: Return ONLY the most targeted queries for this revision round.
-    """
\ No newline at end of file
+    """
+
+TOPIC_QUERY_PROMPT = """
+    Generate 1-3 distinct search queries for a library of psychology, persuasion and behavioural-science books.
+    The results will be used as source material for the next YouTube Short concept.
+
+    Topics already covered (look for material on different mechanisms): {prior_titles}
+
+    Each query should name a concrete mechanism, study, or real-world pattern rather than a broad theme.
+    Format: Return ONLY the queries.
+    """
+
+
+BOOK_CONTEXT_PROMPT = """
+Source material retrieved from the book library. Ground the concept in these passages where they fit,
+but do not quote them verbatim or cite the books:
+
+{book_context}
+"""
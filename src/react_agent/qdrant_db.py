@@ -1,15 +1,11 @@
-import uuid
 from uuid import uuid4
 import os
 import asyncio
-import fitz  # PyMuPDF
 import tiktoken
 
-from langchain_google_vertexai import ChatVertexAI
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 from qdrant_client import QdrantClient, models
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from qdrant_client.http.models import Distance, VectorParams, PointStruct, SparseVectorParams
 
 from typing import List, Dict, Tuple, Optional
 
@@ -18,12 +14,18 @@ from datetime import datetime
 from dotenv import load_dotenv
 
 from react_agent.structures import PsychologyShort
+from react_agent.token_index import TokenIndex, TokenSpan
+from react_agent.pdf_stream import iter_pdf_pages
+from react_agent.ingest_manifest import BookManifest, file_hash, text_hash
+from react_agent.embedding_cache import CachedEmbeddings
+from react_agent.topic_index import LocalTopicIndex
+from react_agent.services import register
+from react_agent.instrumentation import traced
 
 from pydantic import BaseModel, Field
 
 from langchain_qdrant import QdrantVectorStore, RetrievalMode, FastEmbedSparse
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from tqdm import tqdm
 import gc
@@ -32,11 +34,20 @@ import json
 
 load_dotenv()
 
-# Initialize models
-llm = ChatVertexAI(model_name="gemini-2.0-flash", temperature=0)
-embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
-tokenizer = tiktoken.get_encoding("cl100k_base")
-sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
+# Models are built on first use (see services.py)
+def _build_llm():
+    from langchain_google_vertexai import ChatVertexAI
+    return ChatVertexAI(model_name="gemini-2.0-flash", temperature=0)
+
+def _build_embeddings():
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    # Repeat texts (unchanged chunks, topic dedup checks) are served from the on-disk cache
+    return CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004"))
+
+llm = register("vertex_llm", _build_llm)
+embeddings = register("embeddings", _build_embeddings)
+tokenizer = register("tokenizer", lambda: tiktoken.get_encoding("cl100k_base"))
+sparse_embeddings = register("sparse_bm25", lambda: FastEmbedSparse(model_name="Qdrant/bm25"))
 
 # Constants
 MAX_CONTEXT_TOKENS = 1000000
@@ -116,8 +127,8 @@ def initialize_qdrant() -> QdrantVectorStore:
         vector_store = QdrantVectorStore(
             client=client,
             collection_name=COLLECTION_NAME,
-            embedding=embeddings,
-            sparse_embedding=sparse_embeddings,
+            embedding=embeddings.resolve(),
+            sparse_embedding=sparse_embeddings.resolve(),
             retrieval_mode=RetrievalMode.HYBRID,
             vector_name="dense",
             sparse_vector_name="sparse"
@@ -133,28 +144,23 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     """Extract text from PDF using PyMuPDF with memory optimization"""
     print_status(f"Extracting text from {os.path.basename(pdf_path)}...")
     try:
-        text = ""
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                text += page.get_text() + "\n"
-                # Clear memory after each page
-                if psutil.virtual_memory().percent > 85:
-                    gc.collect()
-        print_status(f"Extracted {len(text.split())} words")
+        pages = []
+        for page_num, page_text in enumerate(iter_pdf_pages(pdf_path)):
+            pages.append(page_text)
+            # Check memory pressure every few dozen pages rather than on every page
+            if page_num % 50 == 49 and psutil.virtual_memory().percent > 85:
+                gc.collect()
+        text = "".join(pages)
+        print_status(f"Extracted {len(text.split())} words from {len(pages)} pages")
         return text
     except Exception as e:
         print_status(f"Error extracting PDF: {str(e)}")
         raise
 
-def create_text_splitter() -> RecursiveCharacterTextSplitter:
-    """Create a text splitter configured for semantic chunking"""
-    return RecursiveCharacterTextSplitter(
-        chunk_size=TARGET_CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=lambda text: len(tokenizer.encode(text)),
-        separators=["\n\n", "\n", " ", ""],
-        is_separator_regex=False
-    )
+def split_into_chunks(full_text: str) -> Tuple[TokenIndex, List[TokenSpan]]:
+    """Tokenise the book once and split it into token spans for semantic chunking"""
+    index = TokenIndex(full_text, tokenizer)
+    return index, index.split(TARGET_CHUNK_SIZE, CHUNK_OVERLAP)
 
 async def enrich_chunk(full_text: str, chunk_text: str, chunk_num: int, total_chunks: int) -> str:
     """Generate context explanation with token safety"""
@@ -186,72 +192,91 @@ async def enrich_chunk(full_text: str, chunk_text: str, chunk_num: int, total_ch
         print_status(f"Error enriching chunk: {str(e)}")
         raise
 
-async def process_text_to_chunks(full_text: str, filename: str) -> List[Dict]:
-    """Convert text to semantic chunks with memory management"""
+async def process_text_to_chunks(
+    full_text: str,
+    filename: str,
+    enrichment_mode: str = "full",
+    book_summary: Optional[str] = None,
+    index: Optional[TokenIndex] = None,
+    manifest: Optional[BookManifest] = None,
+) -> Tuple[List[Dict], Dict]:
+    """Convert text to semantic chunks with memory management
+
+    Returns the chunks and the book's enrichment token report. `enrichment_mode` is one
+    of "full", "cached" (Vertex context cache) or "hierarchical" (section summaries plus
+    neighbouring chunks), see BookEnricher. Chunks whose text already has a context in
+    the manifest are not enriched again.
+    """
+    from react_agent.contextual_enrichment import BookEnricher
+
     print_status(f"Processing text from {filename}...")
     try:
-        text_splitter = create_text_splitter()
         chunks = []
         
-        # First split into documents using the text splitter
-        documents = text_splitter.create_documents([full_text])
+        # First split into token spans, reusing the book's token index if we have one
+        if index is None:
+            index, spans = split_into_chunks(full_text)
+        else:
+            spans = index.split(TARGET_CHUNK_SIZE, CHUNK_OVERLAP)
+        enricher = BookEnricher(
+            full_text, filename, [span.text for span in spans],
+            mode=enrichment_mode, book_summary=book_summary,
+            index=index, chunk_tokens=[span.n_tokens for span in spans]
+        )
         
         # Process each chunk with context enrichment
-        for i, doc in enumerate(tqdm(documents, desc="Processing chunks")):
+        for i, span in enumerate(tqdm(spans, desc="Processing chunks")):
             chunk_num = i + 1
-            chunk_text = doc.page_content
+            chunk_text = span.text
             
             # Process chunks in smaller batches
             if len(chunks) % 10 == 0:
                 gc.collect()
                 
-            context = await enrich_chunk(full_text, chunk_text, chunk_num, len(documents))
+            chunk_hash = text_hash(chunk_text)
+            context = manifest.context_for(chunk_hash) if manifest else None
+            if context is None:
+                try:
+                    context = await enricher.enrich(chunk_num)
+                except Exception:
+                    await enricher.close()
+                    raise
+                if manifest:
+                    manifest.record_context(chunk_hash, context)
             
             chunks.append({
                 "text": chunk_text,
+                "text_hash": chunk_hash,
                 "context": context,
-                "token_count": len(tokenizer.encode(chunk_text)),
+                "token_count": span.n_tokens,
                 "source": filename,
                 "chunk_num": chunk_num
             })
         
         print_status(f"Processed {len(chunks)} semantic chunks")
-        return chunks
+        token_report = await enricher.close()
+        return chunks, token_report
     except Exception as e:
         print_status(f"Error processing chunks: {str(e)}")
         raise
 
-def safe_truncate(text: str, max_tokens: int) -> str:
-    """Token-aware truncation preserving sentence boundaries"""
-    tokens = tokenizer.encode(text)
-    if len(tokens) <= max_tokens:
-        return text
-    
-    # Decode back to text but only up to max_tokens
-    truncated = tokenizer.decode(tokens[:max_tokens])
-    
-    # Find the last natural boundary in the truncated text
-    last_boundary = max(
-        truncated.rfind("."),
-        truncated.rfind("?"),
-        truncated.rfind("!"),
-        truncated.rfind("\n\n"),  # Paragraph break
-        truncated.rfind("\n"),    # Line break
-        truncated.rfind(" "),     # Word boundary
-        0  # Fallback to start if no boundaries found
-    )
-    
-    # Return up to the boundary if found, otherwise return truncated
-    return truncated[:last_boundary + 1] if last_boundary > 0 else truncated
+def safe_truncate(text: str, max_tokens: int, index: Optional[TokenIndex] = None) -> str:
+    """Token-aware truncation preserving sentence boundaries
 
+    Pass the document's TokenIndex to avoid re-encoding the text on every call.
+    """
+    if index is None:
+        index = TokenIndex(text, tokenizer)
+    return index.truncate(max_tokens)
 
-async def generate_book_metadata(full_text: str, filename: str) -> Tuple[str, List[str]]:
+
+async def generate_book_metadata(full_text: str, filename: str, index: Optional[TokenIndex] = None) -> Tuple[str, List[str]]:
     """Generate summary and validated tags for the book"""
     print_status(f"Generating metadata for {filename}...")
     try:
         summary_prompt = f"""
         Book Content (truncated):
-        {safe_truncate(full_text, 1000000)}
+        {safe_truncate(full_text, 1000000, index)}
         
         Generate a comprehensive 3-4 sentence summary of this book that captures:
         1. The main themes and arguments
@@ -280,62 +305,123 @@ async def generate_book_metadata(full_text: str, filename: str) -> Tuple[str, Li
         print_status(f"Error generating metadata: {str(e)}")
         return "No summary available", []
 
-async def process_book(filepath: str, vector_store: QdrantVectorStore) -> Dict:
-    """Process a single book with memory optimization"""
+_bulk_loaders: Dict[int, "BulkLoader"] = {}
+
+def get_bulk_loader(vector_store: QdrantVectorStore) -> "BulkLoader":
+    """One BulkLoader per vector store, so the FastEmbed model is loaded once"""
+    from react_agent.bulk_loader import BulkLoader
+
+    if id(vector_store) not in _bulk_loaders:
+        _bulk_loaders[id(vector_store)] = BulkLoader.from_vector_store(vector_store)
+    return _bulk_loaders[id(vector_store)]
+
+async def process_book(filepath: str, vector_store: QdrantVectorStore, enrichment_mode: str = "full") -> Dict:
+    """Process a single book with memory optimization
+
+    Idempotent: points get deterministic IDs and the book's manifest records what is
+    already enriched and stored, so a re-run (after a crash or a parser change) only
+    enriches and embeds the chunks that are new or changed.
+    """
     filename = os.path.basename(filepath)
     print_status(f"\n=== Processing {filename} ===")
     
     try:
+        manifest = BookManifest(os.path.dirname(filepath), filename, file_hash(filepath))
         full_text = extract_text_from_pdf(filepath)
-        summary, tags = await generate_book_metadata(full_text, filename)
-        chunks = await process_text_to_chunks(full_text, filename)
+        index = TokenIndex(full_text, tokenizer)
+        if manifest.summary is None:
+            summary, tags = await generate_book_metadata(full_text, filename, index)
+            manifest.record_metadata(summary, tags)
+        else:
+            summary, tags = manifest.summary, manifest.tags
+        chunks, token_report = await process_text_to_chunks(
+            full_text, filename, enrichment_mode=enrichment_mode, book_summary=summary,
+            index=index, manifest=manifest
+        )
         
-        # Process documents in smaller batches
-        batch_size = 5
-        for i in tqdm(range(0, len(chunks), batch_size), desc="Storing chunks"):
-            batch = chunks[i:i + batch_size]
-            documents = []
-            
-            for chunk in batch:
-                documents.append(Document(
-                    page_content=chunk["text"],
-                    metadata={
-                        "source": filename,
-                        "context": chunk["context"],
-                        "book_summary": summary,
-                        "tags": tags,
-                        "chunk_index": chunk["chunk_num"],
-                        "total_chunks": len(chunks),
-                        "processed_at": datetime.now().isoformat()
-                    }
-                ))
-            
-            # Add documents in batches
-            uuids = [str(uuid.uuid4()) for _ in range(len(documents))]
-            vector_store.add_documents(documents=documents, ids=uuids)
-            
-            # Clear memory between batches
-            del documents
-            gc.collect()
+        loader = get_bulk_loader(vector_store)
+        if manifest.legacy:
+            print_status(f"Removing {filename}'s points from before deterministic IDs")
+            loader.delete_source(filename)
+            manifest.legacy_deleted()
+        pending = [chunk for chunk in chunks if not manifest.is_stored(chunk["chunk_num"], chunk["text_hash"])]
+        print_status(f"{len(pending)}/{len(chunks)} chunks of {filename} are new or changed")
+        
+        documents = [
+            Document(
+                page_content=chunk["text"],
+                metadata={
+                    "source": filename,
+                    "context": chunk["context"],
+                    "book_summary": summary,
+                    "tags": tags,
+                    "chunk_index": chunk["chunk_num"],
+                    "total_chunks": len(chunks),
+                    "processed_at": datetime.now().isoformat()
+                }
+            )
+            for chunk in pending
+        ]
+        
+        # Embed dense + sparse in bulk and upload in parallel batches
+        ids = [manifest.point_id(chunk["chunk_num"]) for chunk in pending]
+        stats = await loader.aload(documents, ids)
+        manifest.record_stored([(chunk["chunk_num"], chunk["text_hash"]) for chunk in pending])
+        print_status(f"Stored {filename}: {stats.summary()}")
+        
+        stale_ids = manifest.finish(len(chunks), [chunk["text_hash"] for chunk in chunks])
+        if stale_ids:
+            print_status(f"Deleting {len(stale_ids)} stale points of {filename}")
+            loader.delete(stale_ids)
+            manifest.deleted(stale_ids)
+        
+        del documents
+        gc.collect()
         
         return {
             "filename": filename,
             "summary": summary,
             "tags": tags,
             "total_chunks": len(chunks),
+            "token_usage": token_report,
             "processed_at": datetime.now().isoformat()
         }
     except Exception as e:
         print_status(f"Error processing book {filename}: {str(e)}")
         raise
 
-def is_file_processed(directory: str, filename: str) -> bool:
-    """Check if a file has already been processed"""
+def is_file_processed(directory: str, filename: str, reindex: bool = False) -> bool:
+    """Check if a file has already been processed
+
+    A book counts as processed when its manifest is complete for the file's current
+    hash (or, for books indexed before manifests, when its .meta.json exists). With
+    `reindex` every book is re-chunked, and only the delta is re-embedded.
+    """
+    if reindex:
+        return False
+    book_hash, complete = BookManifest.peek(directory, filename)
+    if book_hash is not None:
+        return complete and book_hash == file_hash(os.path.join(directory, filename))
     meta_file = os.path.join(directory, "metadata_json", f"{filename}.meta.json")
     return os.path.exists(meta_file)
 
-async def process_pdf_directory(directory: str = "my_test_files") -> None:
-    """Full processing pipeline with error recovery"""
+async def process_pdf_directory(
+    directory: str = "my_test_files",
+    parallel: bool = False,
+    enrichment_mode: str = "full",
+    reindex: bool = False,
+    **pipeline_kwargs
+) -> None:
+    """Full processing pipeline with error recovery
+
+    With `parallel=True` the staged IngestionPipeline is used instead: extraction in a
+    process pool, rate-limited concurrent enrichment and batched upserts, resumable per chunk.
+    """
+    if parallel:
+        from react_agent.ingest_pipeline import run_ingestion_pipeline
+        await run_ingestion_pipeline(directory, enrichment_mode=enrichment_mode, reindex=reindex, **pipeline_kwargs)
+        return
+
     print_status("Starting pipeline")
     vector_store = initialize_qdrant()
     
@@ -345,20 +431,21 @@ async def process_pdf_directory(directory: str = "my_test_files") -> None:
         print_status(f"Found {len(pdf_files)} PDFs to process")
         
         for filename in tqdm(pdf_files, desc="Processing PDFs"):
-            if is_file_processed(directory, filename):
+            if is_file_processed(directory, filename, reindex):
                 print_status(f"Skipping already processed file: {filename}")
                 continue
                 
             filepath = os.path.join(directory, filename)
             try:
                 check_memory()
-                book_data = await process_book(filepath, vector_store)
+                book_data = await process_book(filepath, vector_store, enrichment_mode=enrichment_mode)
                 
                 with open(os.path.join(directory, "metadata_json", f"{filename}.meta.json"), "w") as f:
                     json.dump({
                         "summary": book_data["summary"],
                         "tags": book_data["tags"],
                         "chunk_count": book_data["total_chunks"],
+                        "token_usage": book_data["token_usage"],
                         "processed_at": book_data["processed_at"]
                     }, f, indent=2)
                 
@@ -371,14 +458,40 @@ async def process_pdf_directory(directory: str = "my_test_files") -> None:
         print_status(f"Pipeline error: {str(e)}")
         raise
     finally:
+        print_status(f"Embedding cache: {embeddings.stats()}")
         print_status("Pipeline finished")
 
 
+TOPIC_INDEX_MODES = ("remote", "mirror", "local")
+# remote: every check hits Qdrant; mirror: local index + write-through; local: no Qdrant at all
+TOPIC_INDEX_MODE = os.getenv("TOPIC_INDEX_MODE", "remote")
+TOPIC_INDEX_PATH = os.getenv("TOPIC_INDEX_PATH")
+
 class TopicVectorStore:
-    def __init__(self, embeddings, qdrant_url: str, api_key: str, collection_name: str = "psychology-topic-cache"):
+    def __init__(
+        self,
+        embeddings,
+        qdrant_url: str,
+        api_key: str,
+        collection_name: str = "psychology-topic-cache",
+        mode: str = TOPIC_INDEX_MODE,
+        local_path: Optional[str] = TOPIC_INDEX_PATH,
+    ):
+        if mode not in TOPIC_INDEX_MODES:
+            raise ValueError(f"Unknown topic index mode '{mode}', expected one of {TOPIC_INDEX_MODES}")
         self.embeddings = embeddings
         self.collection_name = collection_name
         self.vector_name = "dense"
+        self.mode = mode
+        self._check_lock = asyncio.Lock()
+        self._pending_writes = set()
+
+        # Local-only mode (tests, offline runs) never touches Qdrant; the index can persist to local_path
+        self.local_index = LocalTopicIndex(path=local_path if mode == "local" else None) if mode != "remote" else None
+        if mode == "local":
+            self.qdrant_client = None
+            self.store = None
+            return
 
         self.qdrant_client = QdrantClient(
             url=qdrant_url,
@@ -400,7 +513,61 @@ class TopicVectorStore:
             vector_name=self.vector_name
         )
 
+        if mode == "mirror":
+            self.local_index.load_from_qdrant(self.qdrant_client, collection_name, self.vector_name)
+            print_status(f"Mirrored {len(self.local_index)} topics from {collection_name}")
+
+    @staticmethod
+    def _content(insight: BaseModel) -> str:
+        return f"{insight.explanation.strip()} | {insight.psychological_effect.strip()}"
+
+    def _point(self, point_id: str, insight: BaseModel, content: str, vector) -> PointStruct:
+        return PointStruct(
+            id=point_id,
+            vector={self.vector_name: vector},
+            payload={
+                "page_content": content,
+                "metadata": {
+                    "title": insight.concept_title,
+                    "timestamp": datetime.now().isoformat(),
+                    "raw_data": insight.model_dump()
+                }
+            }
+        )
+
+    def _add_local(self, insight: BaseModel, content: str, vector) -> None:
+        """Insert into the local index and write through to Qdrant in the background"""
+        point_id = str(uuid4())
+        self.local_index.add(point_id, vector, insight.concept_title)
+        if self.mode == "local":
+            if self.local_index.path:
+                self.local_index.save()
+            return
+        task = asyncio.create_task(asyncio.to_thread(
+            self.qdrant_client.upsert,
+            collection_name=self.collection_name,
+            points=[self._point(point_id, insight, content, vector)],
+            wait=False,
+        ))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._write_done)
+
+    def _write_done(self, task: asyncio.Task) -> None:
+        self._pending_writes.discard(task)
+        if not task.cancelled() and task.exception():
+            print_status(f"Topic write-through to Qdrant failed: {task.exception()}")
+
+    async def flush(self) -> None:
+        """Wait for outstanding write-through upserts; runs await this before their loop closes"""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+
     async def add_concept(self, insight: BaseModel):
+        if self.local_index is not None:
+            content = self._content(insight)
+            vector = (await self.embeddings.aembed_documents([content]))[0]
+            self._add_local(insight, content, vector)
+            return
         content = f"{insight.explanation} | {insight.psychological_effect}"
         doc = Document(
             page_content=content,
@@ -413,7 +580,14 @@ class TopicVectorStore:
         await self.store.aadd_documents([doc], ids=[str(uuid4())])
 
     async def is_duplicate(self, insight: BaseModel, threshold: float = 0.85) -> Tuple[bool, Optional[str]]:
-        query = f"{insight.explanation.strip()} | {insight.psychological_effect.strip()}"
+        query = self._content(insight)
+        if self.local_index is not None:
+            result = self.local_index.search(await self.embeddings.aembed_query(query), k=1)
+            if not result:
+                return False, None
+            title, score = result[0]
+            print(f"\nSIMILARITY WITH PREVIOUS TITLES: {score}\n")
+            return score >= threshold, title
         result = await self.store.asimilarity_search_with_score(query, k=1)
         if not result:
             return False, None
@@ -421,13 +595,56 @@ class TopicVectorStore:
         print(f"\nSIMILARITY WITH PREVIOUS TITLES: {score}\n")
         return score >= threshold, doc.metadata.get("title")
 
+    async def _nearest(self, vector, k: int) -> List[Tuple[str, float]]:
+        if self.local_index is not None:
+            return self.local_index.search(vector, k)
+        response = await asyncio.to_thread(
+            self.qdrant_client.query_points,
+            collection_name=self.collection_name,
+            query=vector,
+            using=self.vector_name,
+            limit=k,
+            with_payload=["metadata.title"],
+        )
+        return [((p.payload or {}).get("metadata", {}).get("title"), p.score) for p in response.points]
+
+    @traced("qdrant.topic_check_and_add", kind="qdrant")
+    async def check_and_add(self, insight: BaseModel, threshold: float = 0.85, k: int = 5) -> Tuple[bool, List[Tuple[str, float]]]:
+        """is_duplicate + add_concept with one embedding and one search.
+
+        The insight is embedded once, the top-k neighbours are fetched with that vector, and
+        a novel insight is upserted with the same vector. Returns (is_duplicate, [(title,
+        score), ...]) so the caller can show the nearest titles to the model on a retry.
+        The lock makes check-then-insert atomic for concurrent callers in this process.
+        """
+        content = self._content(insight)
+        vector = (await self.embeddings.aembed_documents([content]))[0]
+
+        async with self._check_lock:
+            nearest = await self._nearest(vector, k)
+            if nearest:
+                print(f"\nSIMILARITY WITH PREVIOUS TITLES: {nearest[0][1]}\n")
+            is_duplicate = bool(nearest) and nearest[0][1] >= threshold
+            if not is_duplicate:
+                if self.local_index is not None:
+                    self._add_local(insight, content, vector)
+                else:
+                    await asyncio.to_thread(
+                        self.qdrant_client.upsert,
+                        collection_name=self.collection_name,
+                        points=[self._point(str(uuid4()), insight, content, vector)],
+                        wait=True,
+                    )
+        return is_duplicate, nearest
+
 
-topic_store = TopicVectorStore(
-    embeddings=embeddings,
+# Connecting (and mirroring, in mirror mode) happens on first use, not at import
+topic_store = register("topic_store", lambda: TopicVectorStore(
+    embeddings=embeddings.resolve(),
     qdrant_url=QDRANT_URL,
     api_key=QDRANT_API_KEY,
     collection_name="psychology-topic-cache"
-)
+))
 
 # if __name__ == "__main__":
 #     asyncio.run(process_pdf_directory())
\ No newline at end of file
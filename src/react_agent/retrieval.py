@@ -1,12 +1,16 @@
 import json
 import os
+import time
+import asyncio
+import threading
 
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import torch
 from dotenv import load_dotenv
+from cachetools import TTLCache
 from pydantic import BaseModel, Field, PrivateAttr
 
 from langchain_core.documents import Document
@@ -15,77 +19,186 @@ from langchain_core.retrievers import BaseRetriever
 from langchain_qdrant import QdrantVectorStore, FastEmbedSparse
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from qdrant_client import QdrantClient
-from FlagEmbedding import FlagReranker
+
+from react_agent.configuration import BaseConfiguration
+from react_agent.embedding_cache import CachedEmbeddings
+from react_agent.hybrid_query import hybrid_request
 
 load_dotenv()
 
-# class HybridRerankerRetriever(BaseRetriever, BaseModel):
-#     """Enhanced hybrid retriever with Qdrant (BM25 + dense) and reranking"""
-    
-#     vector_store: QdrantVectorStore
-#     reranker_model: str = Field(default="BAAI/bge-reranker-v2-m3")
-#     top_n: int = Field(default=5)  # Increased from 3 to get more context
-#     normalize_scores: bool = Field(default=True)
-#     _reranker: FlagReranker = PrivateAttr()
-    
-#     def __init__(self, **data):
-#         super().__init__(**data)
-#         device = "cuda" if torch.cuda.is_available() else "cpu"
-#         print(f"Using device: {device} for reranker")
-#         self._reranker = FlagReranker(
-#             self.reranker_model,
-#             device=device
-#         )
-
-#     def _get_relevant_documents(self, query: str, **kwargs) -> List[Document]:
-#         """Enhanced retrieval with hybrid search and reranking"""
-#         # First-stage retrieval with more candidates
-#         results_with_scores = self.vector_store.similarity_search_with_score(
-#             query,
-#             k=self.top_n * 5,  # Get more candidates for better recall
-#         )
-        
-#         hybrid_results = [doc for doc, _ in results_with_scores]
-#         hybrid_scores = [score for _, score in results_with_scores]
-        
-#         # Normalize hybrid scores
-#         if hybrid_scores and self.normalize_scores:
-#             max_score = max(hybrid_scores)
-#             min_score = min(hybrid_scores)
-#             if max_score != min_score:
-#                 hybrid_scores = [(s - min_score)/(max_score - min_score) for s in hybrid_scores]
-        
-#         # Rerank with cross-encoder
-#         query_doc_pairs = [[query, doc.page_content] for doc in hybrid_results]
-#         reranker_scores = self._reranker.compute_score(
-#             query_doc_pairs,
-#             normalize=self.normalize_scores
-#         )
-        
-#         # Combine and score documents
-#         scored_docs = []
-#         for doc, hybrid_score, reranker_score in zip(hybrid_results, hybrid_scores, reranker_scores):
-#             combined_score = self._combine_scores(hybrid_score, reranker_score)
-#             scored_docs.append(Document(
-#                 page_content=doc.page_content,
-#                 metadata={
-#                     **doc.metadata,
-#                     "hybrid_score": float(hybrid_score),
-#                     "reranker_score": float(reranker_score),
-#                     "combined_score": float(combined_score)
-#                 }
-#             ))
-        
-#         # Return top documents by combined score
-#         return sorted(scored_docs, key=lambda x: x.metadata["combined_score"], reverse=True)[:self.top_n]
-    
-#     def _combine_scores(self, hybrid_score: float, reranker_score: float) -> float:
-#         """Weighted combination of scores favoring reranker"""
-#         return (0.3 * hybrid_score) + (0.7 * reranker_score)  # Give more weight to reranker
+# "flag": FlagEmbedding cross-encoder (torch); "onnx": fastembed TextCrossEncoder on ONNX Runtime,
+# e.g. reranker_model="Xenova/ms-marco-MiniLM-L-6-v2"
+RERANK_BACKENDS = ("flag", "onnx")
+
+
+class HybridRerankerRetriever(BaseRetriever):
+    """Hybrid retrieval with server-side RRF fusion and local cross-encoder reranking.
+
+    1. embed: dense query vector (cached) + BM25 sparse query vector (local FastEmbed)
+    2. search: one Query API call; Qdrant prefetches dense and sparse candidates and fuses
+       them with Reciprocal Rank Fusion on the server
+    3. rerank: cross-encoder on CPU over length-bucketed batches (FlagReranker, or an
+       ONNX model through fastembed's TextCrossEncoder)
+
+    Ranked ids per query are kept in a TTL cache; a hit skips embedding, search and
+    reranking and only fetches the payloads by id. Per-stage latency for the last call is
+    in `last_timings` and in each document's metadata.
+    """
+
+    client: Any
+    collection_name: str = "shorts-resources"
+    embeddings: Any
+    sparse_model_name: str = "Qdrant/bm25"
+    dense_vector_name: str = "dense"
+    sparse_vector_name: str = "sparse"
+    candidate_k: int = 30
+    top_n: int = 3
+    reranker_model: Optional[str] = "BAAI/bge-reranker-v2-m3"
+    reranker_backend: str = "flag"
+    rerank_batch_size: int = 16
+    rerank_max_length: int = 512
+    cache_ttl: float = 600.0
+    cache_size: int = 256
+
+    _reranker: Any = PrivateAttr(default=None)
+    _sparse_model: Any = PrivateAttr(default=None)
+    _cache: Any = PrivateAttr(default=None)
+    _cache_lock: Any = PrivateAttr(default=None)
+    last_timings: Dict[str, float] = Field(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.reranker_backend not in RERANK_BACKENDS:
+            raise ValueError(f"Unknown reranker backend '{self.reranker_backend}', expected one of {RERANK_BACKENDS}")
+        self._cache = TTLCache(maxsize=self.cache_size, ttl=self.cache_ttl)
+        self._cache_lock = threading.Lock()
+
+    @property
+    def sparse_model(self):
+        if self._sparse_model is None:
+            from fastembed import SparseTextEmbedding
+            self._sparse_model = SparseTextEmbedding(model_name=self.sparse_model_name)
+        return self._sparse_model
+
+    @property
+    def reranker(self):
+        if self._reranker is None and self.reranker_model:
+            if self.reranker_backend == "onnx":
+                from fastembed.rerank.cross_encoder import TextCrossEncoder
+                self._reranker = TextCrossEncoder(model_name=self.reranker_model)
+            else:
+                from FlagEmbedding import FlagReranker
+                self._reranker = FlagReranker(self.reranker_model, use_fp16=torch.cuda.is_available())
+        return self._reranker
+
+    def _search(self, query: str, timings: Dict[str, float]) -> List[Any]:
+        t0 = time.perf_counter()
+        dense = self.embeddings.embed_query(query)
+        sparse = next(iter(self.sparse_model.query_embed(query)))
+        timings["embed_ms"] = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        request = hybrid_request(dense, sparse, self.candidate_k, self.dense_vector_name, self.sparse_vector_name)
+        response = self.client.query_batch_points(collection_name=self.collection_name, requests=[request])[0]
+        timings["search_ms"] = (time.perf_counter() - t0) * 1000
+        return response.points
+
+    def _rerank_scores(self, query: str, texts: List[str]) -> List[float]:
+        """Cross-encoder scores, computed in batches of similar-length texts to minimise padding"""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        scores = [0.0] * len(texts)
+        for start in range(0, len(order), self.rerank_batch_size):
+            bucket = order[start:start + self.rerank_batch_size]
+            bucket_texts = [texts[i] for i in bucket]
+            if self.reranker_backend == "onnx":
+                bucket_scores = list(self.reranker.rerank(query, bucket_texts, batch_size=len(bucket_texts)))
+            else:
+                bucket_scores = self.reranker.compute_score(
+                    [[query, t] for t in bucket_texts],
+                    batch_size=len(bucket_texts),
+                    max_length=self.rerank_max_length,
+                    normalize=True,
+                )
+                if not isinstance(bucket_scores, list):
+                    bucket_scores = [bucket_scores]
+            for i, score in zip(bucket, bucket_scores):
+                scores[i] = float(score)
+        return scores
+
+    @staticmethod
+    def _to_document(point, **scores) -> Document:
+        payload = point.payload or {}
+        return Document(
+            page_content=payload.get("page_content", ""),
+            metadata={**payload.get("metadata", {}), "point_id": str(point.id), **scores},
+        )
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, **kwargs) -> List[Document]:
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        key = (query.strip(), self.top_n)
+
+        with self._cache_lock:
+            ranked = self._cache.get(key)
+        if ranked is not None:
+            t0 = time.perf_counter()
+            points = {str(p.id): p for p in self.client.retrieve(
+                collection_name=self.collection_name, ids=[pid for pid, _, _ in ranked], with_payload=True
+            )}
+            timings["fetch_ms"] = (time.perf_counter() - t0) * 1000
+            documents = [
+                self._to_document(points[str(pid)], hybrid_score=hybrid, reranker_score=rerank)
+                for pid, hybrid, rerank in ranked if str(pid) in points
+            ]
+            timings["cache_hit"] = 1.0
+        else:
+            points = self._search(query, timings)
+            if self.reranker_model and points:
+                t0 = time.perf_counter()
+                rerank = self._rerank_scores(query, [(p.payload or {}).get("page_content", "") for p in points])
+                timings["rerank_ms"] = (time.perf_counter() - t0) * 1000
+            else:
+                rerank = [p.score for p in points]
+            ranked_points = sorted(zip(points, rerank), key=lambda x: x[1], reverse=True)[:self.top_n]
+            documents = [self._to_document(p, hybrid_score=p.score, reranker_score=r) for p, r in ranked_points]
+            with self._cache_lock:
+                # Raw ids: Qdrant rejects integer ids passed back as strings
+                self._cache[key] = [(p.id, p.score, r) for p, r in ranked_points]
+            timings["cache_hit"] = 0.0
+
+        timings["total_ms"] = (time.perf_counter() - started) * 1000
+        self.last_timings = timings
+        for doc in documents:
+            doc.metadata["timings"] = timings
+        print(f"[retrieval] {len(documents)} docs for '{query[:60]}': " +
+              ", ".join(f"{k}={v:.1f}" for k, v in timings.items()))
+        return documents
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None, **kwargs) -> List[Document]:
+        return await asyncio.to_thread(self._get_relevant_documents, query)
+
+
+def build_hybrid_reranker_retriever(config: Optional[BaseConfiguration] = None, **kwargs) -> HybridRerankerRetriever:
+    """HybridRerankerRetriever configured from BaseConfiguration (reranker model, top-n, k)"""
+    config = config or BaseConfiguration.from_runnable_config()
+    client = QdrantClient(
+        url=os.getenv("QDRANT_URL"),
+        api_key=os.getenv("QDRANT_API_KEY"),
+        timeout=120
+    )
+    params = {
+        "client": client,
+        "embeddings": CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")),
+        "candidate_k": max(config.retriever_search_kwargs.get("k", 10), config.reranker_top_n),
+        "top_n": config.reranker_top_n,
+        "reranker_model": config.reranker_model,
+    }
+    params.update(kwargs)
+    return HybridRerankerRetriever(**params)
+
 
 def initialize_hybrid_retriever():
     """Initialize and return a properly configured hybrid retriever"""
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+    embeddings = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/text-embedding-004"))
     
     client = QdrantClient(
         url=os.getenv("QDRANT_URL"),
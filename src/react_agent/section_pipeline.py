@@ -0,0 +1,180 @@
+import os
+import time
+import asyncio
+import weakref
+import functools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from react_agent.structures import AudioMetadata, SectionOutput, VideoMetadata
+from react_agent.utils import sanitize_filename
+from react_agent.handle_kokoro import generate_tts
+from react_agent.pexels_handler import search_and_validate_videos
+from react_agent.video_editor import create_reel_for_audio, get_duration
+
+from react_agent.services import register
+
+# Concurrency per resource; TTS shares one ONNX session, renders are ffmpeg processes
+LLM_SLOTS = int(os.environ.get('LLM_SLOTS', 4))
+TTS_SLOTS = int(os.environ.get('TTS_SLOTS', 1))
+DOWNLOAD_SLOTS = int(os.environ.get('DOWNLOAD_SLOTS', 4))
+RENDER_SLOTS = int(os.environ.get('RENDER_SLOTS', max(1, (os.cpu_count() or 2) // 2)))
+UPLOAD_SLOTS = int(os.environ.get('UPLOAD_SLOTS', 1))
+
+
+class ResourceScheduler:
+    """Bounded slots per resource kind (llm, tts, download, render, upload).
+
+    Sections (and, in batch mode, whole shorts) run concurrently, but each stage only
+    starts when a slot for its resource is free, so e.g. six sections never launch six
+    ffmpeg encodes at once. Time spent waiting for and holding slots is recorded per resource.
+    Semaphores are created per event loop, since an asyncio.Semaphore is bound to the loop
+    it was first contended on and the scheduler outlives any one asyncio.run.
+    """
+
+    def __init__(
+        self,
+        llm: int = LLM_SLOTS,
+        tts: int = TTS_SLOTS,
+        download: int = DOWNLOAD_SLOTS,
+        render: int = RENDER_SLOTS,
+        upload: int = UPLOAD_SLOTS,
+    ):
+        self.limits = {"llm": llm, "tts": tts, "download": download, "render": render, "upload": upload}
+        self._semaphores = weakref.WeakKeyDictionary()  # event loop -> {resource: Semaphore}
+        self.waited: Dict[str, float] = {name: 0.0 for name in self.limits}
+        self.busy: Dict[str, float] = {name: 0.0 for name in self.limits}
+
+    def _semaphore(self, resource: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.get(loop)
+        if semaphores is None:
+            semaphores = self._semaphores[loop] = {name: asyncio.Semaphore(n) for name, n in self.limits.items()}
+        return semaphores[resource]
+
+    @asynccontextmanager
+    async def slot(self, resource: str):
+        requested = time.perf_counter()
+        async with self._semaphore(resource):
+            acquired = time.perf_counter()
+            self.waited[resource] += acquired - requested
+            try:
+                yield
+            finally:
+                self.busy[resource] += time.perf_counter() - acquired
+
+    def limit(self, resource: str, node):
+        """Wrap a graph node so each execution holds one slot of `resource`.
+
+        functools.wraps keeps the node's signature visible, so LangGraph still passes
+        `config` to nodes that take it.
+        """
+        @functools.wraps(node)
+        async def limited(*args, **kwargs):
+            async with self.slot(resource):
+                return await node(*args, **kwargs)
+        return limited
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: {"slots": self.limits[name], "busy_s": round(self.busy[name], 2),
+                       "waited_s": round(self.waited[name], 2)} for name in self.limits}
+
+
+# One scheduler per process: concurrent shorts in a batch share the same slots
+shared_scheduler = register("scheduler", ResourceScheduler)
+
+
+@dataclass
+class SectionResult:
+    section_key: str
+    audio: Optional[AudioMetadata] = None
+    videos: List[VideoMetadata] = field(default_factory=list)
+    failures: List[Dict[str, Any]] = field(default_factory=list)
+    output: Optional[SectionOutput] = None
+    warning: Optional[str] = None
+    seconds: float = 0.0
+
+
+async def run_section(
+    section,
+    script_title: str,
+    model,
+    scheduler: ResourceScheduler,
+    visuals_dir: Path,
+    output_dir: str,
+    voice: str,
+) -> SectionResult:
+    """TTS and clip download for one section in parallel, then its render"""
+    started = time.perf_counter()
+    section_name = section.section.replace(' ', '_')
+    result = SectionResult(section_key=section_name.upper())
+
+    async def tts():
+        async with scheduler.slot("tts"):
+            return await asyncio.to_thread(
+                generate_tts, text=section.text, video_name=script_title, section=section.section, voice=voice
+            )
+
+    async def download():
+        section_dir = visuals_dir / sanitize_filename(f"section_{section.section}")
+        section_dir.mkdir(parents=True, exist_ok=True)
+        async with scheduler.slot("download"):
+            return await search_and_validate_videos(section=section, model=model, section_dir=section_dir)
+
+    try:
+        result.audio, (result.videos, result.failures) = await asyncio.gather(tts(), download())
+        clips = sorted({v.file_path for v in result.videos})
+        if result.audio is None:
+            result.warning = f"Section {result.section_key}: TTS failed"
+        elif not clips:
+            result.warning = f"No visual files found for section {result.section_key}."
+        else:
+            safe_section_name = "".join(c if c.isalnum() or c in ('_', '-') else '_' for c in section_name)
+            output_path = os.path.join(output_dir, f'reel_{safe_section_name}.mp4')
+            async with scheduler.slot("render"):
+                path = await create_reel_for_audio(result.audio.file_path, clips, output_path)
+            if path:
+                result.output = SectionOutput(section_key=result.section_key, path=path, duration=await get_duration(path))
+            else:
+                result.warning = f"Section {result.section_key} failed to render a valid reel."
+    except Exception as e:
+        result.warning = f"Exception in processing section {result.section_key}: {e}"
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+async def run_section_pipeline(
+    script,
+    model,
+    visuals_root: str,
+    voice: str,
+    scheduler: Optional[ResourceScheduler] = None,
+    output_dir: str = "outputs",
+) -> List[SectionResult]:
+    """Run every section's pipeline concurrently; results are logged as each section completes.
+
+    `visuals_root` and `voice` come from the graph, so both media modes share the same clip
+    directories and TTS voice (and so the same stage-cache inputs).
+    """
+    scheduler = scheduler or shared_scheduler
+    script_title = sanitize_filename(script.title)
+    visuals_dir = Path(visuals_root) / script_title / "visuals"
+    visuals_dir.mkdir(parents=True, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    tasks = [
+        asyncio.create_task(run_section(section, script_title, model, scheduler, visuals_dir, output_dir, voice))
+        for section in script.sections
+    ]
+    results = []
+    for next_done in asyncio.as_completed(tasks):
+        result = await next_done
+        status = result.output.path if result.output else result.warning
+        print(f"[sections] {result.section_key} done at +{time.perf_counter() - started:.1f}s "
+              f"({result.seconds:.1f}s): {status}")
+        results.append(result)
+    print(f"[sections] scheduler: {scheduler.summary()}")
+    return results
@@ -0,0 +1,106 @@
+"""Lazy registry for the expensive shared clients and models.
+
+Module-level singletons (LLM clients, embeddings, the BM25 model, the Qdrant topic
+store, Pexels, Kokoro, Whisper) are registered as LazyService proxies. Nothing is built
+(and no heavy library is imported) until the first attribute access, so importing
+react_agent.graph stays fast and works offline. `warm_up()` builds services ahead of time
+in worker threads, e.g. at the start of a run.
+"""
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+
+class LazyService:
+    """Proxy that builds its object on first use and then forwards to it"""
+
+    def __init__(self, name: str, factory: Callable):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "build_seconds", None)
+
+    @property
+    def is_built(self) -> bool:
+        return self._instance is not None
+
+    def resolve(self):
+        """The real object, built on first call (thread-safe)"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    instance = self._factory()
+                    object.__setattr__(self, "build_seconds", time.perf_counter() - started)
+                    object.__setattr__(self, "_instance", instance)
+                    print(f"[services] built {self._name} in {self.build_seconds:.2f}s")
+        return self._instance
+
+    def __getattr__(self, item):
+        return getattr(self.resolve(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self.resolve(), key, value)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyService {self._name} ({'built' if self.is_built else 'not built'})>"
+
+
+_registry: Dict[str, LazyService] = {}
+
+
+def register(name: str, factory: Callable) -> LazyService:
+    """Register (or return the already registered) lazy service"""
+    if name not in _registry:
+        _registry[name] = LazyService(name, factory)
+    return _registry[name]
+
+
+def override(name: str, factory: Callable) -> LazyService:
+    """Replace a service's factory, e.g. with a local stand-in for tests and offline benchmarks.
+
+    Works before or after the real service is registered; an already built instance is
+    dropped, so the next use builds the stand-in.
+    """
+    service = register(name, factory)
+    with service._lock:
+        object.__setattr__(service, "_factory", factory)
+        object.__setattr__(service, "_instance", None)
+        object.__setattr__(service, "build_seconds", None)
+    return service
+
+
+def get_service(name: str):
+    return _registry[name].resolve()
+
+
+def service_status() -> Dict[str, Optional[float]]:
+    """Build time per service, None if not built yet"""
+    return {name: service.build_seconds for name, service in _registry.items()}
+
+
+async def flush_services(names: Iterable[str]) -> None:
+    """Await `flush()` on the named services that were built, e.g. background writes before the loop closes"""
+    for name in names:
+        service = _registry.get(name)
+        if service is not None and service.is_built:
+            await service.flush()
+
+
+async def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, Optional[float]]:
+    """Build services concurrently off the event loop; failures are logged, not raised"""
+    selected = [_registry[n] for n in names] if names is not None else list(_registry.values())
+
+    async def build(service: LazyService) -> None:
+        try:
+            await asyncio.to_thread(service.resolve)
+        except Exception as e:
+            print(f"[services] warm-up of {service._name} failed: {e}")
+
+    await asyncio.gather(*(build(s) for s in selected if not s.is_built))
+    return service_status()
@@ -0,0 +1,144 @@
+import os
+import json
+import hashlib
+import functools
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from react_agent import structures
+from react_agent.configuration import Configuration
+
+STAGE_CACHE_DIR = os.environ.get('STAGE_CACHE_DIR', os.path.join('my_test_files', 'stage_cache'))
+# Set STAGE_CACHE=0 to force every stage to run
+STAGE_CACHE_ENABLED = os.environ.get('STAGE_CACHE', '1') != '0'
+
+
+def file_fingerprint(path: str) -> Optional[List[Any]]:
+    """(path, size, mtime) - cheap change detection for large media inputs"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def dir_fingerprint(directory: str, extensions: Iterable[str]) -> List[List[Any]]:
+    """Fingerprints of the matching files under directory (recursive), in a stable order"""
+    extensions = tuple(extensions)
+    found = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(extensions):
+                found.append(file_fingerprint(os.path.join(root, name)))
+    return sorted(f for f in found if f)
+
+
+def input_key(stage: str, inputs: Dict[str, Any]) -> str:
+    payload = json.dumps({"stage": stage, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return {"__model__": type(value).__name__, "data": value.model_dump(mode="json")}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict) and "__model__" in value:
+        return getattr(structures, value["__model__"]).model_validate(value["data"])
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _decode(v) for k, v in value.items()}
+    return value
+
+
+class StageCache:
+    """Artifact manifests for graph stages, keyed by a hash of the stage inputs.
+
+    A manifest records the node's state update and the files it produced (with sizes).
+    A later run with the same inputs reuses the update as long as every artifact still
+    exists with its recorded size; otherwise the stage runs again.
+    """
+
+    def __init__(self, root: str = STAGE_CACHE_DIR):
+        self.root = root
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, f"{key}.json")
+
+    def lookup(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(stage, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            for artifact, size in manifest["artifacts"].items():
+                if not os.path.isfile(artifact) or os.path.getsize(artifact) != size:
+                    print(f"[stage-cache] {stage}: artifact changed or missing ({artifact}), rerunning")
+                    return None
+            return _decode(manifest["update"])
+        except Exception as e:
+            print(f"[stage-cache] {stage}: unreadable manifest {path} ({e}), rerunning")
+            return None
+
+    def store(self, stage: str, key: str, update: Dict[str, Any], artifacts: Iterable[str]) -> None:
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        manifest = {
+            "stage": stage,
+            "key": key,
+            "created_at": datetime.now().isoformat(),
+            "artifacts": {os.path.abspath(a): os.path.getsize(a) for a in artifacts if a and os.path.isfile(a)},
+            "update": _encode(update),
+        }
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+stage_cache = StageCache()
+
+
+def memoize_node(
+    stage: str,
+    inputs: Callable[..., Dict[str, Any]],
+    artifacts: Callable[[Dict[str, Any]], Iterable[str]],
+    cacheable: Callable[[Dict[str, Any]], bool] = lambda update: True,
+    cache: StageCache = stage_cache,
+):
+    """Skip a graph node when its inputs are unchanged and its artifacts are still valid.
+
+    `inputs(state, configuration)` returns everything the node's output depends on (text,
+    voice, file fingerprints, render params); `artifacts(update)` lists the files the
+    update points to. Updates with no artifacts, or rejected by `cacheable` (e.g. some
+    sections failed), are not cached, so the stage is retried on the next run.
+    """
+    def decorator(node):
+        @functools.wraps(node)
+        async def memoized(state, *args, **kwargs):
+            if not STAGE_CACHE_ENABLED:
+                return await node(state, *args, **kwargs)
+            config = kwargs.get("config", args[0] if args else None)
+            key = input_key(stage, inputs(state, Configuration.from_runnable_config(config)))
+
+            cached = cache.lookup(stage, key)
+            if cached is not None:
+                print(f"[stage-cache] {stage}: inputs unchanged, reusing {key[:12]}")
+                return cached
+
+            update = await node(state, *args, **kwargs)
+            produced = [a for a in artifacts(update) if a]
+            if produced and cacheable(update):
+                cache.store(stage, key, update, produced)
+            return update
+        return memoized
+    return decorator
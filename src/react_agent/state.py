@@ -22,11 +22,44 @@ from react_agent.structures import (
     SelectedTrack,
     PsychologyShort
 )
-from react_agent.handle_captions import VideoCaptioner
 
 def add_queries(existing: Sequence[str], new: Sequence[str]) -> Sequence[str]:
     return list(existing) + list(new)
 
+def _section_of(item: Any) -> Optional[str]:
+    if isinstance(item, dict):
+        return item.get("section") or item.get("script_section")
+    return getattr(item, "section", None) or getattr(item, "script_section", None)
+
+# First element of an update that replaces the whole list rather than merging into it
+RESET_SECTIONS = "__reset_sections__"
+
+def replace_sections(items: Sequence[Any]) -> List[Any]:
+    """Update for a merge_by_section field that drops everything from earlier runs"""
+    return [RESET_SECTIONS, *items]
+
+def section_items(update: Optional[Sequence[Any]]) -> List[Any]:
+    """The items of a merge_by_section update, without the reset marker"""
+    return [item for item in update or [] if not (isinstance(item, str) and item == RESET_SECTIONS)]
+
+def merge_by_section(existing: Optional[Sequence[Any]], new: Optional[Sequence[Any]]) -> List[Any]:
+    """Reducer for per-section results written by parallel branches.
+
+    Entries for a section in `new` replace that section's existing entries, so branches
+    that report different sections in the same step are merged. A node that produces the
+    complete list for its run returns `replace_sections(items)` instead, which also drops
+    failures, videos and audio left on the thread by a previous run.
+    """
+    if not isinstance(existing, list):
+        existing = list(existing) if isinstance(existing, (tuple, set)) else []
+    if not new:
+        return existing
+    items = section_items(new)
+    if len(items) != len(new):
+        return items
+    updated = {_section_of(item) for item in items}
+    return [item for item in existing if _section_of(item) not in updated] + items
+
 def reduce_docs(
     existing: Optional[Sequence[Document]],
     new: Union[
@@ -70,9 +103,12 @@ class State(InputState, RetrievalState):
     
     scripts: List[VideoScript] = field(default_factory=list)
     
-    videos: List[VideoMetadata] = field(default_factory=list)
-    
-    audio_metadata: AudioMetadata = field(default_factory=dict)
+    # Written by the parallel get_videos / generate_audio branches
+    videos: Annotated[List[VideoMetadata], merge_by_section] = field(default_factory=list)
+
+    audio_metadata: Annotated[List[AudioMetadata], merge_by_section] = field(default_factory=list)
+
+    failed_sections: Annotated[List[Dict[str, Any]], merge_by_section] = field(default_factory=list)
 
     media_result: EditMediaResult = field(default_factory=dict)
 
@@ -223,6 +223,8 @@ class CaptionOutput(BaseModel):
     captioned_video_path: str = Field(..., description="Path to the captioned video file")
     subtitles_json_path: Optional[str] = Field(None, description="Path to the subtitles JSON file")
     original_video_path: str = Field(..., description="Path to the original video file")
+    audio_path: Optional[str] = Field(None, description="Path to the narration audio used for transcription")
+    ass_subtitles_path: Optional[str] = Field(None, description="ASS subtitles for burn-in during single-pass assembly")
     status: str = Field("success", description="Status of the captioning operation")
     message: Optional[str] = Field(None, description="Additional status message")
 
@@ -244,6 +246,24 @@ class SelectedTrack(BaseModel):
     download_path: Optional[str] = None
     attribution_text: Optional[str] = None
 
+class BGMTrack(BaseModel):
+    """A background music track stored in the local library with its pre-computed analysis"""
+    track_id: str = Field(..., description="Stable identifier derived from the source URL")
+    title: str
+    composer: Optional[str] = None
+    description: Optional[str] = None
+    source_url: Optional[str] = None
+    file_path: str = Field(..., description="Path to the audio file inside the library")
+    attribution_text: Optional[str] = None
+    moods: List[str] = Field(default_factory=list, description="Lower-cased mood/genre tags used for lookup")
+    duration_seconds: float
+    integrated_lufs: float = Field(..., description="EBU R128 integrated loudness")
+    tempo_bpm: Optional[float] = None
+    energy_envelope: List[float] = Field(default_factory=list, description="RMS level in dBFS per window")
+    envelope_window_seconds: float = 1.0
+    added_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+
+
 class FinalOutput(BaseModel):
     final_reel_path: str
     original_reel_path: str
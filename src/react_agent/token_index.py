@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+import tiktoken
+
+# Preferred split points, best first
+SEPARATORS = ("\n\n", "\n", ". ", " ")
+# How far back from a cut we look for a natural boundary when truncating
+BOUNDARY_WINDOW_CHARS = 2000
+
+_encoding = None
+
+
+def get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+@dataclass
+class TokenSpan:
+    """A chunk of a document as a half-open token range"""
+    start: int
+    end: int
+    text: str
+
+    @property
+    def n_tokens(self) -> int:
+        return self.end - self.start
+
+
+class TokenIndex:
+    """A document tokenised once: token ids plus the char offset where each token starts.
+
+    Counting, slicing, chunking and truncation then become array lookups instead of
+    re-encoding the text.
+    """
+
+    def __init__(self, text: str, encoding=None):
+        encoding = encoding or get_encoding()
+        tokens = encoding.encode(text)
+        decoded, offsets = encoding.decode_with_offsets(tokens)
+        # decoded only differs from text for malformed unicode; offsets refer to decoded
+        self.text = decoded
+        self.tokens = np.asarray(tokens, dtype=np.uint32)
+        # One extra entry so offsets[n] is the end of the text
+        self.offsets = np.asarray(offsets + [len(decoded)], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def char_to_token(self, char_pos: int) -> int:
+        """Index of the first token starting at or after char_pos"""
+        return int(np.searchsorted(self.offsets, char_pos, side="left"))
+
+    def slice(self, start: int, end: int) -> str:
+        return self.text[self.offsets[start]:self.offsets[end]]
+
+    def count(self, start_char: int = 0, end_char: Optional[int] = None) -> int:
+        """Tokens between two char positions"""
+        end_char = len(self.text) if end_char is None else end_char
+        return self.char_to_token(end_char) - self.char_to_token(start_char)
+
+    def truncate(self, max_tokens: int) -> str:
+        """First max_tokens tokens, cut back to the last sentence/line/word boundary"""
+        if len(self) <= max_tokens:
+            return self.text
+        cut = int(self.offsets[max(max_tokens, 0)])
+        truncated = self.text[:cut]
+        lo = max(0, cut - BOUNDARY_WINDOW_CHARS)
+        last_boundary = max(
+            truncated.rfind(".", lo),
+            truncated.rfind("?", lo),
+            truncated.rfind("!", lo),
+            truncated.rfind("\n", lo),
+            truncated.rfind(" ", lo),
+            0
+        )
+        return truncated[:last_boundary + 1] if last_boundary > 0 else truncated
+
+    def split(self, chunk_size: int, overlap: int = 0, separators: Sequence[str] = SEPARATORS) -> List[TokenSpan]:
+        """Token-native splitter: windows of at most chunk_size tokens, ended at the best
+        separator in the second half of the window, with `overlap` tokens carried over
+        (snapped forward to a word start)."""
+        if chunk_size <= overlap:
+            raise ValueError("chunk_size must be larger than overlap")
+        n = len(self)
+        spans: List[TokenSpan] = []
+        start = 0
+        while start < n:
+            end = min(start + chunk_size, n)
+            if end < n:
+                window_start = int(self.offsets[start])
+                window = self.text[window_start:self.offsets[end]]
+                for sep in separators:
+                    pos = window.rfind(sep, len(window) // 2)
+                    if pos == -1:
+                        continue
+                    cut = self.char_to_token(window_start + pos + len(sep))
+                    if start < cut < end:
+                        end = cut
+                        break
+
+            text = self.slice(start, end).strip()
+            if text:
+                spans.append(TokenSpan(start, end, text))
+            if end >= n:
+                break
+
+            next_start = max(end - overlap, start + 1)
+            if next_start < end:
+                space = self.text.find(" ", self.offsets[next_start], self.offsets[end])
+                if space != -1:
+                    next_start = max(self.char_to_token(space), start + 1)
+            start = next_start
+        return spans
@@ -0,0 +1,113 @@
+import time
+import asyncio
+from typing import Dict, List, Sequence, Tuple
+
+from qdrant_client import QdrantClient
+
+from react_agent.qdrant_db import (
+    COLLECTION_NAME,
+    QDRANT_URL,
+    QDRANT_API_KEY,
+    embeddings,
+    sparse_embeddings,
+    tokenizer,
+    print_status,
+)
+from react_agent.prompts import TOPIC_QUERY_PROMPT
+from react_agent.structures import RetrievalQueries
+from react_agent.services import register
+from react_agent.instrumentation import traced
+from react_agent.hybrid_query import hybrid_request
+
+RRF_K = 60
+
+book_client = register("book_client", lambda: QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=30))
+
+
+async def generate_queries(llm, prior_titles: Sequence[str]) -> List[str]:
+    """1-3 library search queries steering away from topics already covered"""
+    prompt = TOPIC_QUERY_PROMPT.format(prior_titles=", ".join(prior_titles) or "none")
+    result: RetrievalQueries = await llm.with_structured_output(RetrievalQueries).ainvoke(prompt)
+    return list(dict.fromkeys(q.strip() for q in result.queries if q.strip()))[:3]
+
+
+@traced("qdrant.search_books", kind="qdrant")
+async def search_books(queries: List[str], k: int = 8, collection_name: str = COLLECTION_NAME) -> List[Dict]:
+    """Run all queries in a single query_batch_points call and fuse the rankings.
+
+    A passage returned by several queries is kept once, scored by the sum of its
+    reciprocal ranks, so material relevant to more than one angle rises to the top.
+    """
+    if not queries:
+        return []
+    # aembed_query, not aembed_documents: instruction-tuned models embed queries differently
+    dense, sparse = await asyncio.gather(
+        asyncio.gather(*(embeddings.aembed_query(q) for q in queries)),
+        asyncio.to_thread(lambda: [sparse_embeddings.embed_query(q) for q in queries]),
+    )
+    responses = await asyncio.to_thread(
+        book_client.query_batch_points,
+        collection_name=collection_name,
+        requests=[hybrid_request(d, s, k) for d, s in zip(dense, sparse)],
+    )
+
+    fused: Dict[str, Dict] = {}
+    for response in responses:
+        for rank, point in enumerate(response.points):
+            payload = point.payload or {}
+            entry = fused.setdefault(str(point.id), {
+                "id": str(point.id),
+                "text": payload.get("page_content", ""),
+                "source": payload.get("metadata", {}).get("source"),
+                "score": 0.0,
+            })
+            entry["score"] += 1.0 / (RRF_K + rank + 1)
+    return sorted(fused.values(), key=lambda e: e["score"], reverse=True)
+
+
+def build_context(passages: List[Dict], max_tokens: int) -> str:
+    """Best passages first until the token budget is spent; duplicate texts are skipped"""
+    parts, used, seen = [], 0, set()
+    for passage in passages:
+        text = passage["text"].strip()
+        if not text or text in seen:
+            continue
+        n_tokens = len(tokenizer.encode(text, disallowed_special=()))
+        if used + n_tokens > max_tokens:
+            continue
+        seen.add(text)
+        parts.append(f"[{passage['source'] or 'unknown'}]\n{text}")
+        used += n_tokens
+    return "\n\n---\n\n".join(parts)
+
+
+async def retrieve_topic_context(
+    llm,
+    prior_titles: Sequence[str],
+    budget_s: float = 8.0,
+    max_tokens: int = 3000,
+) -> Tuple[List[str], str]:
+    """(queries, context) for topic generation, or whatever finished within budget_s.
+
+    Retrieval is an enhancement: a timeout or a Qdrant/LLM failure yields an empty
+    context instead of stalling or failing the graph.
+    """
+    started = time.perf_counter()
+    queries: List[str] = []
+
+    async def run() -> str:
+        queries.extend(await generate_queries(llm, prior_titles))
+        passages = await search_books(queries)
+        return build_context(passages, max_tokens)
+
+    try:
+        context = await asyncio.wait_for(run(), timeout=budget_s)
+    except asyncio.TimeoutError:
+        print_status(f"Book retrieval exceeded its {budget_s:.1f}s budget; continuing without context")
+        return queries, ""
+    except Exception as e:
+        print_status(f"Book retrieval failed ({e}); continuing without context")
+        return queries, ""
+    print_status(f"Retrieved {len(context)} chars of book context for {len(queries)} queries "
+                 f"in {time.perf_counter() - started:.2f}s")
+    return queries, context
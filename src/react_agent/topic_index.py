@@ -0,0 +1,99 @@
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class LocalTopicIndex:
+    """Exact cosine search over the topic cache held as one normalised float32 matrix.
+
+    The topic collection is a few thousand vectors at most, so a brute-force matrix-vector
+    product answers a query in microseconds with no network round-trip.
+    """
+
+    def __init__(self, dim: int = 768, path: Optional[str] = None):
+        self.dim = dim
+        self.path = path
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self.ids: List[str] = []
+        self.titles: List[Optional[str]] = []
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:self._size]
+
+    @staticmethod
+    def _normalise(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add(self, point_id: str, vector, title: Optional[str]) -> None:
+        self.add_many([point_id], [vector], [title])
+
+    def add_many(self, point_ids: List[str], vectors, titles: List[Optional[str]]) -> None:
+        if not point_ids:
+            return
+        vectors = self._normalise(np.asarray(vectors, dtype=np.float32).reshape(len(point_ids), self.dim))
+        needed = self._size + len(point_ids)
+        if needed > self._matrix.shape[0]:
+            # Amortised growth instead of reallocating per insert
+            grown = np.zeros((max(needed, 2 * self._matrix.shape[0], 64), self.dim), dtype=np.float32)
+            grown[:self._size] = self.matrix
+            self._matrix = grown
+        self._matrix[self._size:needed] = vectors
+        self._size = needed
+        self.ids.extend(point_ids)
+        self.titles.extend(titles)
+
+    def search(self, vector, k: int = 5) -> List[Tuple[Optional[str], float]]:
+        if not self._size:
+            return []
+        query = self._normalise(np.asarray(vector, dtype=np.float32))
+        scores = self.matrix @ query
+        k = min(k, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.titles[i], float(scores[i])) for i in top]
+
+    def load_from_qdrant(self, client, collection_name: str, vector_name: str = "dense", batch_size: int = 256) -> None:
+        """Mirror a collection (vectors + titles) with paginated scrolls"""
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["metadata.title"],
+                with_vectors=[vector_name],
+            )
+            self.add_many(
+                [str(p.id) for p in points],
+                [p.vector[vector_name] for p in points],
+                [(p.payload or {}).get("metadata", {}).get("title") for p in points],
+            )
+            if offset is None:
+                break
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        np.save(path + ".npy", self.matrix)
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "titles": self.titles}, f)
+        os.replace(path + ".npy", path)
+
+    def load(self, path: str) -> None:
+        with open(path, "rb") as f:
+            matrix = np.load(f)
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            meta: Dict = json.load(f)
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._size = 0
+        self.ids, self.titles = [], []
+        self.add_many(meta["ids"], matrix, meta["titles"])
@@ -7,6 +7,9 @@ import aiofiles
 import aiofiles.os
 from dotenv import load_dotenv
 
+from react_agent.instrumentation import span
+from react_agent.ffmpeg_runner import FFMPEG_TIMEOUT, log_progress, run_node
+
 load_dotenv()
 
 
@@ -43,9 +46,30 @@ SECTION_SILENCE = {
     'CTA': 0.5
 }
 
+# Everything a rendered section depends on besides its inputs; part of the stage-cache key
+RENDER_PARAMS = {
+    'width': REEL_WIDTH, 'height': REEL_HEIGHT, 'fps': OUTPUT_FPS, 'codec': VIDEO_CODEC,
+    'crf': CRF, 'preset': PRESET_X264, 'transition': TRANSITION_DURATION, 'silence': SECTION_SILENCE,
+}
+
 # Define the desired order for final concatenation
 SECTION_ORDER = ['HOOK', 'CONCEPT', 'REAL-WORLD_EXAMPLE', 'PSYCHOLOGICAL_INSIGHT', 'ACTIONABLE_TIP', 'CTA']
 
+async def run_ffmpeg(out_node, output_path: str, label: str, input_files=(), duration=None, timeout=FFMPEG_TIMEOUT):
+    """Run an ffmpeg-python node as an async subprocess, recorded as an instrumentation span.
+
+    Progress is logged while it runs (as a percentage when `duration` is known); failures
+    raise ffmpeg.Error with the tail of ffmpeg's stderr.
+    """
+    async with span(f"ffmpeg.{label}", kind="ffmpeg", output=output_path) as s:
+        s.add_bytes(in_=sum(os.path.getsize(f) for f in input_files if os.path.isfile(f)))
+        progress = await run_node(out_node, timeout=timeout, on_progress=log_progress(label, duration))
+        s.set(fps=progress.fps, speed=progress.speed, frames=progress.frame)
+        if os.path.isfile(output_path):
+            s.add_bytes(out=os.path.getsize(output_path))
+    return output_path
+
+
 async def get_duration(filename):
     try:
         # Run blocking ffmpeg.probe in a separate thread
@@ -189,9 +213,8 @@ async def create_reel_for_audio(audio_file_path, associated_video_files, output_
         )
         print(f"  Writing section reel: {output_file_path} (target section duration: {target_duration:.2f}s)")
         
-        # Run blocking ffmpeg.run in a separate thread
-        # Note: `quiet=False` will print FFmpeg's output to console. If multiple run concurrently, output may be interleaved.
-        await asyncio.to_thread(ffmpeg.run, out_node, overwrite_output=True, quiet=True)
+        await run_ffmpeg(out_node, output_file_path, "section", [audio_file_path, *associated_video_files],
+                         duration=target_duration)
         
         print(f"Completed section: {output_file_path}")
         return output_file_path
@@ -230,8 +253,7 @@ async def concatenate_sections(section_files, final_output):
         concat_input = ffmpeg.input(list_path, **input_options)
         out_node = ffmpeg.output(concat_input, final_output, **output_options)
 
-        # Run blocking ffmpeg.run in a separate thread
-        await asyncio.to_thread(ffmpeg.run, out_node, overwrite_output=True, quiet=True)
+        await run_ffmpeg(out_node, final_output, "concat", section_files)
         
         print(f"Final reel created: {final_output}")
         return final_output
@@ -244,6 +266,136 @@ async def concatenate_sections(section_files, final_output):
          print(f"General error during final concatenation: {e_gen}")
          return None
 
+async def concatenate_section_audio(section_files, output_audio):
+    """Join only the audio tracks of the section reels (stream copy, no re-encode).
+
+    Used to get caption timings for the whole reel without rendering the joined video.
+    """
+    if not section_files:
+        return None
+    list_path = os.path.join(os.path.dirname(output_audio), 'sections_audio_to_concat.txt')
+    async with aiofiles.open(list_path, 'w') as f:
+        for filepath in section_files:
+            abs_filepath = os.path.abspath(filepath).replace('\\', '/')
+            await f.write(f"file '{abs_filepath}'\n")
+
+    out_node = ffmpeg.output(
+        ffmpeg.input(list_path, format='concat', safe='0').audio,
+        output_audio, acodec='copy'
+    )
+    await run_ffmpeg(out_node, output_audio, "concat_audio", section_files)
+    return output_audio
+
+
+def final_reel_node(
+    section_files,
+    total_duration: float,
+    subtitles_path,
+    bgm_path,
+    output_path,
+    fontsdir=None,
+    bgm_volume: float = 0.3,
+    fade_duration: float = 1.0,
+    sc_threshold: str = '-40dB',
+    sc_ratio: float = 4,
+    sc_attack: int = 200,
+    sc_release: int = 1600,
+    sc_makeup: float = 1,
+    mixed_audio_path=None,
+):
+    """ffmpeg-python output node for assemble_final_reel (one video and one audio stream).
+
+    With a premixed soundtrack only the section videos are concatenated: an unused concat
+    audio pad would be left unlabeled and ffmpeg would map it as a second audio track.
+    """
+    concat_streams = []
+    for filepath in section_files:
+        inp = ffmpeg.input(filepath)
+        concat_streams.extend([inp.video] if mixed_audio_path else [inp.video, inp.audio])
+
+    subtitle_args = {'filename': subtitles_path}
+    if fontsdir:
+        subtitle_args['fontsdir'] = fontsdir
+
+    if mixed_audio_path:
+        video = ffmpeg.concat(*concat_streams, v=1, a=0).filter('subtitles', **subtitle_args)
+        mixed_audio = ffmpeg.input(mixed_audio_path).audio.filter('atrim', duration=total_duration)
+    else:
+        joined = ffmpeg.concat(*concat_streams, v=1, a=1).node
+        video, narration = joined[0].filter('subtitles', **subtitle_args), joined[1]
+        narration_split = narration.filter_multi_output('asplit', 2)
+        bgm = (
+            ffmpeg.input(bgm_path).audio
+            .filter('atrim', duration=total_duration)
+            .filter('afade', t='out', st=max(0, total_duration - fade_duration), d=fade_duration)
+            .filter('volume', bgm_volume)
+        )
+        ducked_bgm = ffmpeg.filter(
+            [bgm, narration_split[1]], 'sidechaincompress',
+            threshold=sc_threshold, ratio=sc_ratio, attack=sc_attack, release=sc_release, makeup=sc_makeup
+        )
+        mixed_audio = ffmpeg.filter(
+            [narration_split[0], ducked_bgm], 'amix', dropout_transition=0, duration='first'
+        )
+
+    return ffmpeg.output(
+        video, mixed_audio, output_path,
+        vcodec=VIDEO_CODEC, acodec=AUDIO_CODEC, audio_bitrate=AUDIO_BITRATE,
+        crf=CRF, preset=PRESET_X264, r=OUTPUT_FPS, movflags='+faststart',
+    )
+
+
+async def assemble_final_reel(
+    section_files,
+    subtitles_path,
+    bgm_path,
+    output_path,
+    fontsdir=None,
+    bgm_volume: float = 0.3,
+    fade_duration: float = 1.0,
+    sc_threshold: str = '-40dB',
+    sc_ratio: float = 4,
+    sc_attack: int = 200,
+    sc_release: int = 1600,
+    sc_makeup: float = 1,
+    mixed_audio_path=None,
+):
+    """Produce the upload file in a single encode.
+
+    Concatenates the section reels, burns in the ASS captions, ducks the BGM under the
+    narration with sidechaincompress and encodes H.264/AAC once, instead of the
+    concat -> moviepy captions -> BGM remux chain (three lossy video generations).
+    If `mixed_audio_path` is given (a premixed, already ducked soundtrack), it replaces
+    the narration/BGM filter chain.
+    """
+    if not section_files:
+        print("No section files to assemble.")
+        return None
+
+    durations = await asyncio.gather(*(get_duration(f) for f in section_files))
+    if any(d is None for d in durations):
+        print("Could not probe every section reel, aborting final assembly.")
+        return None
+    total_duration = sum(durations)
+
+    await aiofiles.os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    try:
+        out_node = final_reel_node(
+            section_files, total_duration, subtitles_path, bgm_path, output_path,
+            fontsdir=fontsdir, bgm_volume=bgm_volume, fade_duration=fade_duration,
+            sc_threshold=sc_threshold, sc_ratio=sc_ratio, sc_attack=sc_attack, sc_release=sc_release,
+            sc_makeup=sc_makeup, mixed_audio_path=mixed_audio_path,
+        )
+        print(f"Assembling final reel in one pass: {output_path} ({len(section_files)} sections, {total_duration:.2f}s)")
+        await run_ffmpeg(out_node, output_path, "assemble", [*section_files, bgm_path], duration=total_duration)
+        print(f"Final reel assembled: {output_path}")
+        return output_path
+    except ffmpeg.Error as e:
+        print(f"Error assembling final reel: {e}")
+        if hasattr(e, 'stderr') and e.stderr:
+            print(f"FFmpeg stderr: {e.stderr.decode('utf8', errors='ignore')}")
+        return None
+
 # async def main_async_processor():
 #     """
 #     Main orchestrator for creating and concatenating video sections asynchronously.
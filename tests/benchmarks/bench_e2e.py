@@ -0,0 +1,429 @@
+"""End-to-end benchmark of the graph, offline, with local stand-ins for every external service.
+
+    python tests/benchmarks/bench_e2e.py [--runs 3] [--warmup 1] [--llm-latency 0.5]
+        [--section-streaming] [--single-pass] [--save-baseline base.json]
+        [--baseline base.json] [--threshold 0.25] [--min-delta 0.1]
+
+Everything from topic generation to the BGM mix runs for real (ffmpeg renders, caption
+burn-in, loudness analysis, Qdrant queries, HTTP downloads); only the network and the
+model weights are replaced:
+
+  - DeepSeek        -> canned PsychologyShort / VideoScript / match / track answers
+  - Pexels, Bensound -> a local HTTP server serving fixture JSON, HTML, MP4s and an MP3
+  - Qdrant           -> an in-memory client seeded with fixture passages; local topic index
+  - embeddings, BM25 -> deterministic hashing embedders
+  - Kokoro, Whisper  -> a tone generator and evenly spaced word timestamps
+
+Fixture media is generated with ffmpeg's lavfi sources, so the only requirement is the
+ffmpeg binary. Per-stage timings and resources come from the run's spans
+(react_agent.instrumentation). With --baseline the script exits 1 when a stage's median
+wall time is more than --threshold (relative) and --min-delta seconds (absolute) slower.
+The warm-up run builds services and fills the BGM library from the fixture Bensound
+site; measured runs then take the track from the library, as production does.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+SECTIONS = ["Hook", "Concept", "Real-World Example", "Psychological Insight", "Actionable Tip", "CTA"]
+VIDEO_IDS = [1001, 1002, 1003, 1004]
+CLIP_SECONDS = 8
+TRACK_SLUG = "calm-focus"
+TRACK_SECONDS = 90
+SAMPLE_RATE = 24000
+SECONDS_PER_WORD = 0.3
+EMBEDDING_SIZE = 768
+
+
+# --- fixtures ----------------------------------------------------------------------------
+
+def ffmpeg(*args: str) -> None:
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args], check=True)
+
+
+def make_fixtures(root: str) -> None:
+    """Portrait clips and a BGM track from lavfi sources"""
+    os.makedirs(root, exist_ok=True)
+    for i, video_id in enumerate(VIDEO_IDS):
+        ffmpeg("-f", "lavfi", "-i", f"testsrc2=size=720x1280:rate=30:duration={CLIP_SECONDS}",
+               "-vf", f"hue=h={i * 70}", "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+               os.path.join(root, f"clip_{video_id}.mp4"))
+    ffmpeg("-f", "lavfi", "-i", f"sine=frequency=220:duration={TRACK_SECONDS}",
+           "-f", "lavfi", "-i", f"sine=frequency=330:duration={TRACK_SECONDS}",
+           "-filter_complex", "amix=inputs=2,volume=0.5", "-c:a", "libmp3lame", "-b:a", "128k",
+           os.path.join(root, f"bensound-{TRACK_SLUG.replace('-', '')}.mp3"))
+
+
+def pexels_search_json(base_url: str) -> dict:
+    return {"page": 1, "per_page": len(VIDEO_IDS), "total_results": len(VIDEO_IDS), "videos": [
+        {
+            "id": video_id, "width": 720, "height": 1280, "duration": CLIP_SECONDS,
+            "user": {"name": "Fixture Author", "url": "https://www.pexels.com/@fixture"},
+            "url": f"https://www.pexels.com/video/fixture-scene-{i}-{video_id}/",
+            "image": f"{base_url}/media/clip_{video_id}.jpg",
+            "video_files": [{"file_type": "video/mp4", "width": 720, "height": 1280, "quality": "hd", "fps": 30,
+                             "link": f"{base_url}/media/clip_{video_id}.mp4"}],
+        } for i, video_id in enumerate(VIDEO_IDS)
+    ]}
+
+
+BENSOUND_SEARCH_HTML = f"""<html><body>
+<div class="grid-container result-container px-5"><a href="/royalty-free-music/track/{TRACK_SLUG}">Calm Focus</a></div>
+</body></html>"""
+
+BENSOUND_TRACK_HTML = f"""<html><body>
+<div id="song"><h1 class="is-size-4">Calm Focus</h1><h2 class="is-size-6"><a href="#">Fixture Composer</a></h2></div>
+<div class="description"><p>Calm ambient fixture track.</p></div>
+<div class="details"><div><span>{TRACK_SECONDS // 60}:{TRACK_SECONDS % 60:02d}</span></div></div>
+<audio src="/media/bensound-{TRACK_SLUG.replace('-', '')}.mp3"></audio>
+<div class="orfium-code-wrapper is-flex is-justify-content-space-between is-align-items-center">
+  <div class="is-flex is-flex-direction-column"><div>Music by Fixture Composer</div><div>License code: FIXTURE</div></div>
+</div>
+</body></html>"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Pexels search API, Bensound pages and the media files, all from the fixture dir"""
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.server.hits[path.split("/")[1] if path.count("/") > 1 else path] += 1
+        if path == "/videos/search":
+            self._send(json.dumps(pexels_search_json(self.server.base_url)).encode(), "application/json")
+        elif path.startswith("/media/"):
+            file_path = os.path.join(self.server.fixtures, os.path.basename(path))
+            if not os.path.isfile(file_path):
+                return self.send_error(404)
+            with open(file_path, "rb") as f:
+                self._send(f.read(), "audio/mpeg" if path.endswith(".mp3") else "video/mp4")
+        elif path.startswith("/royalty-free-music/track/"):
+            self._send(BENSOUND_TRACK_HTML.encode(), "text/html")
+        elif path.startswith("/royalty-free-music"):
+            self._send(BENSOUND_SEARCH_HTML.encode(), "text/html")
+        else:
+            self.send_error(404)
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fixture_server(fixtures: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.fixtures = fixtures
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.hits = Counter()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- service stand-ins -------------------------------------------------------------------
+
+def _words(text: str):
+    return [w.strip(".,!?'\"").lower() for w in text.split() if w.strip(".,!?'\"")]
+
+
+class HashingSparse:
+    """BM25 stand-in: term-frequency vector over hashed tokens"""
+
+    def embed_query(self, text: str):
+        counts = Counter(int(hashlib.md5(w.encode()).hexdigest()[:6], 16) for w in _words(text))
+        return SimpleNamespace(indices=list(counts), values=[float(v) for v in counts.values()])
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+class WhitespaceTokenizer:
+    def encode(self, text: str, disallowed_special=()):
+        return text.split()
+
+
+class LocalPexels:
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def search_videos(self, params: dict) -> dict:
+        import requests
+        response = requests.get(f"{self.base_url}/videos/search", params=params, timeout=10)
+        return {"status_code": response.status_code, "data": response.json()}
+
+
+class ToneKokoro:
+    """Kokoro stand-in: a tone whose length follows the word count, like real narration"""
+
+    def create(self, phonemes: str, voice: str, is_phonemes: bool = True):
+        import numpy as np
+        seconds = max(1.0, len(phonemes.split()) * SECONDS_PER_WORD)
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        return (0.2 * np.sin(2 * np.pi * 180 * t)).astype(np.float32), SAMPLE_RATE
+
+
+class EvenWhisper:
+    """faster-whisper stand-in: one word every SECONDS_PER_WORD over the audio's duration"""
+
+    def transcribe(self, audio_path: str, word_timestamps: bool = True):
+        import ffmpeg as ffmpeg_python
+        duration = float(ffmpeg_python.probe(audio_path)["format"]["duration"])
+        n = int(duration / SECONDS_PER_WORD)
+        words = [SimpleNamespace(word=f" word{i}", start=i * SECONDS_PER_WORD, end=(i + 0.8) * SECONDS_PER_WORD)
+                 for i in range(n)]
+        return iter([SimpleNamespace(words=words)]), SimpleNamespace(duration=duration)
+
+
+def narration(section: str, n: int) -> str:
+    return (f"{section} of fixture short {n}: people notice patterns long before they can name them, "
+            f"and that quiet recognition shapes every choice they make afterwards.")
+
+
+def canned_answer(schema, n: int):
+    from react_agent import structures as s
+
+    if schema is s.PsychologyShort:
+        return s.PsychologyShort(
+            concept_title=f"Fixture Concept {n}", explanation=f"Fixture explanation {n} about anchoring.",
+            psychological_effect=f"Effect {n}", real_world_application=f"Application {n}",
+            youtube_title=f"Fixture short {n}", youtube_description="Offline benchmark run.",
+            hashtags=["#psychology", "#benchmark"], cta_line="Follow for more.", value_pitch="Fixture pitch.",
+        )
+    if schema is s.VideoScript:
+        return s.VideoScript(
+            title=f"Fixture Short {n}", length="30", background_music=s.GlobalSound(music="calm ambient"),
+            sections=[s.VideoSection(section=name, text=narration(name, n), visual=s.Visual(
+                scene="person thinking by a window", camera_angle="close-up", transition="cut to",
+                sound=s.SectionSound())) for name in SECTIONS],
+        )
+    if schema is s.RetrievalQueries:
+        return s.RetrievalQueries(queries=["anchoring bias", "habit formation"])
+    if schema is s.PexelsVideoMultiMatch:
+        picked = [VIDEO_IDS[(n + k) % len(VIDEO_IDS)] for k in range(2)]
+        return s.PexelsVideoMultiMatch(matches=[{"video_id": str(v), "video_name": f"Fixture Scene {v}"} for v in picked])
+    if schema is s.SelectedTrack:
+        return s.SelectedTrack(track_index=1, track_title="Calm Focus", track_composer="Fixture Composer",
+                               track_description="Calm ambient fixture track.", track_duration="1:30",
+                               track_duration_seconds=TRACK_SECONDS, track_url="",
+                               recommendation_reason="Only fixture track")
+    raise ValueError(f"No canned answer for {schema.__name__}")
+
+
+class CannedChatModel:
+    """DeepSeek stand-in with a fixed per-call latency, recorded as llm.call spans"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = Counter()
+
+    def with_structured_output(self, schema):
+        from langchain_core.runnables import RunnableLambda
+        from react_agent.instrumentation import span
+
+        async def respond(_input):
+            self.calls[schema.__name__] += 1
+            async with span("llm.call", kind="llm", model="canned", schema=schema.__name__):
+                await asyncio.sleep(self.latency)
+                return canned_answer(schema, self.calls[schema.__name__])
+        return RunnableLambda(respond)
+
+    async def ainvoke(self, prompt, **kwargs):
+        from langchain_core.messages import AIMessage
+        await asyncio.sleep(self.latency)
+        return AIMessage(content="person thinking")
+
+
+def seeded_book_client(embedder, sparse):
+    from qdrant_client import QdrantClient, models
+    from react_agent.qdrant_db import COLLECTION_NAME
+
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        COLLECTION_NAME,
+        vectors_config={"dense": models.VectorParams(size=EMBEDDING_SIZE, distance=models.Distance.COSINE)},
+        sparse_vectors_config={"sparse": models.SparseVectorParams()},
+    )
+    texts = [f"Passage {i} on anchoring bias, habit formation and social proof in everyday decisions."
+             for i in range(200)]
+    points = []
+    for i, (text, dense) in enumerate(zip(texts, embedder.embed_documents(texts))):
+        vector = sparse.embed_query(text)
+        points.append(models.PointStruct(id=i, vector={
+            "dense": dense, "sparse": models.SparseVector(indices=vector.indices, values=vector.values),
+        }, payload={"page_content": text, "metadata": {"source": "fixture-book.pdf"}}))
+    client.upsert(COLLECTION_NAME, points=points)
+    return client
+
+
+def install_stand_ins(base_url: str, llm_latency: float) -> CannedChatModel:
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from react_agent.services import override
+    from react_agent.qdrant_db import TopicVectorStore
+    from react_agent.handle_captions import VideoCaptioner
+
+    chat = CannedChatModel(llm_latency)
+    embedder = DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+    sparse = HashingSparse()
+    override("deepseek_chat", lambda: chat)
+    override("embeddings", lambda: embedder)
+    override("sparse_bm25", lambda: sparse)
+    override("tokenizer", WhitespaceTokenizer)
+    override("topic_store", lambda: TopicVectorStore(embedder, qdrant_url=None, api_key=None, mode="local", local_path=None))
+    override("book_client", lambda: seeded_book_client(embedder, sparse))
+    override("pexels", lambda: LocalPexels(base_url))
+    override("g2p", lambda: (lambda text: (text, None)))
+    override("kokoro", ToneKokoro)
+    override("video_captioner", lambda: VideoCaptioner(model=EvenWhisper()))
+    return chat
+
+
+# --- report ----------------------------------------------------------------------------------
+
+def summarize(runs) -> dict:
+    """Median wall/CPU per span name over the measured runs, max process RSS, total bytes"""
+    rows = {}
+    for run in runs:
+        for name, row in run.timing["spans"].items():
+            rows.setdefault(name, []).append(row)
+    stages = {}
+    for name, samples in rows.items():
+        stages[name] = {
+            "kind": samples[0]["kind"],
+            "count": samples[0]["count"],
+            "wall_s": round(statistics.median(r["wall_s"] for r in samples), 3),
+            "cpu_s": round(statistics.median(r["cpu_s"] for r in samples), 3),
+            "subprocess_cpu_s": round(statistics.median(r["subprocess_cpu_s"] for r in samples), 3),
+            "process_peak_rss_mb": round(max(r["process_peak_rss_mb"] for r in samples), 1),
+            "bytes_in": int(statistics.median(r["bytes_in"] for r in samples)),
+            "bytes_out": int(statistics.median(r["bytes_out"] for r in samples)),
+        }
+    return dict(sorted(stages.items(), key=lambda kv: kv[1]["wall_s"], reverse=True))
+
+
+def regressions(stages: dict, baseline: dict, threshold: float, min_delta: float):
+    found = []
+    for name, base in baseline["stages"].items():
+        current = stages.get(name)
+        if current is None:
+            continue
+        if current["wall_s"] > base["wall_s"] * (1 + threshold) and current["wall_s"] - base["wall_s"] > min_delta:
+            found.append((name, base["wall_s"], current["wall_s"]))
+    return found
+
+
+async def bench(args) -> int:
+    from react_agent.batch_runner import run_one
+    from react_agent.main import build_graph
+
+    # The production graph without the YouTube upload
+    graph = build_graph(include_upload=False)
+    configurable = {"section_streaming": args.section_streaming, "single_pass_assembly": args.single_pass}
+
+    for i in range(args.warmup):
+        run = await run_one(graph, f"bench-warmup-{i}", configurable)
+        if not run.ok:
+            print(f"warm-up run failed: {run.error}")
+            return 2
+
+    runs = []
+    for i in range(args.runs):
+        run = await run_one(graph, f"bench-{i}", configurable)
+        if not run.ok:
+            print(f"run {i} failed: {run.error}")
+            return 2
+        runs.append(run)
+
+    stages = summarize(runs)
+    result = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "config": {**configurable, "runs": args.runs, "llm_latency": args.llm_latency},
+        "run_wall_s": round(statistics.median(r.seconds for r in runs), 3),
+        "stages": stages,
+    }
+
+    print(f"\nMedian run: {result['run_wall_s']:.2f}s over {args.runs} run(s)")
+    print(f"{'span':<34}{'kind':<8}{'n':>4}{'wall s':>9}{'cpu s':>8}{'ffmpeg s':>10}{'proc RSS':>9}{'MB out':>9}")
+    for name, row in stages.items():
+        print(f"{name:<34}{row['kind']:<8}{row['count']:>4}{row['wall_s']:>9.2f}{row['cpu_s']:>8.2f}"
+              f"{row['subprocess_cpu_s']:>10.2f}{row['process_peak_rss_mb']:>9.0f}{row['bytes_out'] / 1e6:>9.1f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        found = regressions(stages, baseline, args.threshold, args.min_delta)
+        for name, before, after in found:
+            print(f"REGRESSION {name}: {before:.2f}s -> {after:.2f}s (+{(after / before - 1) * 100:.0f}%)")
+        if found:
+            return 1
+        print(f"\nNo stage slower than baseline by more than {args.threshold:.0%} / {args.min_delta}s")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per canned LLM answer")
+    parser.add_argument("--section-streaming", action="store_true")
+    parser.add_argument("--single-pass", action="store_true")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--save-baseline", help="Write this run's results JSON here")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown per stage")
+    parser.add_argument("--min-delta", type=float, default=0.1, help="Ignore slowdowns smaller than this (s)")
+    parser.add_argument("--workdir", help="Keep outputs here instead of a temporary directory")
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="bench-e2e-"))
+    fixtures = os.path.join(workdir, "fixtures")
+    make_fixtures(fixtures)
+    server = start_fixture_server(fixtures)
+
+    # Paths and endpoints are read at import time, so they are set before react_agent is imported
+    os.chdir(workdir)
+    os.environ.update({
+        "BASE_PATH": os.path.join(workdir, "my_test_files"),
+        "BASE_VIDEOS_PATH": os.path.join(workdir, "my_test_files", "videos"),
+        "OUTPUT_DIR_BASE": os.path.join(workdir, "outputs"),
+        "BASE_SCRIPT_PATH": os.path.join(workdir, "scripts"),
+        "BGM_LIBRARY_PATH": os.path.join(workdir, "bgm_library"),
+        "TRACE_DIR": os.path.join(workdir, "traces"),
+        "BENSOUND_BASE_URL": server.base_url,
+        "TOPIC_INDEX_MODE": "local",
+        "STAGE_CACHE": "0",
+    })
+
+    started = time.perf_counter()
+    import react_agent.graph  # noqa: F401
+    chat = install_stand_ins(server.base_url, args.llm_latency)
+    print(f"Imported the graph in {time.perf_counter() - started:.2f}s; outputs in {workdir}")
+
+    code = asyncio.run(bench(args))
+    print(f"Stand-in traffic: LLM {dict(chat.calls)}, HTTP {dict(server.hits)}")
+    server.shutdown()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
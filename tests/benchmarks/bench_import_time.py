@@ -0,0 +1,54 @@
+"""Wall-clock import time of the graph, plus the slowest modules from -X importtime.
+
+    python tests/benchmarks/bench_import_time.py [--module react_agent.graph] [--runs 5] [--top 15]
+
+Each run is a fresh interpreter. Nothing remote should be contacted during the import:
+clients and models are lazy services (react_agent.services).
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def time_import(module: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - started
+
+
+def slowest_modules(module: str, top: int):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="react_agent.graph")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_import("sys") for _ in range(args.runs))
+    timings = [time_import(args.module) for _ in range(args.runs)]
+    print(f"import {args.module}: median {statistics.median(timings):.3f}s "
+          f"(min {min(timings):.3f}s, max {max(timings):.3f}s; interpreter start {baseline:.3f}s)")
+
+    print("\nSlowest modules by cumulative import time:")
+    for cumulative_us, self_us, name in slowest_modules(args.module, args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Micro-benchmarks for the media hot paths, on synthetic lavfi fixtures.
+
+    python tests/benchmarks/bench_media.py [--cases reel,concat,...] [--repeat 3] [--out results.json]
+
+Cases:
+  reel      create_reel_for_audio with K clips per source resolution
+  concat    concatenate_sections over N rendered sections
+  captions  VideoCaptioner.add_captions_to_video vs. number of words
+  asr       VideoCaptioner.generate_subtitles real-time factor (faster-whisper weights)
+  tts       generate_tts characters/sec (KOKORO_MODEL_PATH / KOKORO_VOICES_PATH)
+  bgm       add_bgm_to_narrated_video_async, sidechain and envelope ducking
+
+Each case reports the median of --repeat runs plus the CPU time of the ffmpeg children.
+A case whose model or font isn't available records its error instead of stopping the
+others. Results are written as JSON with machine info and the git commit (default
+my_test_files/benchmarks/media-<commit>-<time>.json) so trends can be compared across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+RESOLUTIONS = ["720x1280", "1080x1920", "1920x1080"]
+CLIP_COUNTS = [2, 4, 6]
+SECTION_COUNTS = [3, 6]
+WORD_COUNTS = [20, 60, 120]
+TTS_TEXT_LENGTHS = [80, 300, 900]
+NARRATION_SECONDS = 8
+CASES = ("reel", "concat", "captions", "asr", "tts", "bgm")
+
+SENTENCE = "People notice patterns long before they can name them, and that quiet recognition shapes their choices. "
+
+
+def ffmpeg(*args: str) -> None:
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args], check=True)
+
+
+def make_clip(path: str, size: str, seconds: float = 6, hue: int = 0) -> str:
+    if not os.path.exists(path):
+        ffmpeg("-f", "lavfi", "-i", f"testsrc=size={size}:rate=30:duration={seconds}", "-vf", f"hue=h={hue}",
+               "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path)
+    return path
+
+
+def make_tone(path: str, seconds: float, frequency: int = 220) -> str:
+    if not os.path.exists(path):
+        ffmpeg("-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={seconds}", "-ar", "24000", path)
+    return path
+
+
+def make_narrated_video(path: str, seconds: float) -> str:
+    """Portrait testsrc with a sine narration track, like a rendered section"""
+    if not os.path.exists(path):
+        ffmpeg("-f", "lavfi", "-i", f"testsrc=size=720x1280:rate=30:duration={seconds}",
+               "-f", "lavfi", "-i", f"sine=frequency=300:duration={seconds}",
+               "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path)
+    return path
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def measure(fn, repeat: int) -> dict:
+    """Median wall and child CPU seconds of `await fn()`; the last return value is kept"""
+    walls, cpus, value = [], [], None
+    for _ in range(repeat):
+        cpu = children_cpu()
+        started = time.perf_counter()
+        value = await fn()
+        walls.append(time.perf_counter() - started)
+        cpus.append(children_cpu() - cpu)
+    return {"wall_s": round(statistics.median(walls), 3), "ffmpeg_cpu_s": round(statistics.median(cpus), 3),
+            "value": value}
+
+
+# --- cases -------------------------------------------------------------------------------
+
+async def bench_reel(tmp: str, repeat: int):
+    from react_agent.video_editor import create_reel_for_audio
+
+    audio = make_tone(os.path.join(tmp, "HOOK.wav"), NARRATION_SECONDS)
+    for size in RESOLUTIONS:
+        clips = [make_clip(os.path.join(tmp, f"clip_{size}_{i}.mp4"), size, hue=i * 50) for i in range(max(CLIP_COUNTS))]
+        for k in CLIP_COUNTS:
+            output = os.path.join(tmp, f"reel_{size}_{k}.mp4")
+            m = await measure(lambda: create_reel_for_audio(audio, clips[:k], output), repeat)
+            yield {"source": size, "clips": k, "output_seconds": NARRATION_SECONDS, "ok": m.pop("value") is not None,
+                   **m, "realtime_x": round(NARRATION_SECONDS / m["wall_s"], 2)}
+
+
+async def bench_concat(tmp: str, repeat: int):
+    from react_agent.video_editor import concatenate_sections
+
+    sections = [make_narrated_video(os.path.join(tmp, f"section_{i}.mp4"), 5) for i in range(max(SECTION_COUNTS))]
+    for n in SECTION_COUNTS:
+        output = os.path.join(tmp, f"concat_{n}.mp4")
+        m = await measure(lambda: concatenate_sections(sections[:n], output), repeat)
+        yield {"sections": n, "output_seconds": 5 * n, "ok": m.pop("value") is not None, **m}
+
+
+async def bench_captions(tmp: str, repeat: int):
+    from react_agent.handle_captions import VideoCaptioner
+
+    captioner = VideoCaptioner(model=object())  # burn-in only, no transcription
+    for n in WORD_COUNTS:
+        seconds = max(4, n * 0.35)
+        video = make_narrated_video(os.path.join(tmp, f"captions_{n}.mp4"), seconds)
+        words = [{"word": f"word{i}", "start": i * 0.35, "end": i * 0.35 + 0.3} for i in range(n)]
+        lines = await captioner.create_line_level_subtitles(words)
+        output = os.path.join(tmp, f"captioned_{n}.mp4")
+        m = await measure(lambda: captioner.add_captions_to_video(video, lines, output), repeat)
+        m.pop("value")
+        yield {"words": n, "lines": len(lines), "video_seconds": seconds, **m,
+               "words_per_s": round(n / m["wall_s"], 1)}
+
+
+async def bench_asr(tmp: str, repeat: int, model_size: str):
+    from react_agent.handle_captions import VideoCaptioner
+
+    captioner = VideoCaptioner(model_size=model_size)
+    for seconds in (10, 30):
+        # A tone rather than speech: the encoder cost per second is the same, the word count is not
+        audio = os.path.join(tmp, f"asr_{seconds}.wav")
+        make_tone(audio, seconds)
+        m = await measure(lambda: captioner.generate_subtitles(audio), repeat)
+        words = m.pop("value")
+        yield {"model": model_size, "audio_seconds": seconds, "words": len(words), **m,
+               "rtf": round(m["wall_s"] / seconds, 3)}
+
+
+async def bench_tts(tmp: str, repeat: int):
+    from pathlib import Path
+    from react_agent.handle_kokoro import generate_tts
+
+    for n_chars in TTS_TEXT_LENGTHS:
+        text = (SENTENCE * (n_chars // len(SENTENCE) + 1))[:n_chars]
+        m = await measure(lambda: asyncio.to_thread(
+            generate_tts, text=text, video_name="bench", section=f"tts_{n_chars}", base_path=Path(tmp)), repeat)
+        meta = m.pop("value")
+        if meta is None:
+            raise RuntimeError("generate_tts returned None (is Kokoro configured?)")
+        yield {"chars": n_chars, "audio_seconds": round(meta.duration, 2), **m,
+               "chars_per_s": round(n_chars / m["wall_s"], 1), "rtf": round(m["wall_s"] / meta.duration, 3)}
+
+
+async def bench_bgm(tmp: str, repeat: int):
+    from react_agent.handle_bensound_free import add_bgm_to_narrated_video_async
+
+    seconds = 30
+    video = make_narrated_video(os.path.join(tmp, "bgm_video.mp4"), seconds)
+    bgm = make_tone(os.path.join(tmp, "bgm.mp3"), seconds + 10, frequency=440)
+    segments = [(i, i + 1.5) for i in range(0, seconds, 3)]
+    for mode in ("sidechain", "envelope"):
+        output = os.path.join(tmp, f"bgm_{mode}.mp4")
+        m = await measure(lambda: add_bgm_to_narrated_video_async(
+            video, bgm, output, duck_mode=mode, speech_segments=segments if mode == "envelope" else None), repeat)
+        m.pop("value")
+        yield {"duck_mode": mode, "video_seconds": seconds, **m, "realtime_x": round(seconds / m["wall_s"], 2)}
+
+
+# --- results -----------------------------------------------------------------------------
+
+def _command_output(*cmd: str) -> str:
+    try:
+        return subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def machine_info() -> dict:
+    cpu_model = None
+    if os.path.exists("/proc/cpuinfo"):
+        with open("/proc/cpuinfo") as f:
+            cpu_model = next((line.split(":", 1)[1].strip() for line in f if line.startswith("model name")), None)
+    ffmpeg_version = _command_output("ffmpeg", "-version")
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu": cpu_model or platform.processor(),
+        "cpus": os.cpu_count(),
+        "ffmpeg": ffmpeg_version.splitlines()[0] if ffmpeg_version else None,
+    }
+
+
+async def run_cases(cases, tmp: str, repeat: int, asr_model: str) -> dict:
+    benches = {
+        "reel": lambda: bench_reel(tmp, repeat),
+        "concat": lambda: bench_concat(tmp, repeat),
+        "captions": lambda: bench_captions(tmp, repeat),
+        "asr": lambda: bench_asr(tmp, repeat, asr_model),
+        "tts": lambda: bench_tts(tmp, repeat),
+        "bgm": lambda: bench_bgm(tmp, repeat),
+    }
+    results = {}
+    for case in cases:
+        rows = []
+        print(f"\n[{case}]")
+        try:
+            async for row in benches[case]():
+                print("  " + ", ".join(f"{k}={v}" for k, v in row.items()))
+                rows.append(row)
+            results[case] = {"rows": rows}
+        except Exception as e:
+            traceback.print_exc()
+            print(f"  skipped: {type(e).__name__}: {e}")
+            results[case] = {"rows": rows, "error": f"{type(e).__name__}: {e}"}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated subset of {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--asr-model", default="base")
+    parser.add_argument("--out", help="Results JSON path")
+    parser.add_argument("--keep", help="Keep fixtures and outputs in this directory")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    commit = _command_output("git", "rev-parse", "--short", "HEAD")
+    tmp = os.path.abspath(args.keep) if args.keep else tempfile.mkdtemp(prefix="bench-media-")
+    os.makedirs(tmp, exist_ok=True)
+
+    started = datetime.now()
+    results = asyncio.run(run_cases(cases, tmp, args.repeat, args.asr_model))
+    report = {
+        "benchmark": "media",
+        "commit": commit,
+        "dirty": bool(_command_output("git", "status", "--porcelain", "--untracked-files=no")),
+        "started_at": started.isoformat(),
+        "repeat": args.repeat,
+        "machine": machine_info(),
+        "results": results,
+    }
+
+    out = args.out or os.path.join("my_test_files", "benchmarks", f"media-{commit or 'nogit'}-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
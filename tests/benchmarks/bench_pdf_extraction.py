@@ -0,0 +1,106 @@
+"""Peak RSS and pages/sec for PDF text extraction.
+
+Compares the old whole-book string concatenation with the streaming page iterator and
+the streaming chunker. Each method runs in a fresh subprocess so peak RSS isn't shared.
+
+    python tests/benchmarks/bench_pdf_extraction.py [book.pdf] [--pages 2000]
+
+Without a PDF argument a synthetic book of --pages pages is generated first.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+METHODS = ("concat", "stream", "stream_chunks")
+
+
+def make_pdf(path: str, pages: int) -> None:
+    import fitz
+
+    paragraph = ("Attachment styles shape how people respond to closeness and distance in "
+                 "relationships, and early experiences tend to set the defaults. ") * 6
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Page {i + 1}\n\n{paragraph}\n\n{paragraph}", fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_method(method: str, pdf_path: str) -> dict:
+    from react_agent.pdf_stream import iter_pdf_chunks, iter_pdf_pages
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    pages = chunks = 0
+    if method == "concat":
+        import fitz
+
+        text = ""
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                text += page.get_text() + "\n"
+                pages += 1
+    elif method == "stream":
+        for _ in iter_pdf_pages(pdf_path):
+            pages += 1
+    else:
+        import fitz
+
+        with fitz.open(pdf_path) as doc:
+            pages = doc.page_count
+        for _ in iter_pdf_chunks(pdf_path, chunk_size=1500, overlap=150):
+            chunks += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "method": method,
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "baseline_rss_mb": round(baseline, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--method", choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.method:
+        print(json.dumps(run_method(args.method, args.pdf)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(tmp, "synthetic.pdf")
+            print(f"Generating {args.pages}-page PDF...")
+            make_pdf(pdf_path, args.pages)
+
+        for method in METHODS:
+            out = subprocess.run(
+                [sys.executable, __file__, pdf_path, "--method", method],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{method:>14}: {result['pages']} pages in {result['seconds']}s "
+                  f"({result['pages_per_sec']} pages/s), peak RSS {result['peak_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
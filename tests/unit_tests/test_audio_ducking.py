@@ -0,0 +1,65 @@
+import numpy as np
+
+from react_agent.audio_ducking import (
+    ducking_gain,
+    mix_ducked_bgm,
+    speech_mask_from_energy,
+    speech_mask_from_segments,
+    speech_segments_from_subtitles,
+)
+
+
+def test_speech_segments_merge_close_words() -> None:
+    subtitles = [
+        {"textcontents": [{"start": 0.0, "end": 0.4}, {"start": 0.5, "end": 0.9}]},
+        {"textcontents": [{"start": 2.0, "end": 2.5}]},
+    ]
+    assert speech_segments_from_subtitles(subtitles) == [(0.0, 0.9), (2.0, 2.5)]
+
+
+def test_speech_mask_from_segments() -> None:
+    mask = speech_mask_from_segments([(0.1, 0.2), (0.15, 0.3)], duration=0.5, rate=100)
+    assert mask.size == 50
+    assert not mask[:10].any()
+    assert mask[10:30].all()
+    assert not mask[30:].any()
+
+
+def test_speech_mask_from_energy() -> None:
+    sr = 1000
+    samples = np.zeros(sr, dtype=np.float32)
+    samples[500:] = 0.5
+    mask = speech_mask_from_energy(samples, sr, rate=100)
+    assert not mask[:50].any()
+    assert mask[50:].all()
+
+
+def test_ducking_gain_ramps_around_speech() -> None:
+    mask = np.zeros(500, dtype=bool)
+    mask[200:300] = True
+    gain = ducking_gain(mask, rate=100, duck_db=-20, attack=0.5, release=1.0)
+
+    np.testing.assert_allclose(gain[200:300], 0.1)
+    assert gain[0] == 1.0
+    # Anticipates speech: already dipping during the attack window
+    assert 0.1 < gain[180] < 1.0
+    # Recovers linearly in dB over the release window
+    np.testing.assert_allclose(20 * np.log10(gain[349]), -20 * (1 - 0.5), atol=0.3)
+    assert gain[-1] == 1.0
+
+
+def test_ducking_gain_without_speech_is_unity() -> None:
+    np.testing.assert_array_equal(ducking_gain(np.zeros(10, dtype=bool)), np.ones(10))
+
+
+def test_mix_ducked_bgm_applies_curve_and_length() -> None:
+    sr, rate = 1000, 100
+    narration = np.zeros((sr, 2), dtype=np.float32)
+    bgm = np.ones((sr // 2, 2), dtype=np.float32)
+    gain = np.full(rate, 0.5)
+
+    mixed = mix_ducked_bgm(narration, bgm, gain, sample_rate=sr, control_rate=rate,
+                           bgm_volume=0.5, fade_duration=0)
+    assert mixed.shape == narration.shape
+    np.testing.assert_allclose(mixed[:500], 0.25)
+    np.testing.assert_allclose(mixed[500:], 0.0)
@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from react_agent.batch_runner import run_batch
+from react_agent.instrumentation import recorder
+from react_agent.section_pipeline import ResourceScheduler
+
+
+@pytest.fixture(autouse=True)
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, "trace_dir", str(tmp_path))
+
+
+class StubGraph:
+    """ainvoke runs one rendering node per short; threads ending in a failing suffix raise"""
+
+    def __init__(self, scheduler: ResourceScheduler, seconds: float = 0.05, fail_suffix: str = None):
+        self.running = 0
+        self.peak = 0
+        self.fail_suffix = fail_suffix
+        self.seconds = seconds
+        self.render = scheduler.limit("render", self._render)
+
+    async def _render(self, state):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.seconds)
+        self.running -= 1
+
+    async def ainvoke(self, state, config):
+        thread_id = config["configurable"]["thread_id"]
+        await self.render(state)
+        if self.fail_suffix and thread_id.endswith(self.fail_suffix):
+            raise RuntimeError("render failed")
+        return {"psych_insight": SimpleNamespace(concept_title=thread_id),
+                "final_reel": SimpleNamespace(final_reel_path=f"{thread_id}.mp4")}
+
+
+def test_limit_holds_across_concurrent_runs_and_accounts_time() -> None:
+    scheduler = ResourceScheduler(render=2)
+    graph = StubGraph(scheduler)
+    report = asyncio.run(run_batch(graph, count=6, concurrency=6))
+    assert graph.peak == 2
+    assert report.completed == 6
+    # six 50 ms renders through two slots: ~0.3 s busy, and four of them had to queue
+    assert 0.28 <= scheduler.busy["render"] < 0.5
+    assert scheduler.waited["render"] >= 0.2
+    assert scheduler.busy["tts"] == scheduler.waited["tts"] == 0.0
+
+
+def test_scheduler_survives_a_second_event_loop() -> None:
+    scheduler = ResourceScheduler(render=1)
+    for _ in range(2):
+        graph = StubGraph(scheduler, seconds=0.01)
+        assert asyncio.run(run_batch(graph, count=3, concurrency=3)).completed == 3
+        assert graph.peak == 1
+
+
+def test_batch_summary_counts_failed_runs() -> None:
+    graph = StubGraph(ResourceScheduler(render=4), fail_suffix="-1")
+    report = asyncio.run(run_batch(graph, count=3, concurrency=3, thread_prefix="t"))
+    summary = report.summary()
+    assert (summary["requested"], summary["completed"], summary["failed"]) == (3, 2, 1)
+    failed = next(r for r in report.runs if not r.ok)
+    assert failed.thread_id.endswith("-1") and failed.error == "RuntimeError: render failed"
+    assert failed.final_reel_path is None and failed.timing["run_id"].startswith(failed.thread_id)
+    assert summary["shorts_per_hour"] == round(2 / report.seconds * 3600, 2)
+    assert summary["median_short_seconds"] is not None
@@ -0,0 +1,77 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from react_agent.bgm_library import MAX_BGM_GAIN, BGMLibrary, analyse_track, mood_tags
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs the ffmpeg binary")
+
+
+def make_tone(path, seconds: float, beats_per_minute: int = 100) -> str:
+    """A 440 Hz tone pulsed on every beat, so it has a tempo"""
+    if not os.path.exists(path):
+        period = 60 / beats_per_minute
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+                        "-i", f"sine=frequency=440:duration={seconds}",
+                        "-af", f"volume='if(lt(mod(t,{period}),0.1),0.5,0.02)':eval=frame",
+                        "-ar", "44100", str(path)], check=True)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def tones(tmp_path_factory):
+    root = tmp_path_factory.mktemp("tones")
+    return {seconds: make_tone(root / f"tone_{seconds}.wav", seconds) for seconds in (4, 8, 12)}
+
+
+def test_mood_tags() -> None:
+    assert mood_tags("Upbeat, Corporate-Pop!") == ["upbeat", "corporate", "pop"]
+    assert mood_tags(None) == [] and mood_tags("") == []
+
+
+def test_analyse_track(tones) -> None:
+    analysis = analyse_track(tones[8])
+    assert analysis["duration_seconds"] == pytest.approx(8.0, abs=0.05)
+    assert -40 < analysis["integrated_lufs"] < -10
+    assert analysis["tempo_bpm"] == pytest.approx(100, rel=0.05)
+    assert len(analysis["energy_envelope"]) == 8 and analysis["envelope_window_seconds"] == 1.0
+
+
+def test_add_track_is_idempotent_and_persisted(tmp_path, tones) -> None:
+    library = BGMLibrary(str(tmp_path / "library"))
+    track = library.add_track(tones[8], "Pulse", source_url="https://bensound.test/pulse", moods=["calm"])
+    assert os.path.dirname(track.file_path) == str(tmp_path / "library") and os.path.exists(track.file_path)
+    assert library.get_by_url("https://bensound.test/pulse") == track
+
+    again = library.add_track(tones[4], "Pulse", source_url="https://bensound.test/pulse", moods=["focus"])
+    assert again.track_id == track.track_id and again.duration_seconds == track.duration_seconds
+    assert again.moods == ["calm", "focus"] and len(library) == 1
+
+    reopened = BGMLibrary(str(tmp_path / "library"))
+    assert reopened.get(track.track_id) == again
+
+    os.remove(track.file_path)  # an index entry whose file is gone is dropped on load
+    assert len(BGMLibrary(str(tmp_path / "library"))) == 0
+
+
+def test_find_ranks_by_mood_then_shortest_covering_track(tmp_path, tones) -> None:
+    library = BGMLibrary(str(tmp_path / "library"))
+    short = library.add_track(tones[4], "Short", source_url="u4", moods=mood_tags("calm piano"))
+    medium = library.add_track(tones[8], "Medium", source_url="u8", moods=mood_tags("calm"))
+    long = library.add_track(tones[12], "Long", source_url="u12", moods=mood_tags("calm piano"))
+
+    assert [(t.title, s) for t, s in library.find(mood="calm piano")] == [("Short", 1.0), ("Long", 1.0), ("Medium", 0.5)]
+    assert [t for t, _ in library.find(min_duration=6)] == [medium, long]
+    assert [t for t, _ in library.find(mood="calm piano", min_duration=6)] == [long, medium]
+    assert [t for t, _ in library.find(max_duration=10, limit=1)] == [short]
+    assert library.find(mood="metal") == []
+
+
+def test_gain_for_targets_loudness_with_a_cap(tmp_path, tones) -> None:
+    track = BGMLibrary(str(tmp_path / "library")).add_track(tones[4], "Tone", source_url="u")
+    loud = track.model_copy(update={"integrated_lufs": -17.0})
+    assert BGMLibrary.gain_for(loud, target_lufs=-23.0) == pytest.approx(10 ** (-6 / 20))
+    quiet = track.model_copy(update={"integrated_lufs": -60.0})
+    assert BGMLibrary.gain_for(quiet) == MAX_BGM_GAIN
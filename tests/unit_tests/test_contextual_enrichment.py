@@ -0,0 +1,141 @@
+import asyncio
+import re
+import sys
+import types
+from types import SimpleNamespace
+
+import pytest
+import tiktoken
+from langchain_core.messages import AIMessage
+
+from react_agent import contextual_enrichment
+from react_agent.contextual_enrichment import SECTION_CHUNKS, BookEnricher
+
+# Byte-level encoding so the tests don't need to download a BPE file
+BYTES = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+CHUNKS = [f"c{n:02d} " + "words about the argument " * 5 for n in range(1, 31)]
+BOOK = "\n".join(CHUNKS)
+
+
+class FakeChat:
+    """Answers section-summary prompts with the section's first chunk tag, anything else with 'context'"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        if "BOOK SECTION:" in prompt:
+            content = "summary from " + re.search(r"c\d\d", prompt).group()
+        else:
+            content = " context "
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": len(prompt.split()), "output_tokens": 2, "total_tokens": len(prompt.split()) + 2})
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    chat = FakeChat()
+    monkeypatch.setattr(contextual_enrichment, "llm", chat)
+    monkeypatch.setattr(contextual_enrichment, "tokenizer", BYTES)
+    return chat
+
+
+@pytest.fixture
+def vertex(monkeypatch):
+    """Stand-in Vertex modules; set `vertex.create` to control the cache upload"""
+    state = SimpleNamespace(create=None, deleted=[], chats=[])
+
+    def chat_vertex(**kwargs):
+        state.chats.append(FakeChat(**kwargs))
+        return state.chats[-1]
+
+    generative_models = types.ModuleType("vertexai.generative_models")
+    generative_models.Content = lambda role, parts: parts
+    generative_models.Part = SimpleNamespace(from_text=lambda text: text)
+    caching = types.ModuleType("vertexai.preview.caching")
+    caching.CachedContent = SimpleNamespace(create=lambda **kwargs: state.create(**kwargs))
+    preview = types.ModuleType("vertexai.preview")
+    preview.caching = caching
+    langchain_vertex = types.ModuleType("langchain_google_vertexai")
+    langchain_vertex.ChatVertexAI = chat_vertex
+    for name, module in [("vertexai", types.ModuleType("vertexai")),
+                         ("vertexai.generative_models", generative_models),
+                         ("vertexai.preview", preview),
+                         ("vertexai.preview.caching", caching),
+                         ("langchain_google_vertexai", langchain_vertex)]:
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.setattr(contextual_enrichment, "CACHE_MIN_TOKENS", 100)
+    return state
+
+
+def enrich(enricher: BookEnricher, *chunk_nums: int):
+    async def run():
+        contexts = [await enricher.enrich(n) for n in chunk_nums]
+        return contexts, await enricher.close()
+    return asyncio.run(run())
+
+
+def test_full_mode_sends_the_book_with_every_chunk(chat) -> None:
+    contexts, report = enrich(BookEnricher(BOOK, "book.txt", CHUNKS, mode="full"), 1, 2)
+    assert contexts == ["context", "context"]
+    assert all("DOCUMENT CONTEXT:" in p and CHUNKS[-1].strip() in p for p in chat.prompts)
+    assert report["mode"] == "full" and report["calls"] == 2 and report["summary_calls"] == 0
+
+
+def test_cached_mode_below_the_cache_minimum_sends_inline(chat) -> None:
+    enricher = BookEnricher(BOOK, "book.txt", CHUNKS, mode="cached")
+    _, report = enrich(enricher, 1)
+    assert enricher.mode == report["mode"] == "full" and report["cache_write_tokens"] == 0
+    assert "DOCUMENT CONTEXT:" in chat.prompts[0]
+
+
+def test_cached_mode_sends_only_the_chunk(chat, vertex) -> None:
+    vertex.create = lambda **kwargs: SimpleNamespace(name="cache-1", delete=lambda: vertex.deleted.append("cache-1"))
+    enricher = BookEnricher(BOOK, "book.txt", CHUNKS, mode="cached")
+    _, report = enrich(enricher, 3, 4)
+
+    assert chat.prompts == []
+    cached_chat, = vertex.chats
+    assert cached_chat.kwargs["cached_content"] == "cache-1"
+    assert all("cached context" in p and "c01" not in p for p in cached_chat.prompts)
+    assert report["mode"] == "cached" and report["calls"] == 2
+    assert report["cache_write_tokens"] == len(enricher.index)
+    assert vertex.deleted == ["cache-1"]
+
+
+def test_cache_upload_failure_falls_back_to_full(chat, vertex) -> None:
+    def create(**kwargs):
+        raise RuntimeError("quota exceeded")
+    vertex.create = create
+    enricher = BookEnricher(BOOK, "book.txt", CHUNKS, mode="cached")
+    contexts, report = enrich(enricher, 1)
+
+    assert contexts == ["context"] and vertex.chats == []
+    assert "DOCUMENT CONTEXT:" in chat.prompts[0]
+    assert report["mode"] == "full" and report["cache_write_tokens"] == 0
+
+
+def test_hierarchical_mode_feeds_section_summaries_into_chunk_prompts(chat) -> None:
+    enricher = BookEnricher(None, "book.txt", CHUNKS, mode="hierarchical", book_summary="A book about arguments.")
+    _, report = enrich(enricher, 14, 30)
+
+    assert len(CHUNKS) > 2 * SECTION_CHUNKS
+    summaries = [p for p in chat.prompts if "BOOK SECTION:" in p]
+    middle, last = [p for p in chat.prompts if "CURRENT CHUNK:" in p]
+    assert len(summaries) == 3 and report["summary_calls"] == 3 and report["calls"] == 2
+
+    assert "A book about arguments." in middle
+    assert "SECTION SUMMARY (chunks 13-24):\n        summary from c13" in middle
+    assert CHUNKS[12].strip() in middle.split("FOLLOWING TEXT:")[0]  # preceding neighbour
+    assert CHUNKS[14].strip() in middle.split("FOLLOWING TEXT:")[1].split("CURRENT CHUNK:")[0]
+    assert "c01" not in middle
+
+    assert "SECTION SUMMARY (chunks 25-30):\n        summary from c25" in last
+    assert "(end of book)" in last
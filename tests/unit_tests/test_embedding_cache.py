@@ -0,0 +1,44 @@
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from react_agent.embedding_cache import CachedEmbeddings, EmbeddingStore
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.extend(texts)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls.append(text)
+        return [float(len(text)), 0.0, 0.5]
+
+
+def test_cached_embeddings_only_embeds_new_texts(tmp_path) -> None:
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner, model_name="fake", store=EmbeddingStore(str(tmp_path)))
+
+    first = cached.embed_documents(["a", "bb", "a"])
+    assert inner.calls == ["a", "bb"]
+    second = cached.embed_documents(["bb", "ccc"])
+    assert inner.calls == ["a", "bb", "ccc"]
+    assert first[1] == second[0] == [2.0, 1.0, 0.5]
+    assert cached.hits == 1 and cached.misses == 3
+
+    # Queries are keyed separately from documents
+    assert cached.embed_query("a") == [1.0, 0.0, 0.5]
+    assert inner.calls[-1] == "a"
+
+
+def test_embedding_store_persists_and_grows(tmp_path) -> None:
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many("m", {f"h{i}": [float(i), 0.0] for i in range(3000)})
+    reopened = EmbeddingStore(str(tmp_path))
+    found = reopened.get_many("m", ["h0", "h2999", "missing"])
+    assert set(found) == {"h0", "h2999"}
+    assert found["h2999"].tolist() == [2999.0, 0.0]
+    assert reopened.count("m") == 3000
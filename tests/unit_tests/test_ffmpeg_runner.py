@@ -0,0 +1,118 @@
+import asyncio
+import os
+import stat
+import sys
+import textwrap
+import time
+
+import pytest
+
+from react_agent.ffmpeg_runner import FFmpegError, FFmpegProgress, FFmpegTimeout, run_ffmpeg_args
+from react_agent.instrumentation import recorder, span
+
+
+def fake_ffmpeg(tmp_path, body: str) -> str:
+    """An executable standing in for ffmpeg: writes -progress blocks to stdout, logs to stderr"""
+    path = tmp_path / "ffmpeg"
+    path.write_text(f"#!{sys.executable}\nimport sys, time\n" + textwrap.dedent(body))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def test_progress_block_parsing() -> None:
+    progress = FFmpegProgress()
+    progress.update({"frame": "120", "fps": "59.9", "out_time_us": "4000000", "total_size": "2048",
+                     "speed": "1.98x", "progress": "continue"})
+    assert (progress.frame, progress.fps, progress.out_time_s, progress.speed) == (120, 59.9, 4.0, 1.98)
+    assert progress.percent(8.0) == 50.0
+    progress.update({"out_time_us": "N/A", "speed": "N/A", "progress": "end"})
+    assert progress.out_time_s == 4.0 and progress.speed == 1.98 and progress.done
+
+
+def test_reports_live_progress(tmp_path) -> None:
+    binary = fake_ffmpeg(tmp_path, """
+        for i in range(1, 4):
+            print(f"frame={i * 30}\\nfps=30\\nout_time_us={i * 1000000}\\nspeed=2.0x\\nprogress={'end' if i == 3 else 'continue'}", flush=True)
+    """)
+    seen = []
+    progress = asyncio.run(run_ffmpeg_args(["-i", "in.mp4", "out.mp4"], binary=binary,
+                                           on_progress=lambda p: seen.append(p.out_time_s)))
+    assert seen == [1.0, 2.0, 3.0]
+    assert progress.done and progress.frame == 90
+
+
+def test_failure_keeps_stderr_tail(tmp_path) -> None:
+    binary = fake_ffmpeg(tmp_path, """
+        for i in range(50):
+            print(f"log line {i}", file=sys.stderr)
+        sys.exit(1)
+    """)
+    with pytest.raises(FFmpegError) as info:
+        asyncio.run(run_ffmpeg_args([], binary=binary, stderr_lines=10))
+    assert info.value.returncode == 1
+    assert info.value.stderr_tail == [f"log line {i}" for i in range(40, 50)]
+    assert info.value.stderr.decode().endswith("log line 49")
+
+
+def test_timeout_kills_process(tmp_path) -> None:
+    pid_file = tmp_path / "pid"
+    binary = fake_ffmpeg(tmp_path, f"""
+        import os
+        open({str(pid_file)!r}, "w").write(str(os.getpid()))
+        time.sleep(30)
+    """)
+    started = time.perf_counter()
+    with pytest.raises(FFmpegTimeout):
+        asyncio.run(run_ffmpeg_args([], binary=binary, timeout=0.5))
+    assert time.perf_counter() - started < 10
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_cancellation_kills_process(tmp_path) -> None:
+    pid_file = tmp_path / "pid"
+    binary = fake_ffmpeg(tmp_path, f"""
+        import os
+        open({str(pid_file)!r}, "w").write(str(os.getpid()))
+        time.sleep(30)
+    """)
+
+    async def cancel_soon():
+        task = asyncio.create_task(run_ffmpeg_args([], binary=binary, timeout=None))
+        while not pid_file.exists():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_soon())
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_child_cpu_is_charged_to_its_own_span(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(recorder, "trace_dir", str(tmp_path))
+    binary = fake_ffmpeg(tmp_path, """
+        until = time.process_time() + 0.3
+        while time.process_time() < until:
+            pass
+    """)
+
+    async def scenario():
+        async def render():
+            async with span("render", kind="node"):
+                async with span("ffmpeg.render", kind="ffmpeg"):
+                    await run_ffmpeg_args([], binary=binary)
+
+        async def idle():
+            async with span("idle", kind="node"):
+                await asyncio.sleep(0.5)
+
+        async with span("run", kind="run", run_id="ffmpeg-attribution"):
+            await asyncio.gather(render(), idle())
+
+    asyncio.run(scenario())
+    spans = {s.name: s for s in recorder.spans("ffmpeg-attribution")}
+    assert spans["ffmpeg.render"].subprocess_cpu_s >= 0.3
+    assert spans["render"].subprocess_cpu_s == spans["run"].subprocess_cpu_s == spans["ffmpeg.render"].subprocess_cpu_s
+    assert spans["idle"].subprocess_cpu_s == 0.0
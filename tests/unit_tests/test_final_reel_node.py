@@ -0,0 +1,33 @@
+import ffmpeg
+
+from react_agent.video_editor import final_reel_node
+
+SECTIONS = ["hook.mp4", "concept.mp4", "cta.mp4"]
+
+
+def compile_args(**kwargs):
+    node = final_reel_node(SECTIONS, 30.0, "captions.ass", "bgm.mp3", "final.mp4", **kwargs)
+    return ffmpeg.compile(node)
+
+
+def maps_and_filters(args):
+    maps = [args[i + 1] for i, arg in enumerate(args) if arg == "-map"]
+    filters = args[args.index("-filter_complex") + 1].split(";")
+    return maps, filters
+
+
+def test_premixed_soundtrack_maps_one_audio_stream() -> None:
+    maps, filters = maps_and_filters(compile_args(mixed_audio_path="mix.wav"))
+    assert len(maps) == 2
+    assert any("atrim" in f and f.endswith(maps[1]) for f in filters)
+    concat = next(f for f in filters if "concat=" in f)
+    assert "a=0" in concat and concat.count("[") == len(SECTIONS) + 1
+    # every filter output is labelled and mapped or consumed, so nothing is auto-mapped
+    assert all(f.rstrip().endswith("]") for f in filters)
+
+
+def test_sidechain_mix_maps_one_audio_stream() -> None:
+    maps, filters = maps_and_filters(compile_args())
+    assert len(maps) == 2
+    assert any("amix" in f and f.endswith(maps[1]) for f in filters)
+    assert "a=1" in next(f for f in filters if "concat=" in f)
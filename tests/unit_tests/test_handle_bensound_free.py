@@ -0,0 +1,198 @@
+import asyncio
+import importlib
+import os
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+
+from react_agent import handle_bensound_free as bensound
+from react_agent.handle_bensound_free import BensoundScraper, download_track_async, download_track_http, parse_track_download_info
+from react_agent.instrumentation import recorder
+
+SLUG = "calm-focus"
+MP3_BYTES = b"ID3" + bytes(range(256)) * 64
+
+SEARCH_HTML = """<html><body>
+<nav><a class="pagination-link">1</a><a class="pagination-link">2</a><a class="pagination-link">3</a></nav>
+{results}
+</body></html>"""
+RESULT_HTML = '<div class="grid-container result-container px-5"><a href="/royalty-free-music/track/{slug}">{slug}</a></div>'
+
+TRACK_HTML = """<html><body>
+<div id="song"><h1 class="is-size-4">{title}</h1><h2 class="is-size-6"><a href="#">Fixture Composer</a></h2></div>
+<div class="description"><p>First line.</p><p>Second line.</p></div>
+<div class="details"><div><span>2:05</span></div></div>
+{player}
+<div class="orfium-code-wrapper is-flex is-justify-content-space-between is-align-items-center">
+  <div class="is-flex is-flex-direction-column"><div>Music by Fixture Composer</div><div></div><div>License code: FIXTURE</div></div>
+</div>
+</body></html>"""
+
+
+# Another player's file comes first on the page, the track's own file second
+PLAYERS = '<a href="/media/bensound-otherplayer.mp3">Now playing</a><audio src="/media/bensound-calmfocus.mp3"></audio>'
+
+
+def track_html(title: str = "Calm Focus", player: str = PLAYERS) -> str:
+    return TRACK_HTML.format(title=title, player=player)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves `server.routes`: request path (with query) -> list of (status, body), replayed in order"""
+
+    def do_GET(self):
+        self.server.hits[self.path] += 1
+        responses = self.server.routes.get(self.path)
+        if not responses:
+            return self.send_error(404)
+        status, body = responses.pop(0) if len(responses) > 1 else responses[0]
+        if status == "truncated":
+            # Promise more than is sent, then drop the connection mid-body
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body) * 10))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if status != 200:
+            return self.send_error(status)
+        body = body.encode() if isinstance(body, str) else body
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path_factory, monkeypatch):
+    monkeypatch.setattr(recorder, "trace_dir", str(tmp_path_factory.mktemp("traces")))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.routes = {}
+    server.hits = Counter()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_parse_track_download_info(monkeypatch, parser) -> None:
+    monkeypatch.setattr(bensound, "HTML_PARSER", parser)
+    track_url = f"https://www.bensound.com/royalty-free-music/track/{SLUG}"
+
+    # The track's own file wins over the other player's
+    mp3_url, attribution = parse_track_download_info(track_html(), track_url)
+    assert mp3_url == "https://www.bensound.com/media/bensound-calmfocus.mp3"
+    assert attribution == "Music by Fixture Composer\nLicense code: FIXTURE"
+
+    # Only mentioned inside a script: found by the regex scan
+    script = '<script>player.load({"file": "https://cdn.bensound.test/bensound-calm_focus.mp3?v=2"})</script>'
+    mp3_url, _ = parse_track_download_info(track_html(player=script), track_url)
+    assert mp3_url == "https://cdn.bensound.test/bensound-calm_focus.mp3?v=2"
+
+    assert parse_track_download_info("<html><body><p>Sold out</p></body></html>", track_url) == (None, None)
+
+
+def test_html_parser_falls_back_without_lxml(monkeypatch) -> None:
+    pytest.importorskip("lxml")
+    assert bensound.HTML_PARSER == "lxml"
+    monkeypatch.setitem(sys.modules, "lxml", None)  # makes `import lxml` raise ImportError
+    try:
+        assert importlib.reload(bensound).HTML_PARSER == "html.parser"
+        mp3_url, attribution = parse_track_download_info(track_html(), f"https://www.bensound.com/track/{SLUG}")
+        assert mp3_url.endswith("bensound-calmfocus.mp3") and attribution.startswith("Music by")
+    finally:
+        monkeypatch.undo()
+        importlib.reload(bensound)
+
+
+def test_crawl_retries_transient_errors_and_deduplicates(server) -> None:
+    scraper = BensoundScraper("calm piano", base_url=server.base_url, max_retries=2, backoff_base=0.01)
+    search = scraper.search_url[len(server.base_url):]
+    track_path = "/royalty-free-music/track/{}".format
+
+    def results(*slugs):
+        return SEARCH_HTML.format(results="\n".join(RESULT_HTML.format(slug=s) for s in slugs))
+
+    server.routes = {
+        search: [(200, results())],
+        f"{search}/1": [(503, ""), (200, results("first", "flaky", "broken"))],
+        f"{search}/2": [(200, results("first", "second", "gone"))],
+        track_path("first"): [(200, track_html("First"))],
+        track_path("second"): [(200, track_html("Second"))],
+        track_path("flaky"): [(502, ""), (429, ""), (200, track_html("Flaky"))],
+        track_path("broken"): [(500, "")],
+    }
+    stats = asyncio.run(scraper.crawl(max_pages=2))
+
+    assert [t["title"] for t in scraper.get_data()] == ["First", "Flaky", "Second"]
+    assert scraper.get_data()[0] == {
+        "title": "First", "composer": "Fixture Composer", "duration": 125,
+        "description": "First line. Second line.", "url": server.base_url + track_path("first"),
+    }
+    assert (stats.pages, stats.tracks) == (2, 3)
+    # "broken" gives up after three attempts; "gone" is a 404 and isn't retried
+    assert stats.failed_requests == 2
+    assert server.hits[track_path("broken")] == 3 and server.hits[track_path("gone")] == 1
+    assert server.hits[track_path("flaky")] == 3 and server.hits[f"{search}/1"] == 2
+    assert f"{search}/3" not in server.hits
+
+
+def test_download_track_http_streams_mp3_and_attribution(server, tmp_path) -> None:
+    server.routes = {
+        f"/track/{SLUG}": [(200, track_html())],
+        "/media/bensound-calmfocus.mp3": [(200, MP3_BYTES)],
+    }
+    path, attribution = asyncio.run(download_track_http(f"{server.base_url}/track/{SLUG}", str(tmp_path)))
+
+    assert path == str(tmp_path / "calmfocus.mp3")
+    with open(path, "rb") as f:
+        assert f.read() == MP3_BYTES
+    assert (tmp_path / "calmfocus.txt").read_text() == attribution == "Music by Fixture Composer\nLicense code: FIXTURE"
+    assert sorted(os.listdir(tmp_path)) == ["calmfocus.mp3", "calmfocus.txt"]
+
+
+def test_interrupted_download_leaves_no_partial_file(server, tmp_path) -> None:
+    server.routes = {
+        f"/track/{SLUG}": [(200, track_html())],
+        "/media/bensound-calmfocus.mp3": [("truncated", MP3_BYTES)],
+    }
+    with pytest.raises(aiohttp.ClientPayloadError):
+        asyncio.run(download_track_http(f"{server.base_url}/track/{SLUG}", str(tmp_path)))
+    assert os.listdir(tmp_path) == []
+
+
+class FakeBrowserPool:
+    def __init__(self):
+        self.calls = []
+
+    def download(self, track_url, download_dir):
+        self.calls.append(track_url)
+        path = os.path.join(download_dir, "bensound-calmfocus.mp3")
+        with open(path, "wb") as f:
+            f.write(MP3_BYTES)
+        return "Music by Fixture Composer", path
+
+
+def test_download_track_async_falls_back_to_the_browser(server, tmp_path, monkeypatch) -> None:
+    pool = FakeBrowserPool()
+    monkeypatch.setattr(bensound, "get_browser_pool", lambda: pool)
+    server.routes = {f"/track/{SLUG}": [(200, track_html(player=""))]}
+    track_url = f"{server.base_url}/track/{SLUG}"
+
+    path, attribution = asyncio.run(download_track_async(track_url, str(tmp_path)))
+    assert pool.calls == [track_url]
+    assert path == str(tmp_path / "calmfocus.mp3") and attribution == "Music by Fixture Composer"
+    assert sorted(os.listdir(tmp_path)) == ["calmfocus.mp3", "calmfocus.txt"]
+
+    # Cached now: neither the page nor the browser is hit again
+    hits = sum(server.hits.values())
+    assert asyncio.run(download_track_async(track_url, str(tmp_path))) == (path, attribution)
+    assert pool.calls == [track_url] and sum(server.hits.values()) == hits
@@ -0,0 +1,70 @@
+from react_agent.ingest_manifest import BookManifest, point_id, text_hash
+
+
+def test_point_ids_are_deterministic() -> None:
+    assert point_id("abc", 1) == point_id("abc", 1)
+    assert point_id("abc", 1) != point_id("abc", 2)
+    assert point_id("abc", 1) != point_id("abd", 1)
+
+
+def test_manifest_resumes_only_unchanged_chunks(tmp_path) -> None:
+    chunks = ["one", "two", "three"]
+    manifest = BookManifest(str(tmp_path), "book.pdf", "hash-1")
+    manifest.record_metadata("summary", ["tag"])
+    for text in chunks:
+        manifest.record_context(text_hash(text), f"context of {text}")
+    manifest.record_stored([(1, text_hash("one")), (2, text_hash("two"))])
+    assert BookManifest.peek(str(tmp_path), "book.pdf") == ("hash-1", False)
+
+    # Re-chunked after a parser change: chunk 2 differs and the book got shorter
+    reloaded = BookManifest(str(tmp_path), "book.pdf", "hash-1")
+    assert reloaded.summary == "summary"
+    assert reloaded.is_stored(1, text_hash("one"))
+    assert not reloaded.is_stored(2, text_hash("two!"))
+    assert reloaded.context_for(text_hash("three")) == "context of three"
+    reloaded.record_stored([(2, text_hash("two!"))])
+    assert reloaded.finish(2, [text_hash("one"), text_hash("two!")]) == []
+    assert BookManifest.peek(str(tmp_path), "book.pdf") == ("hash-1", True)
+
+
+def test_manifest_marks_old_points_stale_when_file_changes(tmp_path) -> None:
+    manifest = BookManifest(str(tmp_path), "book.pdf", "hash-1")
+    manifest.record_context(text_hash("one"), "context")
+    manifest.record_stored([(1, text_hash("one")), (2, text_hash("two"))])
+
+    changed = BookManifest(str(tmp_path), "book.pdf", "hash-2")
+    assert not changed.is_stored(1, text_hash("one"))
+    assert changed.context_for(text_hash("one")) == "context"
+    changed.record_stored([(1, text_hash("one"))])
+    assert changed.finish(1, [text_hash("one")]) == [point_id("hash-1", 1), point_id("hash-1", 2)]
+
+
+def test_pending_deletes_survive_a_crash(tmp_path) -> None:
+    manifest = BookManifest(str(tmp_path), "book.pdf", "hash-1")
+    manifest.record_stored([(1, text_hash("one")), (2, text_hash("two"))])
+    manifest.finish(2, [text_hash("one"), text_hash("two")])
+
+    # The file changed and the run crashed before finish(): the old points are still owed
+    BookManifest(str(tmp_path), "book.pdf", "hash-2").record_stored([(1, text_hash("one!"))])
+    assert BookManifest.peek(str(tmp_path), "book.pdf") == ("hash-2", False)
+
+    reopened = BookManifest(str(tmp_path), "book.pdf", "hash-2")
+    stale = reopened.finish(1, [text_hash("one!")])
+    assert stale == [point_id("hash-1", 1), point_id("hash-1", 2)]
+    # finish() alone doesn't clear them: the delete itself may still fail
+    assert BookManifest.peek(str(tmp_path), "book.pdf") == ("hash-2", False)
+    reopened.deleted(stale)
+    assert BookManifest.peek(str(tmp_path), "book.pdf") == ("hash-2", True)
+    assert BookManifest(str(tmp_path), "book.pdf", "hash-2").finish(1, [text_hash("one!")]) == []
+
+
+def test_legacy_flag_survives_a_crash(tmp_path) -> None:
+    (tmp_path / "metadata_json").mkdir()
+    (tmp_path / "metadata_json" / "book.pdf.meta.json").write_text("{}")
+    assert BookManifest(str(tmp_path), "book.pdf", "hash-1").legacy
+
+    # Crashed before the legacy points were deleted: the manifest exists now, but still says so
+    reopened = BookManifest(str(tmp_path), "book.pdf", "hash-1")
+    assert reopened.legacy
+    reopened.legacy_deleted()
+    assert not BookManifest(str(tmp_path), "book.pdf", "hash-1").legacy
@@ -0,0 +1,163 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+import tiktoken
+
+from react_agent import ingest_pipeline
+from react_agent.bulk_loader import LoadStats
+from react_agent.ingest_manifest import BookManifest
+from react_agent.ingest_pipeline import AsyncRateLimiter, IngestionPipeline
+from react_agent.qdrant_db import is_file_processed
+
+# Byte-level encoding so the tests don't need to download a BPE file
+BYTES = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+CHUNKS_PER_BOOK = 12
+
+
+def fake_extract(filepath, chunk_size, overlap, keep_text):
+    name = os.path.basename(filepath)
+    chunks = [(f"{name} chunk {n}", 4) for n in range(1, CHUNKS_PER_BOOK + 1)]
+    return {"chunks": chunks, "pages": 1, "head": name, "text": " ".join(text for text, _ in chunks)}
+
+
+class StubLoader:
+    def __init__(self):
+        self.stats = LoadStats()
+        self.dense_embeddings = None
+        self.loaded = []
+
+    async def aload(self, documents, ids):
+        self.loaded.extend((d.metadata["source"], d.metadata["chunk_index"], d.metadata["context"]) for d in documents)
+        return LoadStats(points=len(documents))
+
+    def delete(self, ids):
+        pass
+
+    def delete_source(self, source):
+        pass
+
+
+class StubEnricher:
+    """Stands in for BookEnricher; the test sets `fail` and `gate` on the class"""
+    calls = []
+    fail = set()
+    gate = None
+    started = 0
+
+    def __init__(self, full_text, filename, chunk_texts, **kwargs):
+        self.filename = filename
+
+    async def enrich(self, chunk_num):
+        StubEnricher.started += 1
+        if StubEnricher.gate is not None:
+            await StubEnricher.gate.wait()
+        StubEnricher.calls.append((self.filename, chunk_num))
+        if (self.filename, chunk_num) in StubEnricher.fail:
+            raise RuntimeError("model unavailable")
+        return f"context {chunk_num}"
+
+    async def close(self):
+        return {"calls": len(StubEnricher.calls)}
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """A directory of two (fake) PDFs and a pipeline over it with stubbed extract, enrich and store"""
+    for name in ("a.pdf", "b.pdf"):
+        (tmp_path / name).write_bytes(name.encode())
+
+    async def metadata(text, filename, index=None):
+        return f"About {filename}", ["tag"]
+
+    loader = StubLoader()
+    monkeypatch.setattr(ingest_pipeline, "BulkLoader", SimpleNamespace(from_vector_store=lambda store: loader))
+    monkeypatch.setattr(ingest_pipeline, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(ingest_pipeline, "extract_pdf_chunks_worker", fake_extract)
+    monkeypatch.setattr(ingest_pipeline, "generate_book_metadata", metadata)
+    monkeypatch.setattr(ingest_pipeline, "tokenizer", BYTES)
+    monkeypatch.setattr(ingest_pipeline, "BookEnricher", StubEnricher)
+    monkeypatch.setattr(StubEnricher, "calls", [])
+    monkeypatch.setattr(StubEnricher, "fail", set())
+    monkeypatch.setattr(StubEnricher, "started", 0)
+    monkeypatch.setattr(StubEnricher, "gate", None)
+
+    def pipeline(**kwargs):
+        kwargs = {"requests_per_minute": 60000, "upsert_batch_size": 5, **kwargs}
+        return IngestionPipeline(None, str(tmp_path), **kwargs)
+
+    return SimpleNamespace(directory=str(tmp_path), loader=loader, pipeline=pipeline)
+
+
+def test_rate_limiter_spaces_calls_after_the_burst(monkeypatch) -> None:
+    clock = SimpleNamespace(now=0.0)
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        clock.now += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(ingest_pipeline, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(ingest_pipeline, "asyncio", SimpleNamespace(Lock=asyncio.Lock, sleep=sleep))
+
+    async def acquire_times(n):
+        # 16/s with a one-second burst; a period of 1/16 s keeps the fake clock exact
+        limiter = AsyncRateLimiter(requests_per_minute=960)
+        times = []
+        for _ in range(n):
+            await limiter.acquire()
+            times.append(clock.now)
+        return times
+
+    times = asyncio.run(acquire_times(26))
+    assert times[:16] == [0.0] * 16
+    assert times[16:] == [k / 16 for k in range(1, 11)]
+
+
+def test_full_enrich_queue_holds_back_the_producer(library) -> None:
+    pipeline = library.pipeline(enrich_concurrency=2, queue_size=3)
+
+    async def scenario():
+        StubEnricher.gate = asyncio.Event()
+        run = asyncio.create_task(pipeline.run())
+        while not (StubEnricher.started == 2 and pipeline.enrich_queue.full()):
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        # Two chunks in the workers and three queued; the other 19 haven't been queued yet
+        blocked = (StubEnricher.started, pipeline.enrich_queue.qsize(), len(library.loader.loaded))
+        StubEnricher.gate.set()
+        return blocked, await run
+
+    blocked, stats = asyncio.run(scenario())
+    assert blocked == (2, 3, 0)
+    assert stats.chunks_stored == stats.chunks_enriched == 2 * CHUNKS_PER_BOOK
+
+
+def test_failed_enrichment_drops_only_that_chunk_and_the_book_resumes(library) -> None:
+    StubEnricher.fail = {("a.pdf", 3)}
+    stats = asyncio.run(library.pipeline().run())
+
+    assert stats.chunks_stored == 2 * CHUNKS_PER_BOOK - 1
+    assert sorted(n for source, n, _ in library.loader.loaded if source == "a.pdf") == [
+        n for n in range(1, CHUNKS_PER_BOOK + 1) if n != 3]
+    assert not is_file_processed(library.directory, "a.pdf")
+    assert is_file_processed(library.directory, "b.pdf")
+    assert not os.path.exists(os.path.join(library.directory, "metadata_json", "a.pdf.meta.json"))
+
+    StubEnricher.fail = set()
+    StubEnricher.calls.clear()
+    library.loader.loaded.clear()
+    stats = asyncio.run(library.pipeline().run())
+
+    assert StubEnricher.calls == [("a.pdf", 3)]
+    assert library.loader.loaded == [("a.pdf", 3, "context 3")]
+    assert stats.chunks_stored == 1 and stats.chunks_resumed == 0
+    assert is_file_processed(library.directory, "a.pdf")
+    assert BookManifest.peek(library.directory, "a.pdf")[1]
@@ -0,0 +1,102 @@
+import asyncio
+import inspect
+import time
+
+import pytest
+
+from react_agent import instrumentation
+from react_agent.instrumentation import recorder, run_report, span, traced, traced_node
+
+
+@pytest.fixture(autouse=True)
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, "trace_dir", str(tmp_path))
+
+
+def burn(seconds: float) -> None:
+    until = time.thread_time() + seconds
+    while time.thread_time() < until:
+        pass
+
+
+def by_name(run_id: str):
+    return {s.name: s for s in recorder.spans(run_id)}
+
+
+def test_nested_spans_link_parents_across_threads() -> None:
+    @traced("tts", kind="tts")
+    def tts() -> None:
+        with span("inner"):
+            pass
+
+    async def scenario():
+        async with span("run", kind="run", run_id="nesting"):
+            async with span("node", kind="node"):
+                await asyncio.to_thread(tts)
+            with span("sibling"):
+                pass
+
+    asyncio.run(scenario())
+    spans = by_name("nesting")
+    assert spans["run"].parent_id is None
+    assert spans["node"].parent_id == spans["run"].span_id
+    assert spans["tts"].parent_id == spans["node"].span_id
+    assert spans["inner"].parent_id == spans["tts"].span_id
+    assert spans["sibling"].parent_id == spans["run"].span_id
+    assert instrumentation.current_run_id() is None
+
+
+def test_concurrent_spans_are_charged_only_their_own_cpu() -> None:
+    async def scenario():
+        async def busy():
+            async with span("busy", kind="node"):
+                await asyncio.to_thread(traced("work")(burn), 0.2)
+
+        async def idle():
+            async with span("idle", kind="node"):
+                await asyncio.sleep(0.3)
+
+        async with span("run", kind="run", run_id="attribution"):
+            await asyncio.gather(busy(), idle())
+
+    asyncio.run(scenario())
+    spans = by_name("attribution")
+    assert spans["work"].cpu_s >= 0.2
+    assert spans["busy"].cpu_s == spans["work"].cpu_s == spans["run"].cpu_s
+    assert spans["idle"].cpu_s == 0.0
+    assert spans["idle"].process_peak_rss_mb > 0
+
+
+def test_run_report_aggregates_per_name() -> None:
+    async def scenario():
+        async with span("run", kind="run", run_id="report"):
+            for size in (100, 300):
+                async with span("download", kind="http") as s:
+                    s.add_bytes(in_=size)
+            with pytest.raises(ValueError):
+                with span("download", kind="http"):
+                    raise ValueError("404")
+
+    asyncio.run(scenario())
+    report = run_report("report")
+    download = report["spans"]["download"]
+    assert (download["count"], download["bytes_in"], download["errors"]) == (3, 400, 1)
+    assert report["wall_s"] == round(by_name("report")["run"].wall_s, 3)
+    walls = [row["wall_s"] for row in report["spans"].values()]
+    assert walls == sorted(walls, reverse=True)
+
+
+def test_traced_node_keeps_signature_and_scopes_run() -> None:
+    async def node(state, config=None):
+        return {"run": instrumentation.current_run_id(), "state": state}
+
+    wrapped = traced_node("my_node", node)
+    assert inspect.signature(wrapped) == inspect.signature(node)
+    assert wrapped.__name__ == "node"
+
+    async def scenario():
+        async with span("run", kind="run", run_id="scoped"):
+            return await wrapped({"a": 1}, config={})
+
+    assert asyncio.run(scenario()) == {"run": "scoped", "state": {"a": 1}}
+    assert by_name("scoped")["my_node"].kind == "node"
@@ -0,0 +1,15 @@
+from react_agent.state import merge_by_section, replace_sections
+
+
+def test_sections_merge_across_branches() -> None:
+    existing = [{"section": "hook", "v": 1}, {"section": "cta", "v": 1}]
+    merged = merge_by_section(existing, [{"section": "hook", "v": 2}])
+    assert merged == [{"section": "cta", "v": 1}, {"section": "hook", "v": 2}]
+    assert merge_by_section(merged, []) == merged
+
+
+def test_replace_drops_items_from_previous_runs() -> None:
+    stale = [{"section": "hook", "reason": "no clips"}, {"section": "cta", "reason": "timeout"}]
+    assert merge_by_section(stale, replace_sections([])) == []
+    fresh = [{"section": "concept", "reason": "no clips"}]
+    assert merge_by_section(stale, replace_sections(fresh)) == fresh
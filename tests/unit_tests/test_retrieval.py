@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import numpy as np
+from cachetools import TTLCache
+from qdrant_client import QdrantClient, models
+
+from react_agent.retrieval import HybridRerankerRetriever
+
+TEXTS = ["anchoring shapes price estimates", "social proof in restaurant queues", "loss aversion and refunds",
+         "habit loops need cues", "scarcity raises perceived value"]
+
+
+class CountingClient:
+    """QdrantClient(":memory:") that counts the calls the retriever makes"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if callable(attr):
+            def counted(*args, **kwargs):
+                self.calls.append(name)
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+class StubSparse:
+    def query_embed(self, query):
+        yield SimpleNamespace(indices=np.array([1, 2]), values=np.array([1.0, 0.5]))
+
+
+class StubReranker:
+    """Scores a passage by its length and records the batches it was given"""
+
+    def __init__(self):
+        self.batches = []
+
+    def compute_score(self, pairs, batch_size, max_length, normalize):
+        self.batches.append([text for _, text in pairs])
+        return [float(len(text)) for _, text in pairs]
+
+
+def make_retriever(**kwargs):
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        "books",
+        vectors_config={"dense": models.VectorParams(size=4, distance=models.Distance.COSINE)},
+        sparse_vectors_config={"sparse": models.SparseVectorParams()},
+    )
+    client.upsert("books", points=[
+        models.PointStruct(id=i, vector={"dense": [1.0, float(i), 0.0, 1.0],
+                                         "sparse": models.SparseVector(indices=[1, 2 + i], values=[1.0, 1.0])},
+                           payload={"page_content": text, "metadata": {"source": "book.pdf"}})
+        for i, text in enumerate(TEXTS)
+    ])
+    retriever = HybridRerankerRetriever(
+        client=CountingClient(client), collection_name="books",
+        embeddings=SimpleNamespace(embed_query=lambda q: [1.0, 1.0, 0.0, 1.0]),
+        reranker_model="stub", candidate_k=5, top_n=2, **kwargs,
+    )
+    retriever._sparse_model = StubSparse()
+    retriever._reranker = StubReranker()
+    return retriever
+
+
+def test_rerank_batches_group_similar_lengths() -> None:
+    retriever = make_retriever(rerank_batch_size=2)
+    texts = ["xxxxx", "x", "xxxx", "xx", "xxx"]
+    scores = retriever._rerank_scores("q", texts)
+    assert retriever._reranker.batches == [["x", "xx"], ["xxx", "xxxx"], ["xxxxx"]]
+    assert scores == [5.0, 1.0, 4.0, 2.0, 3.0]  # mapped back to the input order
+
+
+def test_search_then_cache_hit_then_expiry() -> None:
+    retriever = make_retriever()
+    now = [0.0]
+    retriever._cache = TTLCache(maxsize=8, ttl=60, timer=lambda: now[0])
+    longest = sorted(TEXTS, key=len, reverse=True)[:2]
+
+    docs = retriever.invoke("pricing biases")
+    assert [d.page_content for d in docs] == longest
+    assert set(retriever.last_timings) == {"embed_ms", "search_ms", "rerank_ms", "cache_hit", "total_ms"}
+    assert retriever.last_timings["cache_hit"] == 0.0
+    assert retriever.client.calls == ["query_batch_points"]
+    assert docs[0].metadata["source"] == "book.pdf" and "reranker_score" in docs[0].metadata
+
+    cached = retriever.invoke("  pricing biases ")
+    assert retriever.client.calls == ["query_batch_points", "retrieve"]
+    assert set(retriever.last_timings) == {"fetch_ms", "cache_hit", "total_ms"}
+    assert retriever.last_timings["cache_hit"] == 1.0
+    assert [d.page_content for d in cached] == longest
+    assert [d.metadata["reranker_score"] for d in cached] == [d.metadata["reranker_score"] for d in docs]
+
+    # A cached id that no longer exists is skipped
+    retriever.client.client.delete("books", points_selector=models.PointIdsList(points=[TEXTS.index(longest[0])]))
+    assert [d.page_content for d in retriever.invoke("pricing biases")] == longest[1:]
+
+    now[0] += 61
+    retriever.invoke("pricing biases")
+    assert retriever.client.calls[-1] == "query_batch_points"
+    assert retriever.last_timings["cache_hit"] == 0.0
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from react_agent import section_pipeline
+from react_agent.section_pipeline import ResourceScheduler, run_section_pipeline
+
+# Per section: (TTS seconds, download seconds, outcome)
+PLAN = {
+    "hook": (0.02, 0.02, "ok"),
+    "concept": (0.02, 0.40, "ok"),
+    "cta": (0.02, 0.05, "no_audio"),
+    "outro": (0.02, 0.05, "no_clips"),
+    "extra": (0.02, 0.05, "render_error"),
+}
+
+
+def install_stubs(monkeypatch, events):
+    def generate_tts(text, video_name, section, voice):
+        time.sleep(PLAN[section][0])
+        events.append(("tts", section, voice))
+        return None if PLAN[section][2] == "no_audio" else SimpleNamespace(file_path=f"{section}.wav")
+
+    async def search_and_validate_videos(section, model, section_dir):
+        await asyncio.sleep(PLAN[section.section][1])
+        events.append(("download", section.section, str(section_dir)))
+        if PLAN[section.section][2] == "no_clips":
+            return [], [{"section": section.section, "reason": "no clips"}]
+        return [SimpleNamespace(file_path=f"{section.section}.mp4")], []
+
+    async def create_reel_for_audio(audio_path, clips, output_path):
+        if audio_path == "extra.wav":
+            raise RuntimeError("ffmpeg exited with code 1")
+        events.append(("render", audio_path, output_path))
+        return output_path
+
+    async def get_duration(path):
+        return 1.0
+
+    monkeypatch.setattr(section_pipeline, "generate_tts", generate_tts)
+    monkeypatch.setattr(section_pipeline, "search_and_validate_videos", search_and_validate_videos)
+    monkeypatch.setattr(section_pipeline, "create_reel_for_audio", create_reel_for_audio)
+    monkeypatch.setattr(section_pipeline, "get_duration", get_duration)
+
+
+def test_sections_finish_independently_with_own_warnings(tmp_path, monkeypatch) -> None:
+    events = []
+    install_stubs(monkeypatch, events)
+    script = SimpleNamespace(title="Anchoring", sections=[SimpleNamespace(section=name, text=f"{name} text")
+                                                            for name in PLAN])
+    results = asyncio.run(run_section_pipeline(
+        script, model=None, visuals_root=str(tmp_path / "videos"), voice="af_jessica",
+        scheduler=ResourceScheduler(tts=4, download=4, render=2), output_dir=str(tmp_path / "out"),
+    ))
+
+    order = [r.section_key for r in results]
+    assert order[0] == "HOOK" and order[-1] == "CONCEPT"
+    # The fast section rendered before the slow section's clips had even arrived
+    assert events.index(("render", "hook.wav", str(tmp_path / "out" / "reel_hook.mp4"))) < \
+        events.index(next(e for e in events if e[:2] == ("download", "concept")))
+
+    by_key = {r.section_key: r for r in results}
+    assert by_key["HOOK"].output.path.endswith("reel_hook.mp4") and by_key["HOOK"].warning is None
+    assert by_key["CONCEPT"].output is not None
+    assert by_key["CTA"].warning == "Section CTA: TTS failed"
+    assert by_key["OUTRO"].warning == "No visual files found for section OUTRO."
+    assert by_key["OUTRO"].failures == [{"section": "outro", "reason": "no clips"}]
+    assert by_key["EXTRA"].warning == "Exception in processing section EXTRA: ffmpeg exited with code 1"
+
+    # The graph's voice and visuals root are used, not defaults
+    assert {e[2] for e in events if e[0] == "tts"} == {"af_jessica"}
+    assert all(e[2].startswith(str(tmp_path / "videos" / "Anchoring" / "visuals")) for e in events if e[0] == "download")
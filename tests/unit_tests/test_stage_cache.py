@@ -0,0 +1,121 @@
+import asyncio
+from typing import TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from react_agent import stage_cache
+from react_agent.stage_cache import StageCache, input_key, memoize_node
+from react_agent.state import merge_by_section, replace_sections
+from react_agent.structures import AudioMetadata
+
+
+def audio(tmp_path, section: str = "hook") -> AudioMetadata:
+    wav = tmp_path / f"{section}.wav"
+    wav.write_bytes(b"RIFF" + b"\0" * 64)
+    return AudioMetadata(section=section, text="hi", voice="af_bella", duration=1.0,
+                         sample_rate=24000, file_path=str(wav))
+
+
+def counting_node(update):
+    calls = []
+
+    async def node(state):
+        calls.append(state)
+        return update
+    return node, calls
+
+
+def test_stage_cache_reuses_update_until_artifact_changes(tmp_path) -> None:
+    wav = tmp_path / "hook.wav"
+    wav.write_bytes(b"RIFF" + b"\0" * 64)
+    meta = AudioMetadata(section="hook", text="hi", voice="af_bella", duration=1.0,
+                         sample_rate=24000, file_path=str(wav))
+    cache = StageCache(str(tmp_path / "cache"))
+    key = input_key("generate_audio", {"sections": [("hook", "hi")], "voice": "af_bella"})
+    assert key != input_key("generate_audio", {"sections": [("hook", "hi")], "voice": "af_jessica"})
+
+    cache.store("generate_audio", key, {"audio_metadata": [meta]}, [str(wav)])
+    cached = cache.lookup("generate_audio", key)
+    assert cached["audio_metadata"] == [meta]
+
+    wav.write_bytes(b"RIFF")
+    assert cache.lookup("generate_audio", key) is None
+
+
+def test_memoize_node_skips_node_on_cache_hit(tmp_path) -> None:
+    meta = audio(tmp_path)
+    node, calls = counting_node({"audio_metadata": [meta]})
+    memoized = memoize_node("generate_audio", lambda state, configuration: {"text": state["text"]},
+                            artifacts=lambda update: [m.file_path for m in update["audio_metadata"]],
+                            cache=StageCache(str(tmp_path / "cache")))(node)
+
+    assert asyncio.run(memoized({"text": "hi"})) == {"audio_metadata": [meta]}
+    assert asyncio.run(memoized({"text": "hi"})) == {"audio_metadata": [meta]}
+    assert len(calls) == 1
+    asyncio.run(memoized({"text": "changed"}))
+    assert len(calls) == 2
+
+
+def test_memoize_node_does_not_store_rejected_or_artifactless_updates(tmp_path) -> None:
+    cache = StageCache(str(tmp_path / "cache"))
+    meta = audio(tmp_path)
+    rejected, rejected_calls = counting_node({"audio_metadata": [meta], "failed_sections": [{"section": "cta"}]})
+    rejected = memoize_node("get_videos", lambda state, configuration: {}, cache=cache,
+                            artifacts=lambda update: [m.file_path for m in update["audio_metadata"]],
+                            cacheable=lambda update: not update["failed_sections"])(rejected)
+    empty, empty_calls = counting_node({"audio_metadata": []})
+    empty = memoize_node("generate_audio", lambda state, configuration: {}, cache=cache,
+                         artifacts=lambda update: [m.file_path for m in update["audio_metadata"]])(empty)
+
+    for _ in range(2):
+        asyncio.run(rejected({}))
+        asyncio.run(empty({}))
+    assert len(rejected_calls) == len(empty_calls) == 2
+    assert not (tmp_path / "cache").exists()
+
+
+def test_stage_cache_disabled_bypasses_lookup_and_store(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(stage_cache, "STAGE_CACHE_ENABLED", False)
+    node, calls = counting_node({"audio_metadata": [audio(tmp_path)]})
+    memoized = memoize_node("generate_audio", lambda state, configuration: {}, cache=StageCache(str(tmp_path / "cache")),
+                            artifacts=lambda update: [m.file_path for m in update["audio_metadata"]])(node)
+    asyncio.run(memoized({}))
+    asyncio.run(memoized({}))
+    assert len(calls) == 2
+    assert not (tmp_path / "cache").exists()
+
+
+def test_node_without_config_reads_configuration_from_the_graph(tmp_path) -> None:
+    class S(TypedDict, total=False):
+        text: str
+        audio_metadata: list
+
+    seen = []
+    node, _ = counting_node({"audio_metadata": [audio(tmp_path)]})
+
+    def inputs(state, configuration):
+        seen.append(configuration.single_pass_assembly)
+        return {"single_pass": configuration.single_pass_assembly}
+
+    memoized = memoize_node("generate_audio", inputs, cache=StageCache(str(tmp_path / "cache")),
+                            artifacts=lambda update: [m.file_path for m in update["audio_metadata"]])(node)
+    builder = StateGraph(S)
+    builder.add_node("generate_audio", memoized)  # takes no config argument, like the real node
+    builder.add_edge(START, "generate_audio")
+    builder.add_edge("generate_audio", END)
+    graph = builder.compile()
+
+    for single_pass in (True, False):
+        asyncio.run(graph.ainvoke({"text": "hi"}, config={"configurable": {"single_pass_assembly": single_pass}}))
+    assert seen == [True, False]
+
+
+def test_replace_sections_update_survives_the_cache(tmp_path) -> None:
+    fresh = audio(tmp_path, "hook")
+    cache = StageCache(str(tmp_path / "cache"))
+    cache.store("generate_audio", "key", {"audio_metadata": replace_sections([fresh])}, [fresh.file_path])
+    cached = cache.lookup("generate_audio", "key")
+    assert cached == {"audio_metadata": replace_sections([fresh])}
+
+    stale = [audio(tmp_path, "cta")]
+    assert merge_by_section(stale, cached["audio_metadata"]) == [fresh]
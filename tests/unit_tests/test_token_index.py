@@ -0,0 +1,54 @@
+import tiktoken
+
+from react_agent.pdf_stream import StreamingChunker
+from react_agent.token_index import TokenIndex
+
+# Byte-level encoding so the tests don't need to download a BPE file
+BYTES = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+
+TEXT = "\n\n".join(
+    " ".join(f"Sentence {p}.{s} has a few words in it." for s in range(6)) for p in range(20)
+)
+
+
+def test_offsets_round_trip() -> None:
+    index = TokenIndex(TEXT, BYTES)
+    assert len(index) == len(TEXT.encode())
+    assert index.slice(0, len(index)) == TEXT
+    assert index.count(0, 10) == 10
+
+
+def test_truncate_cuts_at_boundary_within_budget() -> None:
+    index = TokenIndex(TEXT, BYTES)
+    assert index.truncate(len(index)) == TEXT
+    truncated = index.truncate(500)
+    assert TEXT.startswith(truncated)
+    assert 400 < len(truncated) <= 500
+    assert truncated[-1] in ". \n"
+
+
+def test_split_respects_size_and_overlap() -> None:
+    index = TokenIndex(TEXT, BYTES)
+    spans = index.split(200, 20)
+    assert all(span.n_tokens <= 200 for span in spans)
+    assert spans[0].start == 0 and spans[-1].end == len(index)
+    for prev, nxt in zip(spans, spans[1:]):
+        assert prev.start < nxt.start <= prev.end
+        assert prev.end - nxt.start <= 20
+    # Cuts prefer paragraph/sentence boundaries over mid-word
+    assert all(index.text[span.end - 1] in ". \n" for span in spans[:-1])
+
+
+def test_streaming_chunker_matches_whole_text_split() -> None:
+    chunker = StreamingChunker(200, 20, BYTES)
+    spans = []
+    for i in range(0, len(TEXT), 700):
+        spans.extend(chunker.feed(TEXT[i:i + 700]))
+    spans.extend(chunker.flush())
+    whole = TokenIndex(TEXT, BYTES).split(200, 20)
+    assert [s.text for s in spans] == [s.text for s in whole]
@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import os
+from types import SimpleNamespace
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from react_agent.instrumentation import recorder
+from react_agent.qdrant_db import TopicVectorStore
+from react_agent.topic_index import LocalTopicIndex
+
+DIM = 8
+
+
+def unit(i: int) -> np.ndarray:
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[i % DIM] = 1.0
+    return vector
+
+
+def test_add_many_grows_and_search_orders_top_k() -> None:
+    index = LocalTopicIndex(dim=DIM)
+    for i in range(100):  # past the initial 64-row allocation
+        index.add(f"id-{i}", unit(i) * (i + 1), f"topic {i}")
+    assert len(index) == 100 and index.matrix.shape == (100, DIM)
+    assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0)
+
+    query = unit(0) + 0.5 * unit(1)
+    results = index.search(query, k=3)
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+    assert results[0][0] in {f"topic {i}" for i in range(0, 100, DIM)}
+    assert len(index.search(query, k=500)) == 100
+    assert LocalTopicIndex(dim=DIM).search(query) == []
+
+
+def test_save_load_round_trip(tmp_path) -> None:
+    path = str(tmp_path / "topics.idx")
+    index = LocalTopicIndex(dim=DIM, path=path)
+    index.add_many(["a", "b"], [unit(0), unit(1)], ["first", None])
+    index.save()
+    assert sorted(os.listdir(tmp_path)) == ["topics.idx", "topics.idx.json"]  # the .npy was renamed
+
+    loaded = LocalTopicIndex(dim=DIM, path=path)
+    assert loaded.ids == ["a", "b"] and loaded.titles == ["first", None]
+    assert np.array_equal(loaded.matrix, index.matrix)
+    assert loaded.search(unit(1), k=1) == [(None, 1.0)]
+
+
+def test_load_from_qdrant_pages_through_collection() -> None:
+    client = QdrantClient(":memory:")
+    client.create_collection("topics", vectors_config={
+        "dense": models.VectorParams(size=DIM, distance=models.Distance.COSINE)})
+    client.upsert("topics", points=[
+        models.PointStruct(id=i, vector={"dense": unit(i).tolist()}, payload={"metadata": {"title": f"topic {i}"}})
+        for i in range(10)
+    ])
+    index = LocalTopicIndex(dim=DIM)
+    index.load_from_qdrant(client, "topics", batch_size=3)
+    assert len(index) == 10
+    assert sorted(index.titles) == sorted(f"topic {i}" for i in range(10))
+    title, score = index.search(unit(3), k=1)[0]
+    assert title == "topic 3" and abs(score - 1.0) < 1e-6
+
+
+class BagOfWordsEmbeddings:
+    """Word-count vectors, so overlapping texts are close and unrelated ones are not"""
+
+    def _embed(self, text: str):
+        vector = np.zeros(768, dtype=np.float32)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 768] += 1
+        return vector.tolist()
+
+    async def aembed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    async def aembed_query(self, text):
+        return self._embed(text)
+
+
+def insight(title: str, explanation: str) -> SimpleNamespace:
+    return SimpleNamespace(concept_title=title, explanation=explanation, psychological_effect="people change choices")
+
+
+def test_check_and_add_rejects_near_duplicate_in_local_mode(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(recorder, "trace_dir", str(tmp_path))
+    store = TopicVectorStore(BagOfWordsEmbeddings(), qdrant_url=None, api_key=None, mode="local", local_path=None)
+
+    async def scenario():
+        first = await store.check_and_add(insight("Anchoring", "the first number seen anchors later estimates"))
+        repeat = await store.check_and_add(insight("Anchoring again", "the first number seen anchors later estimate"))
+        novel = await store.check_and_add(insight("Social proof", "crowds signal which restaurant is safe to try"))
+        return first, repeat, novel
+
+    (first_dup, first_near), (repeat_dup, repeat_near), (novel_dup, _) = asyncio.run(scenario())
+    assert not first_dup and first_near == []
+    assert repeat_dup and repeat_near[0][0] == "Anchoring"
+    assert not novel_dup
+    assert store.local_index.titles == ["Anchoring", "Social proof"]